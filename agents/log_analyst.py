@@ -1,28 +1,371 @@
-from typing import Dict, Any, List
-from tools import parse_logs
-from config import get_logger, session_state
+import os
+from typing import List, Dict, Any, IO, Iterable, Optional, Tuple, Union
+from tools import (
+    AuthCorrelator,
+    BeaconCollector,
+    HeavyHitters,
+    LogBatch,
+    LinePrefilter,
+    Deduplicator,
+    FanDetector,
+    SymbolTable,
+    TemplateMiner,
+    VolumetricDetector,
+    correlate,
+    default_normalizer,
+    digest_records,
+    detect_beacons,
+    detect_volumetric,
+    parse_logs_vectorized,
+    parse_batch,
+    iter_file_parallel,
+    iter_tagged,
+    mine_batch,
+    open_log_file,
+    sample,
+    session_symbols,
+    tagged_from_records,
+    triage,
+)
+from tools.tag_rules import default_rules
+from config import (
+    PARSE_WORKERS,
+    PREFILTER_DECODE_SKIPPED,
+    PREFILTER_KEEP_OFFSETS,
+    SAMPLE_MODE,
+    SUSPICIOUS_PROMPT_SAMPLE,
+    TEMPLATE_PROMPT_LIMIT,
+    TOPK_REPORT_LIMIT,
+    TRIAGE_MODE,
+    TRIAGE_PREFILTER,
+    get_logger,
+    session_state,
+)
 
 class LogAnalystAgent:
     """
     Agent 1: parses logs and extracts suspicious events.
     """
 
-    def __init__(self, trace_id: str = "root"):
+    def __init__(
+        self,
+        trace_id: str = "root",
+        workers: Optional[int] = None,
+        triage: Optional[bool] = None,
+        sample: Optional[bool] = None,
+    ):
         self.logger = get_logger("LogAnalystAgent", trace_id)
+        self.workers = workers or PARSE_WORKERS
+        self.triage = TRIAGE_MODE if triage is None else triage
+        self.sample = SAMPLE_MODE if sample is None else sample
 
-    def run(self, session_id: str, raw_logs: str) -> Dict[str, Any]:
-        self.logger.info("Starting log analysis")
-        parsed = parse_logs(raw_logs)
+    def _in_workers(self, raw_logs: Union[str, IO, "os.PathLike[str]"]) -> bool:
+        # Files parsed across a pool: the workers fill the top-talker and
+        # fan-out sketches per range, so the caller must not count them again
+        return isinstance(raw_logs, os.PathLike) and self.workers > 1
 
-        suspicious = [rec for rec in parsed if rec.get("tags")]
-        self.logger.info(f"Found {len(suspicious)} suspicious records")
+    def _parse(
+        self,
+        raw_logs: Union[str, IO, "os.PathLike[str]"],
+        symbols: SymbolTable,
+        hitters: Optional[HeavyHitters] = None,
+        fan: Optional[FanDetector] = None,
+    ) -> LogBatch:
+        if isinstance(raw_logs, str):
+            # Whole text in memory: tag all messages column-wise in one go
+            return LogBatch.from_records(symbols.iter_interned(parse_logs_vectorized(raw_logs)), symbols=symbols)
+        if isinstance(raw_logs, os.PathLike):
+            if not self._in_workers(raw_logs):
+                hitters = fan = None
+            records = iter_file_parallel(raw_logs, self.workers, hitters=hitters, fan=fan)
+            return LogBatch.from_records(symbols.iter_interned(records), symbols=symbols)
+        # Streams are tagged copy-free straight into the batch
+        return parse_batch(raw_logs, symbols=symbols)
+
+    def _tagged(
+        self,
+        raw_logs: Union[str, IO, "os.PathLike[str]"],
+        symbols: SymbolTable,
+        prefilter: Optional[LinePrefilter] = None,
+        hitters: Optional[HeavyHitters] = None,
+        fan: Optional[FanDetector] = None,
+    ) -> Iterable[Tuple[Dict[str, Any], Optional[List[str]]]]:
+        if isinstance(raw_logs, os.PathLike):
+            if self._in_workers(raw_logs):
+                records = iter_file_parallel(raw_logs, self.workers, hitters=hitters, fan=fan)
+                return tagged_from_records(symbols.iter_interned(records))
+            return self._tagged_file(raw_logs, symbols, prefilter)
+        return iter_tagged(raw_logs, prefilter=prefilter, symbols=symbols)
+
+    @staticmethod
+    def _tagged_file(
+        path: "os.PathLike[str]",
+        symbols: SymbolTable,
+        prefilter: Optional[LinePrefilter],
+    ) -> Iterable[Tuple[Dict[str, Any], Optional[List[str]]]]:
+        with open_log_file(path) as stream:
+            yield from iter_tagged(stream, prefilter=prefilter, symbols=symbols)
+
+    def _suspicious(self, suspicious: Iterable[Any]) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        # Replayed / double-shipped events collapse into one record with a
+        # dup_count, so threat intel and the prompts only see each once
+        dedup = Deduplicator()
+        unique = list(dedup.iter_unique(suspicious))
+        self.logger.info(
+            f"Found {len(unique)} suspicious records ({dedup.duplicates} duplicates dropped)"
+        )
+        # Events expose the canonical fields (src_ip, user_name, ...) directly;
+        # each record maps by its own fields, in every mode
+        return unique, default_normalizer().normalize_records(unique)
+
+    def _auth_findings(self, correlator: AuthCorrelator) -> List[Dict[str, Any]]:
+        # Failures counted over time per IP and account, before dedup
+        findings = correlator.findings(TEMPLATE_PROMPT_LIMIT)
+        if correlator.failures:
+            self.logger.info(
+                f"Correlated {correlator.failures} authentication failures into {len(findings)} findings"
+            )
+        return findings
+
+    def _fan_findings(self, fan: FanDetector) -> List[Dict[str, Any]]:
+        # Distinct destinations / ports / accounts / sources per entity
+        findings = fan.findings(TEMPLATE_PROMPT_LIMIT)
+        if findings:
+            self.logger.info(f"Found {len(findings)} scans, sprays or distributed floods by distinct counts")
+        return findings
+
+    def _beacon_findings(self, session_id: str, beacons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if beacons:
+            self.logger.info(f"Found {len(beacons)} likely beaconing connection pairs")
+        session_state.add_memory(session_id, "beacon_findings", beacons)
+        return beacons
+
+    def _collected_beacons(self, session_id: str, collector: BeaconCollector) -> List[Dict[str, Any]]:
+        # Connection times were collected while streaming, up to BEACON_MAX_EVENTS
+        if collector.dropped:
+            self.logger.warning(
+                f"Beaconing detection covers the first {len(collector)} connections only; "
+                f"{collector.dropped} later ones were not kept (see BEACON_MAX_EVENTS)"
+            )
+        return self._beacon_findings(session_id, collector.findings(limit=TEMPLATE_PROMPT_LIMIT))
+
+    def _volumetric_findings(self, session_id: str, detector: VolumetricDetector) -> List[Dict[str, Any]]:
+        # Event / byte rate spikes per address, in fixed memory
+        findings = detector.findings(TEMPLATE_PROMPT_LIMIT)
+        if findings:
+            self.logger.info(f"Found {len(findings)} volumetric anomalies")
+        session_state.add_memory(session_id, "volumetric_findings", findings)
+        return findings
+
+    def _top_talkers(self, session_id: str, hitters: HeavyHitters) -> Dict[str, List[Dict[str, Any]]]:
+        # The summaries themselves are kept so ThreatIntelAgent can rank any IP
+        top_talkers = hitters.to_dict(TOPK_REPORT_LIMIT)
+        session_state.add_memory(session_id, "heavy_hitters", hitters)
+        session_state.add_memory(session_id, "top_talkers", top_talkers)
+        return top_talkers
+
+    def run(self, session_id: str, raw_logs: Union[str, IO, "os.PathLike[str]"]) -> Dict[str, Any]:
+        """
+        raw_logs may be the full log text, an open file handle / byte stream
+        (parsed incrementally with iter_logs) or a path, which is split across
+        `workers` processes when it is a JSONL file.
+
+        In triage mode benign records are only counted (see TriageStats)
+        and never kept; in sampling mode (which takes precedence) suspicious
+        records are kept up to a cap plus a stratified sample of the rest
+        (see StratifiedSampler); otherwise the whole file is kept as a
+        LogBatch.
+        """
+        mode = " (sampling mode)" if self.sample else " (triage mode)" if self.triage else ""
+        self.logger.info("Starting log analysis" + mode)
+        if self.sample:
+            return self._run_sample(session_id, raw_logs)
+        if self.triage:
+            return self._run_triage(session_id, raw_logs)
+
+        # Top talkers and fan-out, in bounded memory; filled by the parse
+        # workers for files parsed in parallel, column-wise below otherwise
+        hitters, fan = HeavyHitters(), FanDetector()
+        in_workers = self._in_workers(raw_logs)
+        # Columnar batch; rows are dict-like views over the columns
+        parsed = self._parse(raw_logs, session_symbols(session_id), hitters, fan)
+
+        # Records map by their own field names: the column-wise detectors
+        # run once per detected source over that source's rows. The file is
+        # reported under its first record's source, as in triage and sampling
+        parts = default_normalizer().split_batch(parsed)
+        source = parts[0][0]
+        if len(parts) > 1:
+            self.logger.info(f"Mixed input: {', '.join(f'{len(b)} {s}' for s, b in parts)} records")
+        auth_findings = self._auth_findings(correlate(parsed.suspicious()))
+        suspicious, events = self._suspicious(parsed.suspicious())
+
+        beacons: List[Dict[str, Any]] = []
+        # Event / byte rates, in bounded memory
+        detector = VolumetricDetector()
+        for part_source, part in parts:
+            # Regular (src, dst) connection timing, column-wise
+            beacons += detect_beacons(part, part_source, limit=TEMPLATE_PROMPT_LIMIT)
+            detect_volumetric(part, part_source, detector)
+            if not in_workers:
+                hitters.add_batch(part, part_source)
+                fan.add_batch(part, part_source)
+        beacons.sort(key=lambda b: -b["score"])
+        beacons = self._beacon_findings(session_id, beacons[:TEMPLATE_PROMPT_LIMIT])
+        volumetric = self._volumetric_findings(session_id, detector)
+        top_talkers = self._top_talkers(session_id, hitters)
+        fan_findings = self._fan_findings(fan)
+
+        # Collapse repeated messages into templates with occurrence counts
+        miner = mine_batch(parsed)
+        templates = miner.summary(TEMPLATE_PROMPT_LIMIT)
+        self.logger.info(f"Mined {len(miner)} message templates")
 
         # Save to session memory
         session_state.add_memory(session_id, "parsed_logs", parsed)
-        session_state.add_memory(session_id, "suspicious_logs", suspicious)
+        self._remember(session_id, suspicious, events, source, templates, auth_findings, fan_findings)
 
         return {
             "parsed_logs": parsed,
             "suspicious_logs": suspicious,
-            "summary": f"Parsed {len(parsed)} records; found {len(suspicious)} suspicious events.",
+            "suspicious_events": events,
+            "auth_findings": auth_findings,
+            "beacon_findings": beacons,
+            "volumetric_findings": volumetric,
+            "fan_findings": fan_findings,
+            "top_talkers": top_talkers,
+            "log_source": source,
+            "log_templates": templates,
+            "summary": (
+                f"Parsed {len(parsed)} records into {len(miner)} message templates; "
+                f"found {len(suspicious)} suspicious events."
+            ),
         }
+
+    def _run_triage(self, session_id: str, raw_logs: Union[str, IO, "os.PathLike[str]"]) -> Dict[str, Any]:
+        # Benign JSONL lines skip decoding and only count towards the totals;
+        # PREFILTER_DECODE_SKIPPED opts into decoding them for the detectors
+        prefilter = None
+        if TRIAGE_PREFILTER:
+            prefilter = LinePrefilter(default_rules(), PREFILTER_KEEP_OFFSETS, PREFILTER_DECODE_SKIPPED)
+        # Repeated IPs, users, hosts and messages share one string per session
+        symbols = session_symbols(session_id)
+        # Top talkers, fan-out, rates and beaconing over every decoded record
+        hitters, fan, detector, collector = HeavyHitters(), FanDetector(), VolumetricDetector(), BeaconCollector()
+        # Parse workers count top talkers and fan-out per range themselves
+        counted = (None, None) if self._in_workers(raw_logs) else (hitters, fan)
+        raw_suspicious, stats, source = triage(
+            self._tagged(raw_logs, symbols, prefilter, hitters, fan),
+            hitters=counted[0], fan=counted[1], volumetric=detector, beacons=collector,
+        )
+        if prefilter is not None and prefilter.lines:
+            if prefilter.decode_skipped:
+                self.logger.info(f"Prefilter ruled out {prefilter.skipped} of {prefilter.lines} lines before tagging")
+            else:
+                stats.add_prefiltered(prefilter.skipped)
+                self.logger.info(
+                    f"Prefilter skipped {prefilter.skipped} of {prefilter.lines} lines undecoded; "
+                    "top talkers, fan-out, volumetric and beaconing detection do not see them "
+                    "(set PREFILTER_DECODE_SKIPPED=1 to decode them)"
+                )
+            if prefilter.keep_offsets:
+                session_state.add_memory(session_id, "prefiltered_offsets", prefilter.offsets)
+        auth_findings = self._auth_findings(correlate(raw_suspicious))
+        fan_findings = self._fan_findings(fan)
+        volumetric = self._volumetric_findings(session_id, detector)
+        beacons = self._collected_beacons(session_id, collector)
+        suspicious, events = self._suspicious(raw_suspicious)
+
+        # Templates over the suspicious records only; benign ones are in the stats
+        miner = TemplateMiner()
+        miner.add_records(raw_suspicious)
+        templates = miner.summary(TEMPLATE_PROMPT_LIMIT)
+        log_stats = stats.to_dict(TEMPLATE_PROMPT_LIMIT)
+
+        session_state.add_memory(session_id, "log_stats", log_stats)
+        top_talkers = self._top_talkers(session_id, hitters)
+        self._remember(session_id, suspicious, events, source, templates, auth_findings, fan_findings)
+
+        return {
+            "log_stats": log_stats,
+            "suspicious_logs": suspicious,
+            "suspicious_events": events,
+            "auth_findings": auth_findings,
+            "beacon_findings": beacons,
+            "volumetric_findings": volumetric,
+            "fan_findings": fan_findings,
+            "top_talkers": top_talkers,
+            "log_source": source,
+            "log_templates": templates,
+            "summary": (
+                f"Triaged {stats.total} records; kept {stats.suspicious} suspicious "
+                f"({len(suspicious)} unique), counted {stats.benign} benign."
+            ),
+        }
+
+    def _run_sample(self, session_id: str, raw_logs: Union[str, IO, "os.PathLike[str]"]) -> Dict[str, Any]:
+        # Every record must be decoded to be sampled, so no prefilter here
+        correlator = AuthCorrelator()
+        # Counted over every record, not only the sampled ones
+        hitters, fan, detector, collector = HeavyHitters(), FanDetector(), VolumetricDetector(), BeaconCollector()
+        # Parse workers count top talkers and fan-out per range themselves
+        counted = (None, None) if self._in_workers(raw_logs) else (hitters, fan)
+        sampler, source = sample(
+            self._tagged(raw_logs, session_symbols(session_id), hitters=hitters, fan=fan),
+            correlator=correlator, hitters=counted[0], fan=counted[1], volumetric=detector, beacons=collector,
+        )
+        auth_findings = self._auth_findings(correlator)
+        fan_findings = self._fan_findings(fan)
+        volumetric = self._volumetric_findings(session_id, detector)
+        beacons = self._collected_beacons(session_id, collector)
+        raw_suspicious = sampler.suspicious
+        benign = sampler.benign
+        suspicious, events = self._suspicious(raw_suspicious)
+
+        # Templates over the kept records; sample_stats has the exact totals
+        miner = TemplateMiner()
+        miner.add_records(raw_suspicious)
+        miner.add_records(benign)
+        templates = miner.summary(TEMPLATE_PROMPT_LIMIT)
+        sample_stats = sampler.to_dict(TEMPLATE_PROMPT_LIMIT)
+
+        session_state.add_memory(session_id, "sampled_logs", benign)
+        session_state.add_memory(session_id, "sample_stats", sample_stats)
+        top_talkers = self._top_talkers(session_id, hitters)
+        self._remember(session_id, suspicious, events, source, templates, auth_findings, fan_findings)
+
+        kept, seen = sample_stats["suspicious"]["kept"], sample_stats["suspicious"]["seen"]
+        return {
+            "sample_stats": sample_stats,
+            "sampled_logs": benign,
+            "suspicious_logs": suspicious,
+            "suspicious_events": events,
+            "auth_findings": auth_findings,
+            "beacon_findings": beacons,
+            "volumetric_findings": volumetric,
+            "fan_findings": fan_findings,
+            "top_talkers": top_talkers,
+            "log_source": source,
+            "log_templates": templates,
+            "summary": (
+                f"Sampled {sampler.total} records: kept {kept} of {seen} suspicious "
+                f"({len(suspicious)} unique) and {len(benign)} of "
+                f"{sample_stats['benign']['seen']} benign across {sampler.n_strata} strata."
+            ),
+        }
+
+    def _remember(self, session_id: str, suspicious: List[Dict[str, Any]], events: List[Any],
+                  source: str, templates: List[Dict[str, Any]], auth_findings: List[Dict[str, Any]],
+                  fan_findings: List[Dict[str, Any]]) -> None:
+        session_state.add_memory(session_id, "suspicious_logs", suspicious)
+        # What the prompts get instead of the full list: templates with
+        # counts and one representative record per frequent template
+        session_state.add_memory(session_id, "suspicious_digest", digest_records(
+            suspicious, TEMPLATE_PROMPT_LIMIT, SUSPICIOUS_PROMPT_SAMPLE
+        ))
+        session_state.add_memory(session_id, "suspicious_events", events)
+        session_state.add_memory(session_id, "auth_findings", auth_findings)
+        session_state.add_memory(session_id, "fan_findings", fan_findings)
+        session_state.add_memory(session_id, "log_source", source)
+        self.logger.info(f"Detected log source: {source}")
+        session_state.add_memory(session_id, "log_templates", templates)
@@ -14,8 +14,12 @@ class ReportAgent:
         self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
     def run(self, session_id: str, max_iterations: int = 3) -> Dict[str, Any]:
-        parsed_logs = session_state.get_memory(session_id, "parsed_logs", [])
-        suspicious_logs = session_state.get_memory(session_id, "suspicious_logs", [])
+        log_templates = session_state.get_memory(session_id, "log_templates", [])
+        log_stats = session_state.get_memory(session_id, "log_stats", {})
+        sample_stats = session_state.get_memory(session_id, "sample_stats", {})
+        sampled_logs = session_state.get_memory(session_id, "sampled_logs", [])
+        top_talkers = session_state.get_memory(session_id, "top_talkers", {})
+        suspicious_digest = session_state.get_memory(session_id, "suspicious_digest", {})
         threat_intel = session_state.get_memory(session_id, "threat_intel", {})
         response_rec = session_state.get_memory(session_id, "response_recommendation", {})
 
@@ -36,17 +40,35 @@ Create a professional incident report with:
 
 Data you can use:
 
-1) Parsed logs:
-{parsed_logs}
+1) Log message templates (<*> marks a variable part, count = occurrences):
+{log_templates}
 
-2) Suspicious logs:
-{suspicious_logs}
+2) Suspicious logs (count, message templates with occurrences, one representative record per frequent template):
+{suspicious_digest}
 
 3) Threat intelligence:
 {threat_intel}
 
 4) Response recommendation:
 {response_rec}
+"""
+        if log_stats:
+            base_prompt += f"""
+5) Log statistics (benign records were only counted; counts per source, action and hour):
+{log_stats}
+"""
+        if sample_stats:
+            base_prompt += f"""
+6) Sampling (the input was sampled; exact counts seen / kept / dropped, overall and per source and hour):
+{sample_stats}
+
+Sample of the benign records (stratified by source and hour):
+{sampled_logs}
+"""
+        if top_talkers:
+            base_prompt += f"""
+7) Most frequent source IPs, destination IPs and users (estimates: the true count lies between count - error and count); use them for the IOC section:
+{top_talkers}
 """
 
         draft = None
@@ -14,19 +14,43 @@ class ResponseAgent:
         self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
 
     def run(self, session_id: str) -> Dict[str, Any]:
-        suspicious_logs = session_state.get_memory(session_id, "suspicious_logs", [])
+        suspicious_digest = session_state.get_memory(session_id, "suspicious_digest", {})
         threat_intel = session_state.get_memory(session_id, "threat_intel", {})
+        auth_findings = session_state.get_memory(session_id, "auth_findings", [])
+        beacon_findings = session_state.get_memory(session_id, "beacon_findings", [])
+        volumetric_findings = session_state.get_memory(session_id, "volumetric_findings", [])
+        fan_findings = session_state.get_memory(session_id, "fan_findings", [])
+        sample_stats = session_state.get_memory(session_id, "sample_stats", {})
 
         prompt = f"""
 You are a senior SOC analyst.
 
 You are given:
-1. Suspicious log records (JSON):
-{suspicious_logs}
+1. Suspicious log records: how many there are, their message templates
+(<*> marks a variable part, count = occurrences) and one representative
+record per template for the most frequent ones:
+{suspicious_digest}
 
 2. Threat intelligence lookups for IPs:
 {threat_intel}
 
+3. Authentication findings precomputed from all failed logins (sliding-window
+counts per source IP and per account: brute force, password spray):
+{auth_findings}
+
+4. Likely C2 beaconing: (src, dst) pairs connecting at regular intervals, with
+mean interval, jitter, coefficient of variation, FFT period and a 0-1 score:
+{beacon_findings}
+
+5. Volumetric anomalies (DDoS / floods): addresses whose event rate spiked
+against its rolling baseline or passed a flood rate, estimated with sketches:
+{volumetric_findings}
+
+6. Fan-out / fan-in findings from distinct counts (HyperLogLog estimates)
+over the whole input: host and port scans, password sprays (distinct
+accounts failed per source IP) and distributed floods (distinct sources per target):
+{fan_findings}
+
 Tasks:
 - Identify likely attack type(s).
 - Map to MITRE ATT&CK techniques.
@@ -36,6 +60,12 @@ Tasks:
 
 Return your answer as structured JSON with keys:
 "attack_summary", "mitre_techniques", "severity", "remediation_steps", "ioc_list".
+"""
+        if sample_stats:
+            prompt += f"""
+Note: the input was too large and was sampled. These are the exact counts of
+records seen, kept and dropped; weigh the suspicious records above accordingly:
+{sample_stats}
 """
 
         self.logger.info("Calling Gemini for response recommendation")
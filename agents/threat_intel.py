@@ -1,7 +1,7 @@
 import asyncio
 from typing import Dict, Any
 from tools import ThreatIntelClient
-from config import get_logger, session_state
+from config import THREAT_INTEL_MAX_IPS, get_logger, session_state
 
 
 class ThreatIntelAgent:
@@ -29,13 +29,17 @@ class ThreatIntelAgent:
         """
         Async version: use this inside FastAPI or any async context.
         """
-        suspicious_logs = session_state.get_memory(session_id, "suspicious_logs", [])
-        ips = set()
-
-        for rec in suspicious_logs:
-            ip = rec.get("src_ip") or rec.get("ip") or rec.get("source_ip")
-            if ip:
-                ips.add(ip)
+        # Normalized by LogAnalystAgent, so every source exposes src_ip
+        events = session_state.get_memory(session_id, "suspicious_events", [])
+        # First-seen order, then most active first by the Space-Saving
+        # src.ip counts (the sort is stable, so ties keep first-seen order)
+        ips = list(dict.fromkeys(ev.src_ip for ev in events if ev.src_ip))
+        hitters = session_state.get_memory(session_id, "heavy_hitters")
+        if hitters is not None and "src.ip" in hitters.summaries:
+            ips.sort(key=lambda ip: -hitters.summaries["src.ip"].count(ip))
+        if THREAT_INTEL_MAX_IPS > 0 and len(ips) > THREAT_INTEL_MAX_IPS:
+            self.logger.info(f"Looking up the {THREAT_INTEL_MAX_IPS} most active of {len(ips)} IPs")
+            ips = ips[:THREAT_INTEL_MAX_IPS]
 
         self.logger.info(f"Running threat intel for {len(ips)} IPs")
 
@@ -51,7 +55,7 @@ class ThreatIntelAgent:
         session_state.add_memory(session_id, "threat_intel", intel_by_ip)
 
         return {
-            "ips": list(ips),
+            "ips": ips,
             "results": intel_by_ip,
         }
 
@@ -0,0 +1,50 @@
+"""
+parse_logs vs. the copy-free parse_logs_sparse on a mostly benign firewall
+feed: wall time and traced peak memory. Run from the repository root:
+
+    python -m benchmarks.bench_copy_free [n_records]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from tools import parse_logs, parse_logs_sparse
+
+BENIGN = {
+    "timestamp": "2025-11-15T11:02:10Z",
+    "src_ip": "203.0.113.77",
+    "dst_ip": "10.0.0.5",
+    "action": "ALLOW",
+    "message": "Inbound HTTPS request allowed",
+}
+SUSPICIOUS = dict(BENIGN, action="BLOCK", message="Failed password for root from 203.0.113.77")
+
+
+def make_feed(n_records: int, suspicious_every: int = 100) -> str:
+    return "\n".join(
+        json.dumps(SUSPICIOUS if i % suspicious_every == 0 else BENIGN) for i in range(n_records)
+    )
+
+
+def measure(fn, content):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(content)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    content = make_feed(n_records)
+    for name, fn in [("parse_logs", parse_logs), ("parse_logs_sparse", parse_logs_sparse)]:
+        elapsed, peak = measure(fn, content)
+        print(f"{name:>18}: {elapsed:6.2f}s  peak {peak / 1e6:8.1f} MB  ({peak / n_records:.0f} B/record)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Memory held by decoded records with and without a SymbolTable interning
+the repetitive fields (IPs, users, hosts, actions, messages). Run from the
+repository root:
+
+    python -m benchmarks.bench_interning [n_records]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from tools import SymbolTable, iter_logs
+from .common import sample_records
+
+
+def make_feed(n_records: int) -> bytes:
+    templates = sample_records()
+    lines = []
+    for i in range(n_records):
+        rec = dict(templates[i % len(templates)])
+        rec["seq"] = i
+        lines.append(json.dumps(rec))
+    return "\n".join(lines).encode("utf-8")
+
+
+def measure(content: bytes, symbols=None):
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = list(iter_logs(content, symbols=symbols))
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, elapsed, held
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    content = make_feed(n_records)
+    plain, plain_time, plain_held = measure(content)
+    symbols = SymbolTable()
+    interned, interned_time, interned_held = measure(content, symbols)
+    assert plain == interned
+    del plain, interned
+    for name, elapsed, held in [("plain", plain_time, plain_held), ("interned", interned_time, interned_held)]:
+        print(f"{name:>9}: {elapsed:6.2f}s  held {held / 1e6:8.1f} MB  ({held / n_records:.0f} B/record)")
+    print(f"{'':>9}  {symbols.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Decode throughput of each installed JSON backend on the sample_data schemas
+scaled up, both as JSONL lines and as one large JSON array. Run from the
+repository root:
+
+    python -m benchmarks.bench_json_backends [n_records]
+"""
+import json
+import sys
+import time
+
+from tools import available_decoders, get_decoder, iter_logs
+from benchmarks.common import sample_records
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    templates = sample_records()
+    records = [dict(templates[i % len(templates)], seq=i) for i in range(n_records)]
+    lines = [json.dumps(rec).encode("utf-8") for rec in records]
+    jsonl = b"\n".join(lines)
+    array = json.dumps(records).encode("utf-8")
+    print(f"{n_records:,} records, {len(jsonl) / 1e6:.1f} MB JSONL")
+
+    for name in available_decoders():
+        decoder = get_decoder(name)
+
+        start = time.perf_counter()
+        for line in lines:
+            decoder.loads(line)
+        raw = time.perf_counter() - start
+
+        start = time.perf_counter()
+        n = sum(1 for _ in iter_logs(jsonl, decoder=decoder))
+        stream = time.perf_counter() - start
+        assert n == n_records
+
+        start = time.perf_counter()
+        n = sum(1 for _ in iter_logs(array, decoder=decoder))
+        arr = time.perf_counter() - start
+        assert n == n_records
+
+        print(
+            f"{name:>9}: loads {n_records / raw:>11,.0f} rec/s | "
+            f"iter_logs JSONL {n_records / stream:>10,.0f} rec/s | "
+            f"iter_logs array {n_records / arr:>10,.0f} rec/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Speedup curve for parallel JSONL parsing. Run from the repository root:
+
+    python -m benchmarks.bench_parallel_parse [n_records]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tools import parse_file_parallel
+from benchmarks.common import write_jsonl
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, *[w for w in (2, 4, 8, 16, 32, 64) if w <= cpus], cpus})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.jsonl"
+        size = write_jsonl(path, n_records)
+        print(f"{n_records:,} records, {size / 1e6:.1f} MB")
+
+        baseline = None
+        for workers in counts:
+            start = time.perf_counter()
+            records = parse_file_parallel(path, workers)
+            elapsed = time.perf_counter() - start
+            assert len(records) == n_records
+            baseline = baseline or elapsed
+            print(
+                f"workers={workers:>3}  {elapsed:7.2f}s  "
+                f"{n_records / elapsed:>12,.0f} rec/s  speedup x{baseline / elapsed:.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
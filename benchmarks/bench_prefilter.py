@@ -0,0 +1,48 @@
+"""
+iter_tagged with and without the byte-level LinePrefilter on a mostly
+benign firewall feed (JSONL). Run from the repository root:
+
+    python -m benchmarks.bench_prefilter [n_records]
+"""
+import sys
+import time
+
+from tools import iter_tagged
+from tools.prefilter import LinePrefilter
+from tools.tag_rules import default_rules
+from .bench_copy_free import make_feed
+
+
+def suspicious(content: bytes, prefilter=None):
+    return [(rec, tags) for rec, tags in iter_tagged(content, prefilter=prefilter) if tags]
+
+
+def main():
+    n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    content = make_feed(n_records).encode("utf-8")
+    rules = default_rules()
+
+    start = time.perf_counter()
+    full = suspicious(content)
+    full_time = time.perf_counter() - start
+
+    prefilter = LinePrefilter(rules)
+    start = time.perf_counter()
+    filtered = suspicious(content, prefilter)
+    filtered_time = time.perf_counter() - start
+
+    decoding = LinePrefilter(rules, decode_skipped=True)
+    start = time.perf_counter()
+    decoded = suspicious(content, decoding)
+    decoded_time = time.perf_counter() - start
+
+    assert full == filtered == decoded
+    print(f"{'full decode':>14}: {n_records / full_time:>12,.0f} lines/s")
+    print(f"{'prefiltered':>14}: {n_records / filtered_time:>12,.0f} lines/s  "
+          f"({prefilter.skipped:,} of {prefilter.lines:,} lines never decoded)")
+    print(f"{'decode skipped':>14}: {n_records / decoded_time:>12,.0f} lines/s  "
+          f"({decoding.skipped:,} lines decoded but never tagged)")
+
+
+if __name__ == "__main__":
+    main()
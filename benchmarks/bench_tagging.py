@@ -0,0 +1,51 @@
+"""
+Tagging throughput with the default rule file vs. a synthetic rule set of
+several thousand keywords. Run from the repository root:
+
+    python -m benchmarks.bench_tagging
+"""
+import random
+import string
+import time
+
+from tools import TagRule, TagRuleSet, load_rules
+from config import TAG_RULES_PATH
+
+MESSAGES = [
+    "Failed password for invalid user admin from 185.243.12.44 port 51422 ssh2",
+    "Accepted password for alice from 192.0.2.5 port 41111 ssh2",
+    "Inbound HTTPS request allowed",
+    "Connection attempt blocked from known malicious IP",
+    "sudo: mark : user NOT in sudoers ; TTY=pts/1 ; PWD=/home/mark",
+    "Suspicious TCP connection attempts exceeding threshold",
+]
+
+
+def synthetic_rules(n: int, seed: int = 7) -> TagRuleSet:
+    rng = random.Random(seed)
+    rules = [r for r in load_rules(TAG_RULES_PATH).rules]
+    for i in range(n):
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14)))
+        rules.append(TagRule(f"synthetic_{i}", any=[word]))
+    return TagRuleSet(rules)
+
+
+def bench(rules: TagRuleSet, n_messages: int = 200_000) -> float:
+    messages = [MESSAGES[i % len(MESSAGES)] for i in range(n_messages)]
+    start = time.perf_counter()
+    for msg in messages:
+        rules.tag(msg)
+    return n_messages / (time.perf_counter() - start)
+
+
+def main():
+    for label, rules in [
+        ("default", load_rules(TAG_RULES_PATH)),
+        ("1k keywords", synthetic_rules(1_000)),
+        ("5k keywords", synthetic_rules(5_000)),
+    ]:
+        print(f"{label:>12}: {bench(rules):>12,.0f} messages/s ({len(rules.keywords)} keywords)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Per-record tagging (parse_logs) vs. the column-wise path
+(parse_logs_vectorized) on a synthetic JSONL input. Run from the
+repository root:
+
+    python -m benchmarks.bench_vectorized
+"""
+import json
+import time
+
+from tools import parse_logs, parse_logs_vectorized
+from .common import sample_records
+
+
+def synthetic_jsonl(n_records: int) -> str:
+    templates = sample_records()
+    return "\n".join(json.dumps(templates[i % len(templates)]) for i in range(n_records))
+
+
+def bench(fn, content: str, n_records: int) -> float:
+    start = time.perf_counter()
+    fn(content)
+    return n_records / (time.perf_counter() - start)
+
+
+def main():
+    n = 500_000
+    content = synthetic_jsonl(n)
+    assert parse_logs(content) == parse_logs_vectorized(content)
+    for label, fn in [("parse_logs", parse_logs), ("vectorized", parse_logs_vectorized)]:
+        print(f"{label:>12}: {bench(fn, content, n):>12,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Volumetric detection over a synthetic hour of traffic: random background
+events plus one burst against a single destination. Reports throughput,
+sketch memory and what was flagged. Run from the repository root:
+
+    python -m benchmarks.bench_volumetric [n_events]
+"""
+import sys
+import time
+
+import numpy as np
+
+from tools import VolumetricDetector
+
+NS = 10 ** 9
+START = 1_700_000_000 * NS
+HOUR = 3_600
+
+
+def make_events(n_events: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    epochs = START + rng.integers(0, HOUR * NS, n_events)
+    dst = rng.integers(0, 100_000, n_events)
+    # 60 s burst of 200 events/s at one destination, half an hour in
+    burst = START + ((HOUR // 2) + rng.uniform(0, 60, 12_000)) * NS
+    epochs = np.concatenate((epochs, burst.astype(np.int64)))
+    dst = np.concatenate((dst, np.full(len(burst), -2)))
+    src = rng.integers(0, 1_000_000, len(epochs))
+    nbytes = rng.integers(40, 1_500, len(epochs)).astype(np.float64)
+    return epochs, src, dst, nbytes
+
+
+def main():
+    n_events = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    epochs, src, dst, nbytes = make_events(n_events)
+    detector = VolumetricDetector()
+    start = time.perf_counter()
+    detector.observe(epochs, nbytes, {"dst_ip": (dst, str), "src_ip": (src, str)})
+    elapsed = time.perf_counter() - start
+    memory = detector.fast.table.nbytes + detector.slow.table.nbytes
+    print(f"{len(epochs):,} events in {elapsed:.2f}s ({len(epochs) / elapsed:,.0f} events/s)")
+    print(f"sketch memory {memory / 1e6:.1f} MB  {detector.stats()}")
+    for finding in detector.findings(5):
+        print(f"  {finding}")
+
+
+if __name__ == "__main__":
+    main()
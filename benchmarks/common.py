@@ -0,0 +1,34 @@
+"""
+Helpers shared by the benchmark scripts.
+"""
+import json
+from pathlib import Path
+from typing import List, Dict, Any
+
+SAMPLE_DIR = Path(__file__).resolve().parent.parent / "sample_data"
+
+
+def sample_records() -> List[Dict[str, Any]]:
+    """
+    All records from sample_data/, used as templates for synthetic inputs.
+    """
+    records: List[Dict[str, Any]] = []
+    for f in sorted(SAMPLE_DIR.glob("*.json")):
+        data = json.loads(f.read_text(encoding="utf-8"))
+        records.extend(data if isinstance(data, list) else [data])
+    return records
+
+
+def write_jsonl(path: Path, n_records: int) -> int:
+    """
+    Writes n_records scaled up from the sample schemas as JSONL.
+    Returns the file size in bytes.
+    """
+    templates = sample_records()
+    with open(path, "w", encoding="utf-8") as fh:
+        for i in range(n_records):
+            rec = dict(templates[i % len(templates)])
+            rec["seq"] = i
+            fh.write(json.dumps(rec))
+            fh.write("\n")
+    return path.stat().st_size
@@ -14,6 +14,167 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "YOUR_API_KEY_HERE")  # DO NOT COMM
 ABUSEIPDB_API_KEY = os.getenv("ABUSEIPDB_API_KEY", "SET_ME")
 VIRUSTOTAL_API_KEY = os.getenv("VIRUSTOTAL_API_KEY", "SET_ME")
 OTX_API_KEY = os.getenv("OTX_API_KEY", "SET_ME")
+# IPs looked up per run, most active first (0 = all)
+THREAT_INTEL_MAX_IPS = int(os.getenv("THREAT_INTEL_MAX_IPS", "0"))
+
+# ---- Log parsing ----
+TAG_RULES_PATH = os.getenv(
+    "TAG_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "tag_rules.json")
+)
+# Field-predicate rules (tools.rule_engine), applied alongside the keyword rules.
+# Unset by default, so the suspicious set is the keyword rules' alone; point it
+# at e.g. rules/field_rules.example.json to also tag blocked firewall records,
+# FAILED results, large transfers etc. (many more suspicious records, hence
+# more threat-intel lookups and longer prompts)
+FIELD_RULES_PATH = os.getenv("FIELD_RULES_PATH", "")
+# Per-source field mappings onto the canonical schema (one JSON file per source)
+NORMALIZER_MAPPINGS_DIR = os.getenv(
+    "NORMALIZER_MAPPINGS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules", "mappings")
+)
+# JSON decoding backend: auto | orjson | simdjson | stdlib
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")
+
+# Worker processes for parsing JSONL files (1 = parse in-process)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", "1"))
+
+# Triage mode: count benign records into aggregate stats and keep only the
+# suspicious ones (1/true to enable)
+TRIAGE_MODE = os.getenv("TRIAGE_MODE", "0").lower() in ("1", "true", "yes")
+# Distinct keys kept per triage breakdown (source / action / hour / tag)
+TRIAGE_MAX_KEYS = int(os.getenv("TRIAGE_MAX_KEYS", "1000"))
+# In triage mode, skip JSONL lines no rule can match before decoding them
+# (byte-level prefilter); optionally keep their byte offsets
+TRIAGE_PREFILTER = os.getenv("TRIAGE_PREFILTER", "1").lower() in ("1", "true", "yes")
+PREFILTER_KEEP_OFFSETS = os.getenv("PREFILTER_KEEP_OFFSETS", "0").lower() in ("1", "true", "yes")
+# Opt-in: still decode the lines the prefilter rules out (skipping only the
+# rules), so top talkers, fan-out, volumetric and beaconing detection see every
+# record. Off by default: only candidate lines are decoded, and scans or floods
+# made of benign-looking lines are missed in triage mode
+PREFILTER_DECODE_SKIPPED = os.getenv("PREFILTER_DECODE_SKIPPED", "0").lower() in ("1", "true", "yes")
+
+# Sampling mode for oversized inputs: keep suspicious records up to a cap
+# plus a stratified (per source and hour) sample of the rest (1/true to enable)
+SAMPLE_MODE = os.getenv("SAMPLE_MODE", "0").lower() in ("1", "true", "yes")
+SAMPLE_SUSPICIOUS_CAP = int(os.getenv("SAMPLE_SUSPICIOUS_CAP", "500"))
+SAMPLE_PER_STRATUM = int(os.getenv("SAMPLE_PER_STRATUM", "3"))
+SAMPLE_MAX_STRATA = int(os.getenv("SAMPLE_MAX_STRATA", "200"))
+# Fixed seed for reproducible samples (unset: a new sample every run)
+SAMPLE_SEED = int(os.environ["SAMPLE_SEED"]) if os.getenv("SAMPLE_SEED") else None
+
+# ---- Authentication failure correlation ----
+# Tags that mark a record as a failed login
+AUTH_FAILURE_TAGS = [
+    t.strip() for t in os.getenv("AUTH_FAILURE_TAGS", "auth_failure,failed_logon").split(",") if t.strip()
+]
+# Sliding window (seconds) failures are counted over, per source IP and per account
+AUTH_WINDOW_SECONDS = float(os.getenv("AUTH_WINDOW_SECONDS", "300"))
+# Failures from one IP within the window that make a brute-force finding
+BRUTE_FORCE_THRESHOLD = int(os.getenv("BRUTE_FORCE_THRESHOLD", "10"))
+# Distinct accounts one IP fails against within the window (password spray)
+SPRAY_USER_THRESHOLD = int(os.getenv("SPRAY_USER_THRESHOLD", "5"))
+# Failures against one account within the window, from any IPs
+ACCOUNT_ATTACK_THRESHOLD = int(os.getenv("ACCOUNT_ATTACK_THRESHOLD", "10"))
+# IPs / accounts tracked at once (least recently seen are dropped first)
+AUTH_MAX_KEYS = int(os.getenv("AUTH_MAX_KEYS", "100000"))
+
+# ---- Beaconing detection ----
+# Connections a (src, dst) pair needs before its timing is judged
+BEACON_MIN_CONNECTIONS = int(os.getenv("BEACON_MIN_CONNECTIONS", "10"))
+# Pairs whose mean gap is shorter (seconds) are bursts, not beacons
+BEACON_MIN_INTERVAL = float(os.getenv("BEACON_MIN_INTERVAL", "1"))
+# Score (0..1) from which a pair is reported as a likely beacon
+BEACON_MIN_SCORE = float(os.getenv("BEACON_MIN_SCORE", "0.7"))
+# Time slots per pair for the FFT period estimate
+BEACON_FFT_BINS = int(os.getenv("BEACON_FFT_BINS", "1024"))
+# Relative gap between the FFT period and the mean interval that still agrees
+BEACON_PERIOD_TOLERANCE = float(os.getenv("BEACON_PERIOD_TOLERANCE", "0.1"))
+# Connections kept for beaconing in triage / sampling mode (24 bytes each);
+# later ones are counted as dropped and not scored
+BEACON_MAX_EVENTS = int(os.getenv("BEACON_MAX_EVENTS", "2000000"))
+
+# ---- Volumetric detection ----
+# Count-min sketch error bounds: estimates exceed the true count by more than
+# VOLUME_EPSILON x total traffic with probability at most VOLUME_DELTA
+VOLUME_EPSILON = float(os.getenv("VOLUME_EPSILON", "0.001"))
+VOLUME_DELTA = float(os.getenv("VOLUME_DELTA", "0.01"))
+# Half-lives (seconds) of the current rate and of the rolling baseline
+VOLUME_FAST_HALF_LIFE = float(os.getenv("VOLUME_FAST_HALF_LIFE", "10"))
+VOLUME_SLOW_HALF_LIFE = float(os.getenv("VOLUME_SLOW_HALF_LIFE", "600"))
+# A key spikes at VOLUME_SPIKE_FACTOR x its baseline and VOLUME_MIN_RATE events/s
+VOLUME_SPIKE_FACTOR = float(os.getenv("VOLUME_SPIKE_FACTOR", "5"))
+VOLUME_MIN_RATE = float(os.getenv("VOLUME_MIN_RATE", "5"))
+# Events/s per key reported as a flood whatever the baseline
+VOLUME_FLOOD_RATE = float(os.getenv("VOLUME_FLOOD_RATE", "100"))
+# Keys reported at most (weakest dropped first)
+VOLUME_MAX_FINDINGS = int(os.getenv("VOLUME_MAX_FINDINGS", "100"))
+
+# ---- Heavy hitters ----
+# Canonical fields whose most frequent values are tracked (top talkers / targets)
+TOPK_FIELDS = [f.strip() for f in os.getenv("TOPK_FIELDS", "src.ip,dst.ip,user.name").split(",") if f.strip()]
+# Counters per field (Space-Saving): values above total / TOPK_CAPACITY are always kept
+TOPK_CAPACITY = int(os.getenv("TOPK_CAPACITY", "1000"))
+# Values per field passed on to the prompts
+TOPK_REPORT_LIMIT = int(os.getenv("TOPK_REPORT_LIMIT", "10"))
+
+# ---- Fan-out / fan-in detection ----
+# HyperLogLog precision: 2^HLL_PRECISION one-byte registers per tracked
+# entity, distinct counts within about 1.04 / sqrt(2^HLL_PRECISION)
+HLL_PRECISION = int(os.getenv("HLL_PRECISION", "10"))
+# Distinct destination IPs / destination ports one source IP reaches (scans)
+FAN_HOST_SCAN_THRESHOLD = int(os.getenv("FAN_HOST_SCAN_THRESHOLD", "100"))
+FAN_PORT_SCAN_THRESHOLD = int(os.getenv("FAN_PORT_SCAN_THRESHOLD", "100"))
+# Distinct accounts one source IP fails to log in as (password spray, whole input)
+FAN_SPRAY_THRESHOLD = int(os.getenv("FAN_SPRAY_THRESHOLD", "20"))
+# Distinct source IPs hitting one destination IP (distributed flood)
+FAN_FLOOD_THRESHOLD = int(os.getenv("FAN_FLOOD_THRESHOLD", "500"))
+# Entities sketched at once per dimension (least recently seen are dropped first)
+FAN_MAX_KEYS = int(os.getenv("FAN_MAX_KEYS", "20000"))
+
+# ---- Follow mode ----
+# Committed read offsets of followed files (JSON, rewritten atomically)
+FOLLOW_STATE_PATH = os.getenv("FOLLOW_STATE_PATH", ".follow_offsets.json")
+# Seconds to wait when no followed file has grown
+FOLLOW_INTERVAL = float(os.getenv("FOLLOW_INTERVAL", "2"))
+# Upper bound (roughly) on the bytes handed to the pipeline per batch
+FOLLOW_MAX_BATCH_BYTES = int(os.getenv("FOLLOW_MAX_BATCH_BYTES", str(8 << 20)))
+
+# ---- Log template mining ----
+TEMPLATE_SIM_THRESHOLD = float(os.getenv("TEMPLATE_SIM_THRESHOLD", "0.5"))
+TEMPLATE_DEPTH = int(os.getenv("TEMPLATE_DEPTH", "4"))
+TEMPLATE_MAX_CHILDREN = int(os.getenv("TEMPLATE_MAX_CHILDREN", "100"))
+TEMPLATE_MAX_CLUSTERS = int(os.getenv("TEMPLATE_MAX_CLUSTERS", "1000"))
+# Templates passed on to the LLM prompts, most frequent first
+TEMPLATE_PROMPT_LIMIT = int(os.getenv("TEMPLATE_PROMPT_LIMIT", "50"))
+# Suspicious records quoted in the prompts: one per template, most frequent first
+SUSPICIOUS_PROMPT_SAMPLE = int(os.getenv("SUSPICIOUS_PROMPT_SAMPLE", "20"))
+
+# ---- Deduplication ----
+# Comma-separated fields left out of a record's identity
+DEDUP_IGNORE_FIELDS = [f.strip() for f in os.getenv("DEDUP_IGNORE_FIELDS", "").split(",") if f.strip()]
+# Comma-separated case-insensitive fields (hostnames, email addresses) whose
+# values are lowercased for a record's identity; other strings keep their case
+DEDUP_CASELESS_FIELDS = [
+    f.strip() for f in os.getenv("DEDUP_CASELESS_FIELDS", "host,hostname,computer,from,to,email").split(",") if f.strip()
+]
+# Records differing only by this many seconds in timestamp count as duplicates
+DEDUP_TIMESTAMP_TOLERANCE = float(os.getenv("DEDUP_TIMESTAMP_TOLERANCE", "1"))
+# Distinct records remembered at once (oldest forgotten first)
+DEDUP_MAX_KEYS = int(os.getenv("DEDUP_MAX_KEYS", "100000"))
+
+# ---- Symbol table ----
+# Comma-separated fields whose string values are interned in the session's
+# symbol table (IPs, users, hosts, actions, messages)
+INTERN_FIELDS = [
+    f.strip()
+    for f in os.getenv(
+        "INTERN_FIELDS",
+        "src_ip,dst_ip,source_ip,destination_ip,sourceIPAddress,ip,"
+        "user,username,user_name,userName,host,hostname,computer,action,eventName,message",
+    ).split(",")
+    if f.strip()
+]
+# Distinct values a session's symbol table holds; later new values stay as decoded
+INTERN_MAX_SYMBOLS = int(os.getenv("INTERN_MAX_SYMBOLS", "200000"))
 
 # ---- Logging / Observability ----
 logging.basicConfig(
@@ -53,4 +214,7 @@ class SessionState:
     def get_memory(self, session_id: str, key: str, default=None):
         return self.sessions[session_id].get("memory", {}).get(key, default)
 
+    def clear_session(self, session_id: str):
+        self.sessions.pop(session_id, None)
+
 session_state = SessionState()
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File
 from uuid import uuid4
 
 from agents import LogAnalystAgent, ThreatIntelAgent, ResponseAgent, ReportAgent
 from config import get_logger
+from tools import CorruptCompressionError, UnsupportedCompressionError, open_decompressed
 
 app = FastAPI(title="AI Security Analyst Assistant")
 
@@ -17,9 +18,13 @@ async def investigate(file: UploadFile = File(...)):
     trace_id = str(uuid4())
     logger = get_logger("API", trace_id)
 
-    # Read uploaded file
-    content_bytes = await file.read()
-    log_text = content_bytes.decode("utf-8", errors="ignore")
+    # Stream the uploaded file (decompressing gzip/bz2/xz/zstd on the fly);
+    # the parser works on the raw bytes directly
+    await file.seek(0)
+    try:
+        log_stream = open_decompressed(file.file)
+    except UnsupportedCompressionError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     session_id = trace_id
 
     logger.info("Starting investigation pipeline")
@@ -30,8 +35,12 @@ async def investigate(file: UploadFile = File(...)):
     a3 = ResponseAgent(trace_id)
     a4 = ReportAgent(trace_id)
 
-    # 1) Log analysis (NOW PASS log_text)
-    log_result = a1.run(session_id, log_text)
+    # 1) Log analysis (raw bytes, parsed as a stream)
+    try:
+        log_result = a1.run(session_id, log_stream)
+    except CorruptCompressionError as e:
+        logger.warning(f"Rejected upload: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
 
     # 2) Threat intel (async)
     intel_result = await a2.run_async(session_id)
@@ -1,46 +1,52 @@
+import argparse
+import io
 import json
 from pathlib import Path
 from uuid import uuid4
 
 from agents import LogAnalystAgent, ThreatIntelAgent, ResponseAgent, ReportAgent
 from evaluation.evaluator import SimpleEvaluator
-from config import get_logger
+from tools import LogFollower, UnreadableLogError
+from config import FOLLOW_STATE_PATH, PARSE_WORKERS, SAMPLE_MODE, TRIAGE_MODE, get_logger, session_state
 
 
 def load_all_samples():
     """
-    Loads all JSON files inside sample_data/ and returns a dict:
+    Finds all log files inside sample_data/ (JSON, JSONL, syslog, CEF,
+    LEEF or CSV, optionally gzip/bz2/xz/zstd compressed; format and
+    compression are sniffed per file) and returns a dict:
     {
-        "filename.json": "<raw log text>",
+        "filename.json": Path("sample_data/filename.json"),
         ...
     }
+
+    Files are not read here; each one is memory-mapped (or decompressed
+    as a stream) and fed through the parser only while its own pipeline
+    runs.
     """
     folder = Path("sample_data")
-    files = list(folder.glob("*.json"))
-
-    samples = {}
-    for f in files:
-        try:
-            samples[f.name] = f.read_text(encoding="utf-8")
-        except Exception as e:
-            print(f"Could not read {f}: {e}")
+    files = sorted(folder.iterdir()) if folder.is_dir() else []
 
-    return samples
+    return {f.name: f for f in files if f.is_file() and not f.name.startswith(".")}
 
 
-def run_pipeline_on_log(logs_text: str, trace_id: str):
+def run_pipeline_on_log(logs, trace_id: str, triage: bool = TRIAGE_MODE, sample: bool = SAMPLE_MODE):
     """
     Runs the full agent pipeline on a single log file.
+    `logs` may be the raw text, an open file handle or a Path; JSONL
+    paths are parsed with PARSE_WORKERS processes. With `triage`, benign
+    records are only counted; with `sample`, the later stages get a
+    bounded, stratified sample.
     """
     session_id = trace_id
 
-    a1 = LogAnalystAgent(trace_id)
+    a1 = LogAnalystAgent(trace_id, triage=triage, sample=sample)
     a2 = ThreatIntelAgent(trace_id)
     a3 = ResponseAgent(trace_id)
     a4 = ReportAgent(trace_id)
 
     # 1) Log Analysis
-    log_result = a1.run(session_id, logs_text)
+    log_result = a1.run(session_id, logs)
 
     # 2) Threat Intel
     intel_result = a2.run(session_id)   # sync version OK in CLI
@@ -64,9 +70,86 @@ def run_pipeline_on_log(logs_text: str, trace_id: str):
     }
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI Security Analyst Assistant - Batch Mode")
+    parser.add_argument(
+        "--triage",
+        action="store_true",
+        default=TRIAGE_MODE,
+        help="keep only suspicious records; benign ones are counted into stats",
+    )
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        default=SAMPLE_MODE,
+        help="for oversized inputs: keep suspicious records up to a cap plus a "
+             "stratified sample of the rest, reporting exact dropped counts",
+    )
+    parser.add_argument(
+        "--follow",
+        nargs="+",
+        metavar="PATH",
+        help="tail these log files and analyse new lines as they are written "
+             f"(offsets are kept in {FOLLOW_STATE_PATH}, so a restart resumes)",
+    )
+    parser.add_argument(
+        "--from-end",
+        action="store_true",
+        help="with --follow, start files without a saved offset at their end",
+    )
+    return parser.parse_args()
+
+
+def print_results(results):
+    print("\n=== LOG SUMMARY ===")
+    print(results["log_summary"])
+
+    print("\n=== THREAT INTEL (per IP) ===")
+    print(json.dumps(results["intel"], indent=2))
+
+    print("\n=== RESPONSE RECOMMENDATION ===")
+    print(json.dumps(results["response"], indent=2))
+
+    print("\n=== INCIDENT REPORT ===")
+    print(results["report"]["incident_report"])
+
+    print("\n=== EVALUATION ===")
+    print(json.dumps(results["evaluation"], indent=2))
+
+
+def follow(paths, triage: bool, sample: bool, from_end: bool):
+    """
+    Runs the pipeline on every batch of new lines in the followed files.
+    A batch's offset is committed only after its pipeline finished, so an
+    interrupted batch is analysed again on restart.
+    """
+    logger = get_logger("Main", "CLI")
+    follower = LogFollower(paths, FOLLOW_STATE_PATH, from_end)
+    logger.info(f"Following {len(follower.followers)} file(s); offsets in {FOLLOW_STATE_PATH}")
+    try:
+        for path, data in follower.batches():
+            trace_id = str(uuid4())
+            print("\n" + "=" * 80)
+            print(f"📝 New lines in: {path} ({len(data)} bytes)")
+            print("=" * 80)
+            print_results(run_pipeline_on_log(io.BytesIO(data), trace_id, triage=triage, sample=sample))
+            session_state.clear_session(trace_id)
+    except KeyboardInterrupt:
+        logger.info("Stopped following")
+
+
 def main():
+    args = parse_args()
     logger = get_logger("Main", "CLI")
     logger.info("Starting AI Security Analyst Assistant - Batch Mode")
+    logger.info(f"Parsing with {PARSE_WORKERS} worker process(es)")
+    if args.triage:
+        logger.info("Triage mode: benign records are counted, not kept")
+    if args.sample:
+        logger.info("Sampling mode: suspicious records capped, the rest sampled per source and hour")
+    if args.follow:
+        follow(args.follow, args.triage, args.sample, args.from_end)
+        return
 
     # Load all sample logs
     samples = load_all_samples()
@@ -78,31 +161,27 @@ def main():
     print(f"Found {len(samples)} sample log files.\n")
 
     # Run pipeline for each log file
-    for filename, logs_text in samples.items():
+    for filename, path in samples.items():
         trace_id = str(uuid4())
         print("\n" + "=" * 80)
         print(f"📝 Processing: {filename}")
         print("=" * 80)
 
-        results = run_pipeline_on_log(logs_text, trace_id)
-
-        print("\n=== LOG SUMMARY ===")
-        print(results["log_summary"])
-
-        print("\n=== THREAT INTEL (per IP) ===")
-        print(json.dumps(results["intel"], indent=2))
-
-        print("\n=== RESPONSE RECOMMENDATION ===")
-        print(json.dumps(results["response"], indent=2))
-
-        print("\n=== INCIDENT REPORT ===")
-        print(results["report"]["incident_report"])
-
-        print("\n=== EVALUATION ===")
-        print(json.dumps(results["evaluation"], indent=2))
+        # Only a file that cannot be opened is skipped: any other OSError
+        # from inside the pipeline is a bug to surface
+        try:
+            results = run_pipeline_on_log(path, trace_id, triage=args.triage, sample=args.sample)
+        except UnreadableLogError as e:
+            print(e)
+            session_state.clear_session(trace_id)
+            continue
+        print_results(results)
 
         print("\nFinished Processing:", filename)
 
+        # Keep batch memory bounded by the file being processed
+        session_state.clear_session(trace_id)
+
 
 if __name__ == "__main__":
     main()
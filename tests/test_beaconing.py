@@ -0,0 +1,48 @@
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from tools import BeaconCollector, detect_beacons, iter_tagged, parse_batch, sample, triage
+
+START = datetime(2025, 11, 15, 11, 0, tzinfo=timezone.utc)
+
+
+def _feed() -> str:
+    rng = random.Random(0)
+    records = []
+    # Implant calling home every 60 s with a little jitter
+    for i in range(120):
+        ts = START + timedelta(seconds=60 * i + rng.uniform(-0.5, 0.5))
+        records.append((ts, "10.0.0.7", "203.0.113.50"))
+    # Irregular browsing from the same host
+    for _ in range(500):
+        ts = START + timedelta(seconds=rng.uniform(0, 7200))
+        records.append((ts, "10.0.0.7", f"198.51.100.{rng.randrange(5)}"))
+    records.sort()
+    return "\n".join(
+        json.dumps({"timestamp": ts.isoformat(), "src_ip": src, "dst_ip": dst, "action": "ALLOW"})
+        for ts, src, dst in records
+    )
+
+
+def _pairs(findings):
+    return [(f["src_ip"], f["dst_ip"], f["connections"]) for f in findings]
+
+
+def test_streaming_matches_batch():
+    content = _feed()
+    batch = detect_beacons(parse_batch(content), "network")
+    assert _pairs(batch) == [("10.0.0.7", "203.0.113.50", 120)]
+
+    triaged, sampled = BeaconCollector(), BeaconCollector()
+    triage(iter_tagged(content), beacons=triaged)
+    sample(iter_tagged(content), beacons=sampled)
+    for collector in (triaged, sampled):
+        assert len(collector) == 620 and collector.dropped == 0
+        assert collector.findings() == batch
+
+
+def test_connections_past_the_cap_are_counted_as_dropped():
+    collector = BeaconCollector(max_events=100)
+    triage(iter_tagged(_feed()), beacons=collector)
+    assert (len(collector), collector.dropped) == (100, 520)
@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pytest
+
+from tools import FanDetector, HyperLogLog, LogBatch, default_normalizer
+from tools.volumetric import key_ids
+
+
+@pytest.mark.parametrize("precision", [10, 14])
+@pytest.mark.parametrize("n", [1_000, 20_000, 200_000])
+def test_estimate_within_error_bound(precision, n):
+    sketch = HyperLogLog(precision)
+    sketch.add_hashes(key_ids(f"10.{i >> 16}.{(i >> 8) & 255}.{i & 255}" for i in range(n)).view(np.uint64))
+    # Standard error 1.04 / sqrt(m); four of them is a fixed-seed safety margin
+    assert abs(sketch.count() - n) <= 4 * 1.04 / math.sqrt(1 << precision) * n
+
+
+def test_small_counts_are_near_exact():
+    sketch = HyperLogLog(10)
+    for i in range(50):
+        sketch.add(f"user{i}")
+        sketch.add(f"user{i}")
+    assert abs(sketch.count() - 50) <= 1
+
+
+def test_add_and_add_hashes_fill_the_same_registers():
+    values = [f"198.51.100.{i}" for i in range(256)] + ["443"]
+    one, bulk = HyperLogLog(8), HyperLogLog(8)
+    for value in values:
+        one.add(value)
+    bulk.add_hashes(key_ids(values).view(np.uint64))
+    assert (one.registers == bulk.registers).all()
+
+
+def test_equal_numbers_count_once():
+    sketch, port = HyperLogLog(8), HyperLogLog(8)
+    for value in (443, 443.0, "443"):
+        sketch.add(value)
+    port.add("443")
+    assert (sketch.registers == port.registers).all()
+
+
+def test_merge_is_the_union():
+    left, right, both = HyperLogLog(12), HyperLogLog(12), HyperLogLog(12)
+    for i in range(6000):
+        (left if i < 4000 else right).add(i)
+        both.add(i)
+    for i in range(2000, 4000):
+        right.add(i)
+    left.merge(right)
+    assert (left.registers == both.registers).all()
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(10))
+
+
+def test_precision_is_validated():
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+
+
+def test_fan_detector_batch_and_events_agree():
+    records = [{"src_ip": "198.51.100.9", "dst_ip": f"10.0.{i // 250}.{i % 250}", "dst_port": 443} for i in range(300)]
+    records += [{"src_ip": f"203.0.113.{i % 200}", "dst_ip": "10.9.9.9", "dst_port": i} for i in range(200)]
+    by_batch, by_event = FanDetector(thresholds={"srcs_per_dst": 150}), FanDetector(thresholds={"srcs_per_dst": 150})
+    by_batch.add_batch(LogBatch.from_records(records), "network")
+    for ev in default_normalizer().normalize_records(records):
+        by_event.add_event(ev)
+    assert by_batch.findings() == by_event.findings()
+    assert {(f["type"], f.get("src_ip", f.get("dst_ip"))) for f in by_batch.findings()} >= {
+        ("host_scan", "198.51.100.9"), ("distributed_flood", "10.9.9.9")
+    }
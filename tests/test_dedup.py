@@ -0,0 +1,18 @@
+from tools import Deduplicator, dedup_records
+
+REC = {"timestamp": "2025-11-16T12:00:00Z", "host": "WEB-01", "user": "Admin",
+       "message": "Failed  password for Admin"}
+
+
+def test_whitespace_collapses_but_case_is_kept():
+    spaced = dict(REC, message="Failed password   for Admin")
+    other_case = dict(REC, user="admin", message="Failed password for admin")
+    unique = dedup_records([REC, spaced, other_case])
+    assert [rep["dup_count"] for rep in unique] == [2, 1]
+
+
+def test_caseless_fields_are_lowercased():
+    dedup = Deduplicator()
+    assert dedup.key(REC) == dedup.key(dict(REC, host="web-01"))
+    assert Deduplicator(caseless_fields=()).key(REC) != dedup.key(dict(REC, host="web-01"))
+    assert Deduplicator(caseless_fields=("user",)).key(REC) == Deduplicator(caseless_fields=("user",)).key(dict(REC, user="ADMIN"))
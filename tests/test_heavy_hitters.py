@@ -0,0 +1,62 @@
+import random
+from collections import Counter
+
+import pytest
+
+from tools import HeavyHitters, LogBatch, SpaceSaving, default_normalizer
+
+
+def _stream(n=50_000, seed=0):
+    rng = random.Random(seed)
+    return [int(rng.paretovariate(1.1)) for _ in range(n)]
+
+
+def _check_bounds(summary, true):
+    for key, count, error in summary.top():
+        assert count - error <= true[key] <= count
+    assert len(summary) <= summary.capacity
+
+
+@pytest.mark.parametrize("capacity", [10, 100])
+def test_counts_bracket_the_true_count(capacity):
+    stream = _stream()
+    summary = SpaceSaving(capacity)
+    for key in stream:
+        summary.add(key)
+    true = Counter(stream)
+    assert summary.total == len(stream)
+    _check_bounds(summary, true)
+    # Every key above total / capacity is tracked
+    assert all(key in summary for key, n in true.items() if n > len(stream) / capacity)
+    assert [k for k, _, _ in summary.top(5)] == [k for k, _ in true.most_common(5)]
+
+
+def test_weighted_adds_and_untracked_keys():
+    summary = SpaceSaving(2)
+    summary.add("a", 5)
+    summary.add("b", 3)
+    summary.add("c", 1)
+    assert summary.top() == [("a", 5, 0), ("c", 4, 3)]
+    assert summary.count("b") == 0 and summary.total == 9
+
+
+def test_merge_keeps_the_bounds():
+    stream = _stream(seed=1)
+    left, right = SpaceSaving(100), SpaceSaving(100)
+    for i, key in enumerate(stream):
+        (left if i % 2 else right).add(key)
+    left.merge(right)
+    true = Counter(stream)
+    assert left.total == len(stream)
+    _check_bounds(left, true)
+    assert [k for k, _, _ in left.top(5)] == [k for k, _ in true.most_common(5)]
+
+
+def test_batch_and_events_count_alike():
+    records = [{"src_ip": f"198.51.100.{i % 7}", "dst_ip": "10.0.0.1", "user": f"u{i % 3}"} for i in range(200)]
+    by_batch, by_event = HeavyHitters(capacity=50), HeavyHitters(capacity=50)
+    by_batch.add_batch(LogBatch.from_records(records), "network")
+    for ev in default_normalizer().normalize_records(records):
+        by_event.add_event(ev)
+    assert by_batch.to_dict() == by_event.to_dict()
+    assert by_batch.rank("dst.ip") == {"10.0.0.1": 200}
@@ -0,0 +1,40 @@
+import bz2
+import gzip
+import io
+import lzma
+import sys
+
+import pytest
+
+from tools import CorruptCompressionError, UnsupportedCompressionError, iter_logs, open_decompressed
+
+LINES = b"".join(b'{"src_ip": "198.51.100.%d", "message": "Failed password"}\n' % i for i in range(200))
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_compressed_streams_parse(compress):
+    with open_decompressed(io.BytesIO(compress(LINES))) as stream:
+        assert len(list(iter_logs(stream))) == 200
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_truncated_input_raises_one_error_type(compress):
+    data = compress(LINES)
+    with open_decompressed(io.BytesIO(data[: len(data) // 2])) as stream:
+        with pytest.raises(CorruptCompressionError, match="truncated"):
+            list(iter_logs(stream))
+
+
+@pytest.mark.parametrize("compress", [gzip.compress, bz2.compress, lzma.compress])
+def test_corrupt_input_raises_one_error_type(compress):
+    data = bytearray(compress(LINES))
+    data[20:40] = b"\xff" * 20
+    with open_decompressed(io.BytesIO(bytes(data))) as stream:
+        with pytest.raises(CorruptCompressionError):
+            list(iter_logs(stream))
+
+
+def test_zstd_without_zstandard_is_unsupported(monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(UnsupportedCompressionError, match="zstandard"):
+        open_decompressed(io.BytesIO(b"\x28\xb5\x2f\xfd" + b"\x00" * 16))
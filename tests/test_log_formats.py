@@ -0,0 +1,37 @@
+import csv
+
+import pytest
+
+from tools import iter_logs, parse_logs
+from tools.log_formats import iter_cef, iter_csv
+
+
+@pytest.mark.parametrize("epoch", ["1763204530", "1763204530123", "1763204530123456", "1763204530123456789"])
+def test_epoch_unit_follows_digit_count(epoch):
+    line = f"CEF:0|Vendor|FW|1.0|100|Blocked|5|src=198.51.100.9 rt={epoch}"
+    assert next(iter_cef([line]))["timestamp"] == "2025-11-15T11:02:10Z"
+
+
+def test_short_epoch_is_seconds():
+    line = "CEF:0|Vendor|FW|1.0|100|Blocked|5|rt=999999999"
+    assert next(iter_cef([line]))["timestamp"] == "2001-09-09T01:46:39Z"
+
+
+def test_csv_errors_propagate():
+    limit = csv.field_size_limit()
+    csv.field_size_limit(64)
+    try:
+        lines = ["src_ip,message\n", "198.51.100.1,first\n", "198.51.100.2," + "x" * 100 + "\n"]
+        with pytest.raises(csv.Error):
+            list(iter_csv(lines))
+    finally:
+        csv.field_size_limit(limit)
+
+
+def test_csv_quoted_field_spans_lines():
+    text = 'src_ip,message\r\n198.51.100.1,"Failed login\nfor admin"\r\n198.51.100.2,done\r\n'
+    expected = [{"src_ip": "198.51.100.1", "message": "Failed login\nfor admin"},
+                {"src_ip": "198.51.100.2", "message": "done"}]
+    expected = [dict(rec, tags=[]) for rec in expected]
+    assert list(iter_logs(text.encode())) == expected
+    assert parse_logs(text) == expected
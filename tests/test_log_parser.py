@@ -0,0 +1,48 @@
+import io
+import json
+
+from tools import iter_logs, parse_file_parallel, parse_logs, sniff_format
+
+RECORDS = [
+    {"timestamp": "2025-11-15T11:02:10Z", "src_ip": "203.0.113.77", "message": "Failed password for root"},
+    {"timestamp": "2025-11-15T11:02:11Z", "src_ip": "10.0.0.8", "message": "Inbound HTTPS request allowed"},
+]
+
+
+def _messages(records):
+    return [rec["message"] for rec in records]
+
+
+def test_jsonl_and_array_stream_like_parse_logs():
+    for text in ("\n".join(json.dumps(r) for r in RECORDS), json.dumps(RECORDS, indent=2)):
+        streamed = list(iter_logs(io.BytesIO(text.encode()), chunk_size=16))
+        assert streamed == parse_logs(text)
+        assert _messages(streamed) == _messages(RECORDS)
+
+
+def test_single_pretty_printed_object():
+    text = json.dumps(RECORDS[0], indent=2)
+    assert sniff_format(text.encode()) == "json_document"
+    streamed = list(iter_logs(io.BytesIO(text.encode()), chunk_size=8))
+    assert len(streamed) == 1
+    assert streamed == parse_logs(text)
+
+
+def test_single_object_file_path(tmp_path):
+    path = tmp_path / "one.json"
+    path.write_text(json.dumps(RECORDS[0], indent=4))
+    records = parse_file_parallel(path, workers=1)
+    assert _messages(records) == [RECORDS[0]["message"]]
+
+
+def test_one_line_objects_stay_jsonl():
+    text = json.dumps(RECORDS[0]) + "\n" + "{not json\n" + json.dumps(RECORDS[1]) + "\n"
+    assert sniff_format(text.encode()) == "jsonl"
+    assert _messages(iter_logs(io.BytesIO(text.encode()))) == _messages(RECORDS)
+
+
+def test_concatenated_pretty_objects_fall_back_to_lines():
+    # Not one JSON value: decoded line by line, as parse_logs does
+    text = json.dumps(RECORDS[0], indent=2) + "\n" + json.dumps(RECORDS[1]) + "\n"
+    assert _messages(iter_logs(io.BytesIO(text.encode()))) == [RECORDS[1]["message"]]
+    assert _messages(parse_logs(text)) == [RECORDS[1]["message"]]
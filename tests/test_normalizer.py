@@ -0,0 +1,74 @@
+from tools import HeavyHitters, LogBatch, default_normalizer, sample, tagged_from_records, triage
+from tools.normalizer import login_parties
+
+WINDOWS = {"timestamp": "2025-11-16T12:00:22Z", "event_id": 4740, "user": "john.doe",
+           "message": "A user account was locked out", "tags": ["account_lockout"]}
+EMAIL = {"timestamp": "2025-11-16T11:10:32Z", "from": "it@micros0ft.com", "to": "employee@company.com",
+         "subject": "Reset", "message": "Suspicious sender", "tags": ["phishing"]}
+FIREWALL = {"timestamp": "2025-11-16T11:00:00Z", "src_ip": "203.0.113.7", "dst_ip": "10.0.0.5",
+            "action": "ALLOW", "message": "Inbound HTTPS request allowed"}
+
+
+def _records():
+    return [dict(WINDOWS), dict(EMAIL), dict(FIREWALL)]
+
+
+def test_each_record_maps_by_its_own_fields():
+    normalizer = default_normalizer()
+    events = normalizer.normalize_records(_records())
+    assert [ev.source for ev in events] == ["windows_security", "email", "network"]
+    assert [ev.user_name for ev in events] == ["john.doe", "employee@company.com", None]
+
+
+def test_modes_agree_on_sources():
+    normalizer = default_normalizer()
+    batch = LogBatch.from_records(_records())
+    batch_sources = [normalizer.for_record(row)[0] for row in batch]
+
+    suspicious, stats, first = triage(tagged_from_records(_records()))
+    assert first == batch_sources[0] == "windows_security"
+    assert dict(stats.by_source) == {"windows_security": 1, "email": 1, "network": 1}
+    assert [normalizer.normalize(rec).source for rec in suspicious] == batch_sources[:2]
+
+    sampler, first = sample(tagged_from_records(_records()))
+    assert first == "windows_security"
+    assert [s["source"] for s in sampler.to_dict()["strata"]] == ["network"]
+
+
+def test_login_parties_from_sshd_message():
+    ev = default_normalizer().normalize(
+        {"message": "Failed password for invalid user admin from 185.243.12.44 port 5000 ssh2"}
+    )
+    assert login_parties(ev) == ("185.243.12.44", "admin")
+
+
+def test_split_batch_groups_rows_by_source():
+    normalizer = default_normalizer()
+    records = _records() + [dict(FIREWALL, src_ip="198.51.100.9")]
+    batch = LogBatch.from_records(records)
+    parts = normalizer.split_batch(batch)
+    assert [(source, len(part)) for source, part in parts] == [
+        ("windows_security", 1), ("email", 1), ("network", 2)]
+    # take keeps the rows and their tags
+    network = dict(parts)["network"]
+    assert network.to_records() == [batch[2].to_dict(), batch[3].to_dict()]
+    assert dict(parts)["windows_security"].tags_of(0) == ["account_lockout"]
+
+    # Per-source detectors see the firewall addresses the first record's source hides
+    hitters = HeavyHitters()
+    for source, part in parts:
+        hitters.add_batch(part, source)
+    assert hitters.rank("src.ip") == {"203.0.113.7": 1, "198.51.100.9": 1}
+
+
+def test_split_batch_single_source_is_the_batch():
+    batch = LogBatch.from_records([dict(FIREWALL)] * 3)
+    assert default_normalizer().split_batch(batch) == [("network", batch)]
+
+
+def test_source_candidates_extend_the_generic_ones():
+    normalizer = default_normalizer()
+    assert normalizer.mappings["cloudtrail"].fields["src.ip"][:1] == ["sourceIPAddress"]
+    for name in ("sourceIPAddress", "src_ip", "source_ip", "ip"):
+        ev = normalizer.normalize({"eventName": "ConsoleLogin", name: "203.0.113.9"})
+        assert (ev.source, ev.src_ip) == ("cloudtrail", "203.0.113.9")
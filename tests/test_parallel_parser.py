@@ -0,0 +1,87 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools import (
+    FanDetector,
+    HeavyHitters,
+    UnreadableLogError,
+    iter_file_parallel,
+    iter_logs,
+    open_log_file,
+    parallel_parser,
+    tagged_from_records,
+    triage,
+)
+
+
+class RecordingPool(ThreadPoolExecutor):
+    submitted = 0
+
+    def submit(self, fn, *args, **kwargs):
+        RecordingPool.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_ranges_are_submitted_as_the_consumer_catches_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_parser, "MIN_RANGE_BYTES", 64)
+    monkeypatch.setattr(parallel_parser, "MAX_RANGE_BYTES", 512)
+    monkeypatch.setattr(parallel_parser, "ProcessPoolExecutor", RecordingPool)
+    path = tmp_path / "feed.jsonl"
+    path.write_text("\n".join(
+        json.dumps({"src_ip": f"198.51.100.{i % 250}", "message": f"Failed password for user{i}"})
+        for i in range(2000)
+    ))
+
+    records = iter_file_parallel(path, workers=2)
+    first = next(records)
+    assert RecordingPool.submitted <= 2 * parallel_parser.IN_FLIGHT_PER_WORKER + 1
+    rest = list(records)
+    assert RecordingPool.submitted > 50
+    with open(path, "rb") as fh:
+        assert [first] + rest == list(iter_logs(fh))
+
+
+def test_range_parse_releases_the_mapping(tmp_path):
+    path = tmp_path / "feed.jsonl"
+    lines = [json.dumps({"message": f"Accepted password for user{i}"}) + "\n" for i in range(10)]
+    path.write_text("".join(lines))
+    start = len(lines[0])
+    end = start + len(lines[1]) + len(lines[2])
+    # map_file closes the mmap on exit, which fails while a view is still exported
+    records, sketches = parallel_parser._parse_range(path, start, end, "jsonl")
+    assert sketches == (None, None)
+    assert [r["message"] for r in records] == ["Accepted password for user1", "Accepted password for user2"]
+
+
+def test_unreadable_file_is_reported_where_it_is_opened(tmp_path):
+    missing = tmp_path / "missing.jsonl"
+    with pytest.raises(UnreadableLogError, match="missing.jsonl"):
+        list(iter_file_parallel(missing, workers=2))
+    with pytest.raises(UnreadableLogError):
+        with open_log_file(missing):
+            pass
+
+
+def test_workers_sketch_their_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(parallel_parser, "MIN_RANGE_BYTES", 64)
+    monkeypatch.setattr(parallel_parser, "ProcessPoolExecutor", ThreadPoolExecutor)
+    path = tmp_path / "feed.jsonl"
+    path.write_text("\n".join(
+        json.dumps({"src_ip": f"198.51.100.{i % 7}", "dst_ip": f"10.0.{i % 3}.{i % 40}", "dst_port": 20 + i % 5,
+                    "message": f"Failed password for user{i % 11} from 198.51.100.{i % 7} port 22 ssh2"})
+        for i in range(600)
+    ))
+    thresholds = {"hosts_per_src": 5, "ports_per_src": 3, "users_per_src": 3, "srcs_per_dst": 3}
+
+    hitters, fan = HeavyHitters(), FanDetector(thresholds=thresholds)
+    records = list(iter_file_parallel(path, workers=4, hitters=hitters, fan=fan))
+    expected_hitters, expected_fan = HeavyHitters(), FanDetector(thresholds=thresholds)
+    triage(tagged_from_records(records), hitters=expected_hitters, fan=expected_fan)
+
+    assert fan.events == expected_fan.events == 600
+    for field in hitters.fields:
+        assert hitters.rank(field) == expected_hitters.rank(field)
+    assert fan.findings() == expected_fan.findings()
+    assert {f["type"] for f in fan.findings()} >= {"host_scan", "password_spray"}
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from tools import FieldRule, FieldRuleSet, LogBatch, RuleSyntaxError, compile_rule
+
+RECORDS = [
+    {"action": "BLOCK", "dst_ip": "10.0.0.5", "bytes_sent": 2_000_000, "event_id": 4625},
+    {"action": "ALLOW", "dst_ip": "203.0.113.9", "bytes_sent": 50, "user": "system:anonymous", "pod": "api"},
+    {"action": None, "payload": "id=1' OR 1=1 --", "groups": ["admins", "ops"]},
+    {"event_id": "4625", "bytes_sent": "big", "user": "alice"},
+    {},
+]
+
+CASES = [
+    ('action == "BLOCK"', [True, False, False, False, False]),
+    ('action != "BLOCK"', [False, True, False, False, False]),
+    ('not action == "BLOCK"', [False, True, True, True, True]),
+    ("bytes_sent > 1000000", [True, False, False, False, False]),
+    ("bytes_sent <= 50", [False, True, False, False, False]),
+    ('dst_ip startswith "10."', [True, False, False, False, False]),
+    ('dst_ip endswith ".9"', [False, True, False, False, False]),
+    ('user contains "anonymous"', [False, True, False, False, False]),
+    ('groups contains "admins"', [False, False, True, False, False]),
+    ('payload matches "(?i)or\\\\s+1=1"', [False, False, True, False, False]),
+    ("event_id in [4625, 4771]", [True, False, False, False, False]),
+    ('event_id in ["4625"]', [False, False, False, True, False]),
+    ("exists pod", [False, True, False, False, False]),
+    ("exists action", [True, True, False, False, False]),
+    ('user startswith "system:" and exists pod', [False, True, False, False, False]),
+    ('event_id == 4625 or (action == "ALLOW" and not dst_ip startswith "10.")', [True, True, False, False, False]),
+    ("not (exists user or exists action)", [False, False, True, False, True]),
+]
+
+
+@pytest.mark.parametrize("rule, expected", CASES)
+def test_predicates(rule, expected):
+    expr = compile_rule(rule)
+    assert [expr.evaluate(rec) for rec in RECORDS] == expected
+
+
+@pytest.mark.parametrize("rule, expected", CASES)
+def test_masks_agree_with_evaluate(rule, expected):
+    rules = FieldRuleSet([FieldRule("t", rule)])
+    assert rules.masks(RECORDS)[0].tolist() == expected
+    assert rules.masks(pd.DataFrame(RECORDS))[0].tolist() == expected
+    if "groups" not in rule:
+        assert rules.masks(LogBatch.from_records(RECORDS))[0].tolist() == expected
+
+
+def test_anchor_index_matches_every_rule():
+    rules = FieldRuleSet(FieldRule(f"tag{i}", rule) for i, (rule, _) in enumerate(CASES))
+    for row, rec in enumerate(RECORDS):
+        expected = [f"tag{i}" for i, (_, hits) in enumerate(CASES) if hits[row]]
+        assert (rules.match(rec) or []) == expected
+
+
+@pytest.mark.parametrize("rule", [
+    'action == "BLOCK" and',
+    'action = "BLOCK"',
+    '(action == "BLOCK"',
+    "dst_ip startswith 10",
+    'payload matches "("',
+    "event_id in 4625",
+    "action == 'BLOCK'",
+])
+def test_syntax_errors(rule):
+    with pytest.raises(RuleSyntaxError):
+        compile_rule(rule)
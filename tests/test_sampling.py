@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+
+import pytest
+
+from tools import Reservoir, StratifiedSampler
+
+
+@pytest.mark.parametrize("size, n", [(0, 50), (10, 5), (10, 10), (10, 1000)])
+def test_reservoir_counts_and_order(size, n):
+    reservoir = Reservoir(size, random.Random(1))
+    for i in range(n):
+        reservoir.add(f"item{i}", i)
+    assert reservoir.seen == n
+    assert reservoir.kept == min(size, n)
+    assert reservoir.kept + reservoir.dropped == n
+    positions = [int(item[4:]) for item in reservoir.items]
+    assert positions == sorted(set(positions))
+    assert all(0 <= p < n for p in positions)
+
+
+def test_reservoir_is_uniform():
+    size, n, trials = 10, 100, 4000
+    hits = Counter()
+    rng = random.Random(7)
+    for _ in range(trials):
+        reservoir = Reservoir(size, rng)
+        for i in range(n):
+            reservoir.add(i, i)
+        hits.update(reservoir.items)
+    expected = trials * size / n
+    # Each position is kept with probability size / n; 400 +- 19 (sd)
+    assert all(abs(hits[i] - expected) < 5 * (expected * (1 - size / n)) ** 0.5 for i in range(n))
+    # Early and late halves are kept alike (Algorithm L's skips are unbiased)
+    early = sum(hits[i] for i in range(n // 2))
+    assert abs(early / (trials * size) - 0.5) < 0.02
+
+
+def _sampler_run(**kwargs):
+    sampler = StratifiedSampler(suspicious_cap=5, per_stratum=3, seed=0, **kwargs)
+    for i in range(40):
+        tags = ["auth_failure"] if i % 4 == 0 else None
+        source = "linux_auth" if i % 2 else "network"
+        sampler.add({"i": i, "tags": tags}, tags, source, f"2025-11-15T{10 + i // 20:02d}:00:00Z")
+    sampler.add({"i": 40}, None, "network", None)
+    return sampler
+
+
+def test_stratified_sampler_counts_are_exact():
+    sampler = _sampler_run()
+    stats = sampler.to_dict()
+    assert stats["total"] == 41
+    assert stats["suspicious"] == {"seen": 10, "kept": 5, "dropped": 5, "dropped_by_tag": {"auth_failure": 5}}
+    assert stats["benign"] == {"seen": 31, "kept": 13, "dropped": 18}
+    assert sum(s["seen"] for s in stats["strata"]) == 31
+    assert all(s["kept"] == min(3, s["seen"]) for s in stats["strata"])
+    assert len(sampler.suspicious) == 5 and len(sampler.benign) == 13
+    order = [rec["i"] for rec in sampler.benign]
+    assert order == sorted(order)
+
+
+def test_strata_past_the_limit_share_other():
+    sampler = _sampler_run(max_strata=2)
+    strata = {(s["source"], s["hour"]) for s in sampler.to_dict()["strata"]}
+    assert len(strata) == 3 and ("(other)", "(other)") in strata
+    assert sampler.to_dict()["benign"]["seen"] == 31
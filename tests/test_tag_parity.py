@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from tools import LinePrefilter, iter_tagged, parse_batch, parse_logs, parse_logs_vectorized, tag_messages
+from tools.tag_rules import default_rules
+
+SAMPLE_DATA = Path(__file__).resolve().parent.parent / "sample_data"
+BASELINE_TAGS = ("auth_failure", "privilege_escalation_attempt", "connection_from_blacklisted_ip")
+
+EDGE_MESSAGES = [
+    "FAILED PASSWORD for root",
+    "pam_unix(sshd:auth): Authentication Failure; rhost=203.0.113.7",
+    "alice : user NOT IN SUDOERS ; COMMAND=/bin/sh (sudo)",
+    "not in sudoers",
+    "Connection from 198.51.100.4 refused: host is BLACKLISTED",
+    "blacklisted connection",
+    "failed  password",
+    "",
+    None,
+    12345,
+    ["failed password"],
+]
+
+
+def baseline_tags(rec):
+    """
+    The keyword tagging parse_logs did before the rule files existed.
+    """
+    message = str(rec.get("message", "")).lower()
+    tags = []
+    if "failed password" in message or "authentication failure" in message:
+        tags.append("auth_failure")
+    if "sudo" in message and "not in sudoers" in message:
+        tags.append("privilege_escalation_attempt")
+    if "connection from" in message and "blacklisted" in message:
+        tags.append("connection_from_blacklisted_ip")
+    return tags
+
+
+def _records():
+    records = []
+    for path in sorted(SAMPLE_DATA.glob("*.json")):
+        data = json.loads(path.read_text())
+        records += data if isinstance(data, list) else [data]
+    records += [{"message": m} for m in EDGE_MESSAGES] + [{"msg": "failed password"}]
+    return records
+
+
+def _keyword_tags(tags):
+    return [t for t in tags or () if t in BASELINE_TAGS]
+
+
+RECORDS = _records()
+EXPECTED = [baseline_tags(rec) for rec in RECORDS]
+JSONL = "\n".join(json.dumps(rec) for rec in RECORDS)
+
+
+def test_fixture_exercises_every_tag():
+    assert {t for tags in EXPECTED for t in tags} == set(BASELINE_TAGS)
+
+
+@pytest.mark.parametrize("parse", [parse_logs, parse_logs_vectorized], ids=["parse_logs", "vectorized"])
+def test_record_parsers_match_baseline(parse):
+    assert [_keyword_tags(rec["tags"]) for rec in parse(JSONL)] == EXPECTED
+
+
+@pytest.mark.parametrize("prefilter", [None, False, True], ids=["plain", "prefilter", "decode_skipped"])
+def test_streaming_matches_baseline(prefilter):
+    if prefilter is not None:
+        prefilter = LinePrefilter(default_rules(), decode_skipped=prefilter)
+    tagged = list(iter_tagged(JSONL.encode(), prefilter=prefilter))
+    if prefilter is None or prefilter.decode_skipped:
+        assert [_keyword_tags(tags) for _, tags in tagged] == EXPECTED
+    else:
+        assert [_keyword_tags(tags) for _, tags in tagged if _keyword_tags(tags)] == [t for t in EXPECTED if t]
+
+
+def test_batch_and_messages_match_baseline():
+    batch = parse_batch(JSONL.encode())
+    assert [_keyword_tags(batch.tags_of(i)) for i in range(len(batch))] == EXPECTED
+    assert tag_messages([rec.get("message", "") for rec in RECORDS]) == EXPECTED
+
+
+def test_field_rules_are_opt_in():
+    # FIELD_RULES_PATH is unset by default, so only the keyword rules tag
+    assert default_rules().tag_order == list(BASELINE_TAGS)
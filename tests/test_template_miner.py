@@ -0,0 +1,64 @@
+from tools import LogBatch, TemplateMiner, digest_records, mine_batch
+from tools.template_miner import NO_MESSAGE
+
+
+def _records():
+    records = [
+        {"message": f"Failed password for root from 198.51.100.{i}", "tags": ["failed_login"]}
+        for i in range(40)
+    ]
+    records += [{"message": "Accepted publickey for admin from 10.0.0.2", "tags": ["login"], "dup_count": 3}]
+    records += [{"event_id": 4740, "tags": ["lockout"]}, {"event_id": 4740, "tags": ["lockout"], "dup_count": 4}]
+    return records
+
+
+def test_digest_counts_every_record_but_quotes_few():
+    digest = digest_records(_records(), sample_size=2)
+    assert digest["records"] == 48
+    assert [(t["template"], t["count"]) for t in digest["templates"]] == [
+        ("Failed password for root from <IP>", 40),
+        (NO_MESSAGE, 5),
+        ("Accepted publickey for admin from <IP>", 3),
+    ]
+    assert digest["templates"][1]["tags"] == ["lockout"]
+    assert digest["sample"] == [_records()[0], _records()[41]]
+
+
+def test_digest_limits_templates():
+    digest = digest_records(_records(), limit=1)
+    assert len(digest["templates"]) == len(digest["sample"]) == 1
+    assert digest_records([]) == {"records": 0, "templates": [], "sample": []}
+
+
+def test_mine_batch_skips_null_messages():
+    records = [{"message": "Failed password for root from 198.51.100.1"}, {"message": None}, {"message": None}, {}]
+    batched = mine_batch(LogBatch.from_records(records))
+    streamed = TemplateMiner()
+    streamed.add_records(records)
+    assert batched.summary() == streamed.summary() == [
+        {"template": "Failed password for root from <IP>", "count": 1, "tags": []}
+    ]
+
+
+def _nodes(tree):
+    """
+    Token nodes and leaves left in a miner's prefix tree.
+    """
+    return sum(1 + (_nodes(child) if isinstance(child, dict) else 0) for child in tree.values())
+
+
+def test_eviction_prunes_empty_branches():
+    words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+    messages = [f"{a} {b}" for a in words for b in words] + ["disk quota exceeded"]
+    miner = TemplateMiner(depth=4, max_clusters=2)
+    for message in messages:
+        miner.add(message)
+    assert len(miner) == 2 and miner.evicted == len(messages) - 2
+
+    # The tree is what the live clusters alone would build: per cluster
+    # its token-count node, two token levels and the leaf
+    fresh = TemplateMiner(depth=4, max_clusters=2)
+    for message in messages[-2:]:
+        fresh.add(message)
+    assert _nodes(miner._root) == _nodes(fresh._root) == 2 * 4
+    assert set(miner._root) == {2, 3}
@@ -0,0 +1,53 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from tools import LogBatch, TimeIndex, TimestampParser, parse_timestamps
+from tools.timestamps import INT64_NULL, NS_PER_SECOND, TS_OTHER
+
+VALUES = [
+    "2025-01-01T10:00:00Z",
+    "2025-01-01 10:00:00",
+    "2025-01-01T10:00:00",
+    "2025-01-01T10:00+01",
+    "2025-01-01T10+01:00",
+    "2025-01-01T10:00:00+02:00",
+    "2025-01-01T10:00:00-05:30",
+    "2025-01-01T10:00:00.250Z",
+    "2025-01-01T10:00:00+00:00",
+]
+
+
+def _expected_ns(value):
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * NS_PER_SECOND + dt.microsecond * 1000
+
+
+@pytest.mark.parametrize("value", VALUES)
+def test_epoch_honours_offsets(value):
+    epoch, _ = TimestampParser().parse(value)
+    assert epoch == _expected_ns(value)
+
+
+def test_offsets_are_never_fast_path():
+    parser = TimestampParser()
+    for value in ("2025-01-01T10:00+01", "2025-01-01T10+01:00", "2025-01-01T10:00:00+00:00"):
+        assert parser.parse(value)[1] == TS_OTHER
+    assert [parser.parse(v)[1] for v in VALUES[:3]] == [0, 1, 2]
+
+
+def test_batch_round_trip_keeps_original_text():
+    batch = LogBatch.from_records({"timestamp": v, "message": "m"} for v in VALUES)
+    assert [row["timestamp"] for row in batch] == VALUES
+    assert list(batch.timestamps) == [_expected_ns(v) for v in VALUES]
+
+
+def test_unparseable_values():
+    assert list(parse_timestamps(["not a date", None, 1735725600])) == [INT64_NULL] * 3
+
+
+def test_time_index_range():
+    index = TimeIndex(parse_timestamps(["2025-01-01T10:00:02Z", "2025-01-01T10:00:00Z", "2025-01-01T11:00:01+01:00"]))
+    assert index.between("2025-01-01T10:00:00Z", "2025-01-01T10:00:01Z") == [1, 2]
@@ -0,0 +1,64 @@
+import io
+import json
+from pathlib import Path
+
+from config import TAG_RULES_PATH
+from tools import FanDetector, HeavyHitters, iter_tagged, triage
+from tools.prefilter import LinePrefilter
+from tools.tag_rules import load_rules
+
+# Keyword rules plus the example field rules (account_lockout tags LOCKOUT)
+RULES = load_rules(TAG_RULES_PATH, str(Path(__file__).resolve().parent.parent / "rules" / "field_rules.example.json"))
+
+ALLOW = {"timestamp": "2025-11-15T11:02:10Z", "src_ip": "198.51.100.9", "dst_ip": "10.0.0.5",
+         "dst_port": 443, "action": "ALLOW", "message": "Inbound HTTPS request allowed"}
+FAILED = dict(ALLOW, action="BLOCK", message="Failed password for root from 198.51.100.9")
+LOCKOUT = {"timestamp": "2025-11-15T11:03:00Z", "event_id": 4740, "user": "john.doe",
+           "message": "A user account was locked out"}
+
+
+def _feed() -> bytes:
+    lines = []
+    for i in range(300):
+        # One source sweeping hosts on benign-looking lines
+        lines.append(json.dumps(dict(ALLOW, dst_ip=f"10.1.{i // 250}.{i % 250}")))
+    lines += [json.dumps(FAILED)] * 5 + [json.dumps(LOCKOUT)] * 2 + [""]
+    return "\n".join(lines).encode()
+
+
+def _run(prefilter=None):
+    hitters, fan = HeavyHitters(), FanDetector()
+    suspicious, stats, source = triage(iter_tagged(io.BytesIO(_feed()), rules=RULES, prefilter=prefilter), hitters=hitters, fan=fan)
+    return suspicious, stats, hitters, fan
+
+
+def test_prefilter_keeps_tags_identical():
+    full = list(iter_tagged(_feed(), rules=RULES))
+    for decode_skipped in (False, True):
+        prefilter = LinePrefilter(RULES, decode_skipped=decode_skipped)
+        filtered = list(iter_tagged(_feed(), rules=RULES, prefilter=prefilter))
+        assert [t for _, t in filtered if t] == [t for _, t in full if t]
+        assert prefilter.skipped == 300
+    assert len(filtered) == len(full) == 307
+
+
+def test_decoded_skipped_lines_reach_stats_and_sketches():
+    suspicious, stats, hitters, fan = _run(LinePrefilter(RULES, decode_skipped=True))
+    reference = _run()
+    assert stats.to_dict() == reference[1].to_dict()
+    assert hitters.to_dict() == reference[2].to_dict()
+    assert [f["type"] for f in fan.findings()] == ["host_scan"]
+    assert len(suspicious) == 7
+
+
+def test_undecoded_skipped_lines_count_towards_totals_only():
+    prefilter = LinePrefilter(RULES)
+    suspicious, stats, hitters, fan = _run(prefilter)
+    stats.add_prefiltered(prefilter.skipped)
+    assert (stats.total, stats.suspicious, stats.prefiltered) == (307, 7, 300)
+    assert fan.findings() == []
+
+
+def test_mixed_sources_are_broken_down():
+    _, stats, _, _ = _run()
+    assert dict(stats.by_source) == {"network": 305, "windows_security": 2}
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from tools import VolumetricDetector, detect_volumetric, iter_tagged, parse_batch, sample, triage
+
+START = datetime(2025, 11, 15, 11, 0, tzinfo=timezone.utc)
+
+
+def _feed() -> str:
+    lines = []
+    # Background: one event every 2 s, each to a different host
+    for i in range(600):
+        ts = START + timedelta(seconds=2 * i)
+        lines.append({"timestamp": ts.isoformat(), "src_ip": f"198.51.100.{i % 200}",
+                      "dst_ip": f"10.0.{i // 250}.{i % 250}", "bytes": 500, "action": "ALLOW"})
+    # 30 s flood of 200 events/s at one host, ten minutes in
+    for i in range(6000):
+        ts = START + timedelta(minutes=10, microseconds=5000 * i)
+        lines.append({"timestamp": ts.isoformat(), "src_ip": f"203.0.113.{i % 250}",
+                      "dst_ip": "10.9.9.9", "bytes": 60, "action": "ALLOW"})
+    lines.sort(key=lambda r: r["timestamp"])
+    return "\n".join(json.dumps(r) for r in lines)
+
+
+def _keys(findings):
+    return {(f["type"], f.get("dst_ip") or f.get("src_ip")) for f in findings}
+
+
+def test_streaming_matches_batch():
+    content = _feed()
+    batch = detect_volumetric(parse_batch(content), "network")
+    assert ("flood", "10.9.9.9") in _keys(batch)
+
+    triaged = VolumetricDetector()
+    triage(iter_tagged(content), volumetric=triaged)
+    sampled = VolumetricDetector()
+    sample(iter_tagged(content), volumetric=sampled)
+    for detector in (triaged, sampled):
+        assert _keys(detector.findings()) == _keys(batch)
+        assert detector.stats()["events"] == 6600
+
+
+def test_events_without_timestamps_are_skipped():
+    detector = VolumetricDetector()
+    content = "\n".join(json.dumps({"src_ip": "198.51.100.1", "dst_ip": "10.0.0.1"}) for _ in range(10))
+    triage(iter_tagged(content), volumetric=detector)
+    assert detector.findings() == []
+    assert detector.stats()["events"] == 0
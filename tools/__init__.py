@@ -1,4 +1,42 @@
 # Expose tools
-from .log_parser import parse_logs
+from .log_parser import (
+    parse_logs,
+    parse_logs_sparse,
+    scan_tags,
+    iter_logs,
+    iter_tagged,
+    JsonDecoder,
+    get_decoder,
+    available_decoders,
+)
+from .log_formats import sniff_format, parse_lines
+from .tag_rules import TagRule, TagRuleSet, load_rules
+from .rule_engine import FieldRule, FieldRuleSet, RuleSyntaxError, compile_rule, load_field_rules
+from .prefilter import LinePrefilter
+from .vectorized import tag_messages, tag_records, tag_frame, parse_frame, parse_logs_vectorized
+from .log_batch import LogBatch, LogRow, parse_batch
+from .beaconing import BeaconCollector, beacon_stats, detect_beacons
+from .volumetric import DecayingCountMinSketch, VolumetricDetector, detect_volumetric
+from .cardinality import HyperLogLog, FanDetector, detect_fan
+from .timestamps import TimeIndex, TimestampParser, parse_timestamps
+from .template_miner import LogTemplate, TemplateMiner, digest_records, mine_batch
+from .dedup import Deduplicator, dedup_records
+from .symbols import SymbolTable, session_symbols
+from .normalizer import NormalizedEvent, FieldMapping, Normalizer, load_mappings, default_normalizer
+from .heavy_hitters import SpaceSaving, HeavyHitters
+from .triage import TriageStats, triage, tagged_from_records
+from .sampling import Reservoir, StratifiedSampler, sample
+from .correlation import AuthCorrelator, correlate
+from .ingest import (
+    CorruptCompressionError,
+    UnreadableLogError,
+    UnsupportedCompressionError,
+    map_file,
+    open_log_file,
+    open_decompressed,
+    detect_compression,
+)
+from .parallel_parser import iter_file_parallel, parse_file_parallel
+from .follow import OffsetStore, FileFollower, LogFollower, follow_logs
 from .threat_intel import ThreatIntelClient
 from .google_search import google_search
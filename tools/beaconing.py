@@ -0,0 +1,286 @@
+from array import array
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    BEACON_FFT_BINS,
+    BEACON_MAX_EVENTS,
+    BEACON_MIN_CONNECTIONS,
+    BEACON_MIN_INTERVAL,
+    BEACON_MIN_SCORE,
+    BEACON_PERIOD_TOLERANCE,
+)
+from .log_batch import _CODE_IPV4, _CODE_MISSING, LogBatch, _int_to_ipv4
+from .normalizer import NormalizedEvent, Normalizer, default_normalizer
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser, format_timestamp_ns
+
+# Values of non-IPv4 (dictionary-coded) addresses are offset past uint32
+_DICT_KEYS = 1 << 32
+# Upper bound on the cells of one FFT block (pairs x bins)
+_FFT_BLOCK_CELLS = 1 << 22
+
+
+def _fft_periods(t: np.ndarray, starts: np.ndarray, counts: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Dominant period (seconds) of each pair's connection times: the times
+    are binned into `bins` slots over the pair's span and the lowest
+    frequency with at least half the peak power is taken as the
+    fundamental. Only the first bins // 4 connections of a pair are used,
+    so every period spans several bins. NaN where there is no span.
+
+    `t` holds the seconds of all pairs back to back, pair i at
+    t[starts[i]:starts[i] + counts[i]].
+    """
+    periods = np.full(len(starts), np.nan)
+    used = np.minimum(counts, max(bins // 4, 2))
+    rows_per_block = max(1, _FFT_BLOCK_CELLS // bins)
+    for lo in range(0, len(starts), rows_per_block):
+        s, n = starts[lo:lo + rows_per_block], used[lo:lo + rows_per_block]
+        rows = len(s)
+        row = np.repeat(np.arange(rows), n)
+        idx = np.repeat(s - np.cumsum(n) + n, n) + np.arange(n.sum())
+        t0 = t[s]
+        span = t[s + n - 1] - t0
+        ok = span > 0
+        scale = np.where(ok, (bins - 1) / np.where(ok, span, 1), 0)
+        slot = ((t[idx] - t0[row]) * scale[row]).astype(np.int64)
+        hist = np.bincount(row * bins + slot, minlength=rows * bins).reshape(rows, bins).astype(np.float64)
+        hist -= hist.mean(axis=1, keepdims=True)
+        power = np.abs(np.fft.rfft(hist, axis=1)) ** 2
+        power[:, 0] = 0
+        peak = power.max(axis=1, keepdims=True)
+        strong = (power >= 0.5 * peak) & (peak > 0)
+        k = strong.argmax(axis=1)
+        found = ok & strong.any(axis=1) & (k > 0)
+        # bins slots of span / (bins - 1) seconds, k cycles over them
+        width = span / (bins - 1)
+        periods[lo:lo + rows] = np.where(found, bins * width / np.maximum(k, 1), np.nan)
+    return periods
+
+
+def _pair_time_order(epochs: np.ndarray, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """
+    Row order by (src, dst, time). When the key ranges allow, the pair is
+    packed into one int64 and two stable sorts replace the lexsort; logs
+    are mostly in time order already, which the first sort exploits.
+    """
+    if not len(epochs):
+        return np.zeros(0, dtype=np.int64)
+    src_lo, dst_lo = int(src.min()), int(dst.min())
+    dst_range = int(dst.max()) - dst_lo + 1
+    if (int(src.max()) - src_lo + 1) * dst_range >= 1 << 62:
+        return np.lexsort((epochs, dst, src))
+    pair = (src - src_lo) * dst_range + (dst - dst_lo)
+    order = np.argsort(epochs, kind="stable")
+    return order[np.argsort(pair[order], kind="stable")]
+
+
+def beacon_stats(
+    epochs: np.ndarray,
+    src: np.ndarray,
+    dst: np.ndarray,
+    min_connections: int = BEACON_MIN_CONNECTIONS,
+    min_interval: float = BEACON_MIN_INTERVAL,
+    min_score: float = 0.0,
+    fft_bins: int = BEACON_FFT_BINS,
+    tolerance: float = BEACON_PERIOD_TOLERANCE,
+) -> Dict[str, np.ndarray]:
+    """
+    Inter-arrival statistics per (src, dst) pair, computed column-wise.
+
+    `epochs` are int64 epoch ns (INT64_NULL when missing); `src` and `dst`
+    int64 keys (negative when missing). Rows are sorted by (pair, time)
+    once; the per-pair mean, jitter (standard deviation) and coefficient
+    of variation of the gaps come from bincount sums, so there is no
+    Python loop over connections.
+
+    Pairs with at least `min_connections` connections and a mean gap of
+    `min_interval` seconds or more are scored:
+    0.8 * max(0, 1 - cv) + 0.2 * (FFT period within `tolerance` of the
+    mean gap), 1.0 for a perfectly regular beacon. Pairs that cannot
+    reach `min_score` whatever their period are dropped before the FFT,
+    which is the costly step; the rest are returned with score >= min_score.
+    """
+    epochs = np.asarray(epochs, dtype=np.int64)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    valid = (epochs != INT64_NULL) & (src >= 0) & (dst >= 0)
+    epochs, src, dst = epochs[valid], src[valid], dst[valid]
+
+    order = _pair_time_order(epochs, src, dst)
+    epochs, src, dst = epochs[order], src[order], dst[order]
+    new_pair = np.ones(len(epochs), dtype=bool)
+    new_pair[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    starts = np.flatnonzero(new_pair)
+    counts = np.diff(np.append(starts, len(epochs)))
+
+    # Gaps within a pair, in seconds; gap i belongs to the pair of row i + 1
+    pair_of_row = np.cumsum(new_pair) - 1
+    same = ~new_pair[1:]
+    gaps = np.diff(epochs)[same] / NS_PER_SECOND
+    gap_pair = pair_of_row[1:][same]
+    n_pairs = len(starts)
+    n_gaps = np.bincount(gap_pair, minlength=n_pairs)
+    total = np.bincount(gap_pair, weights=gaps, minlength=n_pairs)
+    squares = np.bincount(gap_pair, weights=gaps * gaps, minlength=n_pairs)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n_gaps
+        jitter = np.sqrt(np.maximum(squares / n_gaps - mean * mean, 0))
+        cv = jitter / mean
+    regularity = 0.8 * np.clip(1 - cv, 0, 1)
+
+    keep = np.flatnonzero(
+        (counts >= max(min_connections, 2)) & (mean >= min_interval) & (regularity + 0.2 >= min_score)
+    )
+    seconds = (epochs - epochs[0]) / NS_PER_SECOND if len(epochs) else epochs.astype(np.float64)
+    period = _fft_periods(seconds, starts[keep], counts[keep], fft_bins)
+    mean = mean[keep]
+    score = regularity[keep] + 0.2 * (np.abs(period - mean) <= tolerance * mean)
+    passed = score >= min_score
+    keep, mean, period, score = keep[passed], mean[passed], period[passed], score[passed]
+    first = epochs[starts[keep]]
+    last = epochs[starts[keep] + counts[keep] - 1]
+    return {
+        "src": src[starts[keep]],
+        "dst": dst[starts[keep]],
+        "connections": counts[keep],
+        "first": first,
+        "last": last,
+        "mean_interval": mean,
+        "jitter": jitter[keep],
+        "cv": cv[keep],
+        "fft_period": period,
+        "score": score,
+    }
+
+
+def _address_keys(batch: LogBatch, name: str) -> Tuple[np.ndarray, Callable[[int], Any]]:
+    """
+    int64 key per row for an address column (the packed IPv4 address, or
+    a dictionary code past uint32 for other values; -1 when missing), and
+    the function that turns a key back into the value.
+    """
+    codes, values = batch.dictionary(name)
+    codes = np.frombuffer(codes, dtype=np.int32, count=len(codes)) if len(codes) else np.zeros(0, np.int32)
+    keys = codes.astype(np.int64) + _DICT_KEYS
+    ipv4 = codes == _CODE_IPV4
+    if ipv4.any():
+        keys[ipv4] = np.frombuffer(batch.ipv4(name), dtype=np.uint32)[ipv4]
+    keys[codes == _CODE_MISSING] = -1
+
+    def value(key: int) -> Any:
+        return _int_to_ipv4(key) if key < _DICT_KEYS else values[key - _DICT_KEYS]
+
+    return keys, value
+
+
+def _field(batch: LogBatch, names: List[str]) -> Optional[str]:
+    present = set(batch.fields)
+    return next((n for n in names if n in present), None)
+
+
+def detect_beacons(
+    batch: LogBatch,
+    source: str,
+    min_score: float = BEACON_MIN_SCORE,
+    limit: Optional[int] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Likely C2 beacons in a LogBatch: (src, dst) pairs connecting at
+    regular intervals, best score first. The address fields are the
+    source's src.ip / dst.ip mappings; see beacon_stats for the scoring.
+    """
+    mapping = (normalizer or default_normalizer()).mappings[source]
+    src_name = _field(batch, mapping.fields.get("src.ip", []))
+    dst_name = _field(batch, mapping.fields.get("dst.ip", []))
+    if src_name is None or dst_name is None or len(batch) == 0:
+        return []
+
+    src, src_value = _address_keys(batch, src_name)
+    dst, dst_value = _address_keys(batch, dst_name)
+    epochs = np.frombuffer(batch.timestamps, dtype=np.int64, count=len(batch))
+    return _findings(beacon_stats(epochs, src, dst, min_score=min_score), src_value, dst_value, limit)
+
+
+def _findings(stats: Dict[str, np.ndarray], src_value: Callable[[int], Any],
+              dst_value: Callable[[int], Any], limit: Optional[int]) -> List[Dict[str, Any]]:
+    best = np.argsort(-stats["score"], kind="stable")[:limit]
+    return [
+        {
+            "src_ip": src_value(int(stats["src"][i])),
+            "dst_ip": dst_value(int(stats["dst"][i])),
+            "connections": int(stats["connections"][i]),
+            "mean_interval_seconds": round(float(stats["mean_interval"][i]), 3),
+            "jitter_seconds": round(float(stats["jitter"][i]), 3),
+            "cv": round(float(stats["cv"][i]), 4),
+            "fft_period_seconds": None if np.isnan(stats["fft_period"][i]) else round(float(stats["fft_period"][i]), 3),
+            "score": round(float(stats["score"][i]), 3),
+            "first_seen": format_timestamp_ns(int(stats["first"][i]), 0),
+            "last_seen": format_timestamp_ns(int(stats["last"][i]), 0),
+        }
+        for i in best.tolist()
+    ]
+
+
+class BeaconCollector:
+    """
+    Connection times per (src, dst) pair gathered one NormalizedEvent at
+    a time, for beaconing detection where there is no LogBatch (triage
+    and sampling mode). Each connection takes three int64s in flat
+    arrays; addresses are numbered as first seen.
+
+    At most `max_events` connections are kept: later ones are counted in
+    `dropped` and left out of the scoring, so callers can say the
+    findings cover only the start of the feed.
+    """
+
+    def __init__(self, max_events: int = BEACON_MAX_EVENTS):
+        self.max_events = max_events
+        self.dropped = 0
+        self._epochs = array("q")
+        self._src = array("q")
+        self._dst = array("q")
+        self._ids: Dict[Any, int] = {}
+        self._values: List[Any] = []
+        self._parser = TimestampParser()
+
+    def __len__(self) -> int:
+        return len(self._epochs)
+
+    def _id(self, value: Any) -> int:
+        i = self._ids.get(value)
+        if i is None:
+            i = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return i
+
+    def add_event(self, ev: NormalizedEvent) -> None:
+        src_ip, dst_ip, timestamp = ev.src_ip, ev.dst_ip, ev.timestamp
+        if src_ip is None or dst_ip is None or timestamp is None:
+            return
+        epoch = self._parser.parse(timestamp)[0]
+        if epoch == INT64_NULL:
+            return
+        if len(self._epochs) >= self.max_events:
+            self.dropped += 1
+            return
+        self._epochs.append(epoch)
+        self._src.append(self._id(src_ip))
+        self._dst.append(self._id(dst_ip))
+
+    def findings(self, min_score: float = BEACON_MIN_SCORE, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Likely beacons among the kept connections, best score first (as
+        detect_beacons).
+        """
+        if not self._epochs:
+            return []
+        stats = beacon_stats(
+            np.frombuffer(self._epochs, dtype=np.int64),
+            np.frombuffer(self._src, dtype=np.int64),
+            np.frombuffer(self._dst, dtype=np.int64),
+            min_score=min_score,
+        )
+        return _findings(stats, self._values.__getitem__, self._values.__getitem__, limit)
@@ -0,0 +1,310 @@
+import math
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    AUTH_FAILURE_TAGS,
+    FAN_FLOOD_THRESHOLD,
+    FAN_HOST_SCAN_THRESHOLD,
+    FAN_MAX_KEYS,
+    FAN_PORT_SCAN_THRESHOLD,
+    FAN_SPRAY_THRESHOLD,
+    HLL_PRECISION,
+)
+from .beaconing import _address_keys, _field
+from .log_batch import LogBatch
+from .normalizer import NormalizedEvent, Normalizer, attr_name, default_normalizer, login_parties
+from .volumetric import key_id, key_ids
+
+# dimension -> (entity field, field whose distinct values are counted, finding type);
+# users_per_src only counts failed logins
+DIMENSIONS = {
+    "hosts_per_src": ("src.ip", "dst.ip", "host_scan"),
+    "ports_per_src": ("src.ip", "dst.port", "port_scan"),
+    "users_per_src": ("src.ip", "user.name", "password_spray"),
+    "srcs_per_dst": ("dst.ip", "src.ip", "distributed_flood"),
+}
+# Entities whose registers are built at once from a LogBatch (bounds the
+# temporary block at _BLOCK x 2^precision bytes)
+_BLOCK = 4096
+
+
+def _canonical(value: Any) -> str:
+    """
+    String form a value is hashed and reported under, so 443, 443.0 and
+    "443" count as one port whichever path (event or batch) saw them.
+    """
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+@lru_cache(maxsize=65536)
+def _hash(value: str) -> int:
+    return key_id(value) & 0xFFFFFFFFFFFFFFFF
+
+
+def _positions(hashes: np.ndarray, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (register index, rank) of uint64 hashes: the top `precision` bits
+    pick the register, the rank is 1 + the leading zeros of the rest.
+    """
+    bits = 64 - precision
+    idx = (hashes >> np.uint64(bits)).astype(np.intp)
+    rest = hashes & np.uint64((1 << bits) - 1)
+    # bit_length through frexp; float64 rounding can overshoot by one
+    length = np.frexp(rest.astype(np.float64))[1].astype(np.int64)
+    over = length > 0
+    over[over] = rest[over] < np.left_shift(np.uint64(1), (length[over] - 1).astype(np.uint64))
+    length -= over
+    return idx, (bits - length + 1).astype(np.uint8)
+
+
+def _estimate(registers: np.ndarray) -> np.ndarray:
+    """
+    Distinct-count estimates for a 2-D array of register rows, with the
+    linear-counting correction for small cardinalities.
+    """
+    m = registers.shape[1]
+    alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+    raw = alpha * m * m / np.ldexp(1.0, -registers.astype(np.int64)).sum(axis=1)
+    zeros = (registers == 0).sum(axis=1)
+    small = (raw <= 2.5 * m) & (zeros > 0)
+    return np.where(small, m * np.log(m / np.maximum(zeros, 1)), raw)
+
+
+class HyperLogLog:
+    """
+    Distinct count of a stream in 2^precision one-byte registers, with a
+    relative error of about 1.04 / sqrt(2^precision). Values are hashed
+    with blake2b (the same in every process), so sketches built by
+    parallel workers merge into the sketch of the combined stream.
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, value: Any) -> None:
+        h = _hash(_canonical(value))
+        bits = 64 - self.precision
+        idx = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        """
+        Adds uint64 hashes of values (see key_ids) in one pass.
+        """
+        idx, rank = _positions(hashes, self.precision)
+        np.maximum.at(self.registers, idx, rank)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLog sketches with the same precision can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        return int(round(float(_estimate(self.registers[None, :])[0])))
+
+
+def _hashed_column(batch: LogBatch, name: str) -> Tuple[np.ndarray, np.ndarray, Callable[[int], Any]]:
+    """
+    (int64 keys, uint64 value hashes, key -> value) for a column; each
+    distinct value is hashed once. Keys are -1 where the field is missing.
+    """
+    keys, value = _address_keys(batch, name)
+    distinct, inverse = np.unique(keys, return_inverse=True)
+    hashes = key_ids(_canonical(value(int(k))) if k != -1 else "" for k in distinct.tolist())
+    return keys, hashes.view(np.uint64)[inverse.reshape(-1)], value
+
+
+class FanDetector:
+    """
+    Fan-out and fan-in per entity from one HyperLogLog sketch per entity
+    and dimension (see DIMENSIONS):
+
+    - host_scan / port_scan: one source IP reaching many distinct
+      destination IPs / destination ports
+    - password_spray: one source IP failing to log in as many distinct
+      accounts (over the whole input, unlike AuthCorrelator's window)
+    - distributed_flood: many distinct source IPs hitting one destination
+
+    Memory per entity is fixed (2^precision bytes) and at most `max_keys`
+    entities are kept per dimension, least recently seen dropped first.
+    Detectors with the same precision merge (e.g. across parse workers).
+    """
+
+    def __init__(
+        self,
+        precision: int = HLL_PRECISION,
+        thresholds: Optional[Dict[str, int]] = None,
+        max_keys: int = FAN_MAX_KEYS,
+        failure_tags: Iterable[str] = AUTH_FAILURE_TAGS,
+    ):
+        HyperLogLog(precision)  # validates the precision
+        self.precision = precision
+        self.thresholds = {
+            "hosts_per_src": FAN_HOST_SCAN_THRESHOLD,
+            "ports_per_src": FAN_PORT_SCAN_THRESHOLD,
+            "users_per_src": FAN_SPRAY_THRESHOLD,
+            "srcs_per_dst": FAN_FLOOD_THRESHOLD,
+        }
+        self.thresholds.update(thresholds or {})
+        self.max_keys = max_keys
+        self.failure_tags = set(failure_tags)
+        self.events = 0
+        # dimension -> entity -> sketch, least recently seen first
+        self._sketches: Dict[str, "OrderedDict[str, HyperLogLog]"] = {dim: OrderedDict() for dim in DIMENSIONS}
+        # dimension -> entity -> events seen with both fields set
+        self._events: Dict[str, Dict[str, int]] = {dim: {} for dim in DIMENSIONS}
+
+    def _touch(self, dim: str, entity: str, count: int) -> HyperLogLog:
+        sketches, events = self._sketches[dim], self._events[dim]
+        sketch = sketches.get(entity)
+        if sketch is None:
+            if len(sketches) >= self.max_keys:
+                oldest, _ = sketches.popitem(last=False)
+                del events[oldest]
+            sketch = sketches[entity] = HyperLogLog(self.precision)
+        else:
+            sketches.move_to_end(entity)
+        events[entity] = events.get(entity, 0) + count
+        return sketch
+
+    def add(self, dim: str, entity: Any, value: Any, count: int = 1) -> None:
+        self._touch(dim, _canonical(entity), count).add(value)
+
+    def _add_failure(self, ev: NormalizedEvent) -> None:
+        if self.failure_tags.isdisjoint(ev.tags):
+            return
+        src_ip, user = login_parties(ev)
+        if src_ip is not None and user is not None:
+            self.add("users_per_src", src_ip, user, ev.count)
+
+    def add_event(self, ev: NormalizedEvent) -> None:
+        self.events += ev.count
+        src_ip, dst_ip, dst_port = ev.src_ip, ev.dst_ip, ev.dst_port
+        if src_ip is not None:
+            if dst_ip is not None:
+                self.add("hosts_per_src", src_ip, dst_ip, ev.count)
+                self.add("srcs_per_dst", dst_ip, src_ip, ev.count)
+            if dst_port is not None:
+                self.add("ports_per_src", src_ip, dst_port, ev.count)
+        self._add_failure(ev)
+
+    def _add_columns(self, dim: str, entity_col: Tuple, value_col: Tuple) -> None:
+        entity_keys, _, entity_value = entity_col
+        value_keys, hashes, _ = value_col
+        both = (entity_keys != -1) & (value_keys != -1)
+        if not both.any():
+            return
+        entities, inverse, counts = np.unique(entity_keys[both], return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+        # Busiest entities are touched last, so they are the last evicted
+        by_count = np.argsort(counts, kind="stable")
+        position = np.empty_like(by_count)
+        position[by_count] = np.arange(len(by_count))
+        entities, counts, inverse = entities[by_count], counts[by_count], position[inverse]
+
+        idx, rank = _positions(hashes[both], self.precision)
+        order = np.argsort(inverse, kind="stable")
+        inverse, idx, rank = inverse[order], idx[order], rank[order]
+        for start in range(0, len(entities), _BLOCK):
+            stop = min(start + _BLOCK, len(entities))
+            lo, hi = np.searchsorted(inverse, [start, stop])
+            block = np.zeros((stop - start, 1 << self.precision), dtype=np.uint8)
+            np.maximum.at(block, (inverse[lo:hi] - start, idx[lo:hi]), rank[lo:hi])
+            for j, (key, count) in enumerate(zip(entities[start:stop].tolist(), counts[start:stop].tolist())):
+                sketch = self._touch(dim, _canonical(entity_value(key)), count)
+                np.maximum(sketch.registers, block[j], out=sketch.registers)
+
+    def add_batch(self, batch: LogBatch, source: str, normalizer: Optional[Normalizer] = None) -> None:
+        """
+        Sketches a LogBatch column-wise: rows are grouped by entity and
+        each group's registers are filled in one np.maximum.at. Failed
+        logins (tagged rows only) go through the normalizer, since sshd
+        keeps the account and IP in the message.
+        """
+        if len(batch) == 0:
+            return
+        normalizer = normalizer or default_normalizer()
+        mapping = normalizer.mappings[source]
+        columns = {}
+        for field in ("src.ip", "dst.ip", "dst.port"):
+            name = _field(batch, mapping.fields.get(field, []))
+            if name is not None:
+                columns[field] = _hashed_column(batch, name)
+        for dim, (entity, value, _) in DIMENSIONS.items():
+            if dim != "users_per_src" and entity in columns and value in columns:
+                self._add_columns(dim, columns[entity], columns[value])
+        for row in batch.suspicious():
+            self._add_failure(normalizer.normalize(row))
+        self.events += len(batch)
+
+    def merge(self, other: "FanDetector") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Only detectors with the same precision can be merged")
+        for dim, sketches in other._sketches.items():
+            events = other._events[dim]
+            for entity, sketch in sketches.items():
+                self._touch(dim, entity, events[entity]).merge(sketch)
+        self.events += other.events
+
+    def findings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Entities at or above their dimension's threshold, furthest above
+        it first. Estimates are capped at the entity's event count.
+        """
+        out = []
+        for dim, (entity, value, kind) in DIMENSIONS.items():
+            sketches, events = self._sketches[dim], self._events[dim]
+            if not sketches:
+                continue
+            estimates = _estimate(np.stack([s.registers for s in sketches.values()]))
+            threshold = self.thresholds[dim]
+            for key, estimate in zip(sketches, estimates.tolist()):
+                distinct = min(int(round(estimate)), events[key])
+                if distinct >= threshold:
+                    out.append((distinct / max(threshold, 1), {
+                        "type": kind,
+                        attr_name(entity): key,
+                        f"distinct_{attr_name(value)}": distinct,
+                        "events": events[key],
+                    }))
+        out.sort(key=lambda item: -item[0])
+        return [finding for _, finding in out[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        m = 1 << self.precision
+        return {
+            "events": self.events,
+            "entities": {dim: len(sketches) for dim, sketches in self._sketches.items()},
+            "precision": self.precision,
+            "relative_error": round(1.04 / math.sqrt(m), 4),
+            "sketch_bytes": m * sum(len(sketches) for sketches in self._sketches.values()),
+        }
+
+
+def detect_fan(
+    batch: LogBatch,
+    source: str,
+    detector: Optional[FanDetector] = None,
+    limit: Optional[int] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Scans, password sprays and distributed floods in a LogBatch (the
+    source's src.ip, dst.ip, dst.port and failed-login fields).
+    """
+    detector = detector or FanDetector()
+    detector.add_batch(batch, source, normalizer)
+    return detector.findings(limit)
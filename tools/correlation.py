@@ -0,0 +1,234 @@
+from collections import Counter, OrderedDict, deque
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Mapping, Optional
+
+from config import (
+    ACCOUNT_ATTACK_THRESHOLD,
+    AUTH_FAILURE_TAGS,
+    AUTH_MAX_KEYS,
+    AUTH_WINDOW_SECONDS,
+    BRUTE_FORCE_THRESHOLD,
+    SPRAY_USER_THRESHOLD,
+)
+from .normalizer import NormalizedEvent, Normalizer, default_normalizer, login_parties
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser
+from .triage import OTHER
+
+# Distinct counterparts (users of an IP, IPs of a user) kept per key
+_MAX_TARGETS = 50
+
+
+def _iso(epoch: Optional[int]) -> Optional[str]:
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch // NS_PER_SECOND, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class _Window:
+    """
+    Failures of one key (an IP or an account) in the last `window_ns`,
+    with running totals so each update is amortized O(1): every failure
+    is appended once and popped once.
+    """
+
+    __slots__ = (
+        "entries", "in_window", "distinct", "targets", "total",
+        "now", "first", "last", "peak", "peak_distinct", "peak_at",
+    )
+
+    def __init__(self):
+        # (epoch, counterpart, count), oldest first
+        self.entries: deque = deque()
+        self.in_window = 0
+        # counterpart -> failures in the window
+        self.distinct: Dict[str, int] = {}
+        # counterpart -> all failures; at most _MAX_TARGETS keys
+        self.targets: Counter = Counter()
+        self.total = 0
+        self.now = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.peak = 0
+        self.peak_distinct = 0
+        self.peak_at: Optional[int] = None
+
+    def add(self, epoch: int, other: Optional[str], count: int, window_ns: int) -> None:
+        if epoch != INT64_NULL:
+            if self.first is None or epoch < self.first:
+                self.first = epoch
+            if self.last is None or epoch > self.last:
+                self.last = self.now = epoch
+        # A late record counts at the latest time seen, keeping the deque
+        # sorted
+        now = self.now
+
+        entries = self.entries
+        entries.append((now, other, count))
+        self.in_window += count
+        self.total += count
+        if other is not None:
+            distinct = self.distinct
+            distinct[other] = distinct.get(other, 0) + count
+            targets = self.targets
+            if other in targets or len(targets) < _MAX_TARGETS:
+                targets[other] = targets.get(other, 0) + count
+            else:
+                targets[OTHER] = targets.get(OTHER, 0) + count
+
+        horizon = now - window_ns
+        if entries[0][0] <= horizon:
+            distinct = self.distinct
+            while entries and entries[0][0] <= horizon:
+                _, old, n = entries.popleft()
+                self.in_window -= n
+                if old is not None:
+                    left = distinct[old] - n
+                    if left:
+                        distinct[old] = left
+                    else:
+                        del distinct[old]
+
+        if self.in_window > self.peak:
+            self.peak = self.in_window
+            self.peak_at = self.last
+        if len(self.distinct) > self.peak_distinct:
+            self.peak_distinct = len(self.distinct)
+
+
+class AuthCorrelator:
+    """
+    Counts authentication failures over time: a sliding window per source
+    IP and per account, so brute force, password spraying and attacks on
+    one account show up as a few findings with counts and first / last
+    seen times instead of thousands of records.
+
+    - password_spray: one IP failing against `spray_users` distinct
+      accounts within the window
+    - brute_force: one IP with `brute_force` failures within the window
+    - account_brute_force: one account with `account_attack` failures
+      within the window, from several (or unknown) IPs
+
+    A failure is a record carrying one of `failure_tags`. Records should
+    arrive roughly in time order; a late one counts at its key's latest
+    time. Each index keeps at most `max_keys` keys (least recently seen
+    go first, and their findings are kept).
+    """
+
+    def __init__(
+        self,
+        window: float = AUTH_WINDOW_SECONDS,
+        brute_force: int = BRUTE_FORCE_THRESHOLD,
+        spray_users: int = SPRAY_USER_THRESHOLD,
+        account_attack: int = ACCOUNT_ATTACK_THRESHOLD,
+        failure_tags: Iterable[str] = AUTH_FAILURE_TAGS,
+        max_keys: int = AUTH_MAX_KEYS,
+    ):
+        self.window_ns = int(window * NS_PER_SECOND)
+        self.brute_force = brute_force
+        self.spray_users = spray_users
+        self.account_attack = account_attack
+        self.failure_tags = frozenset(failure_tags)
+        self.max_keys = max_keys
+        self._by_ip: "OrderedDict[str, _Window]" = OrderedDict()
+        self._by_user: "OrderedDict[str, _Window]" = OrderedDict()
+        # Findings of evicted keys
+        self._closed: List[Dict[str, Any]] = []
+        self._parser = TimestampParser()
+        self.failures = 0
+
+    def _window(self, index: "OrderedDict[str, _Window]", key: str, kind: str) -> _Window:
+        win = index.get(key)
+        if win is not None:
+            index.move_to_end(key)
+            return win
+        if len(index) >= self.max_keys:
+            old_key, old = index.popitem(last=False)
+            finding = self._finding(kind, old_key, old)
+            if finding is not None:
+                self._closed.append(finding)
+        win = index[key] = _Window()
+        return win
+
+    def add(self, src_ip: Optional[str], user: Optional[str], epoch: int = INT64_NULL, count: int = 1) -> None:
+        """
+        One failure (or `count` identical ones) by `user` from `src_ip`;
+        either may be None when unknown. `epoch` is in ns.
+        """
+        self.failures += count
+        if src_ip is not None:
+            self._window(self._by_ip, src_ip, "ip").add(epoch, user, count, self.window_ns)
+        if user is not None:
+            self._window(self._by_user, user, "user").add(epoch, src_ip, count, self.window_ns)
+
+    def add_event(self, ev: NormalizedEvent) -> bool:
+        """
+        Counts the event if it is a failure; returns whether it was.
+        """
+        if self.failure_tags.isdisjoint(ev.tags):
+            return False
+        src_ip, user = login_parties(ev)
+        epoch = self._parser.parse(ev.timestamp)[0] if ev.timestamp is not None else INT64_NULL
+        self.add(src_ip, user, epoch, ev.count)
+        return True
+
+    def _finding(self, kind: str, key: str, win: _Window) -> Optional[Dict[str, Any]]:
+        if kind == "ip":
+            if win.peak_distinct >= self.spray_users:
+                name = "password_spray"
+            elif win.peak >= self.brute_force:
+                name = "brute_force"
+            else:
+                return None
+            finding = {"type": name, "src_ip": key, "users": dict(win.targets.most_common(5))}
+        else:
+            # From a single IP it is already that IP's finding
+            if win.peak < self.account_attack or win.peak_distinct == 1:
+                return None
+            finding = {"type": "account_brute_force", "user": key, "src_ips": dict(win.targets.most_common(5))}
+        finding.update({
+            "failures": win.total,
+            "peak_failures_in_window": win.peak,
+            "peak_distinct_in_window": win.peak_distinct,
+            "window_seconds": self.window_ns / NS_PER_SECOND,
+            "first_seen": _iso(win.first),
+            "last_seen": _iso(win.last),
+            "peak_at": _iso(win.peak_at),
+        })
+        return finding
+
+    def findings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Brute-force, spray and account findings, strongest (highest peak
+        in a window) first.
+        """
+        out = list(self._closed)
+        for kind, index in (("ip", self._by_ip), ("user", self._by_user)):
+            for key, win in index.items():
+                finding = self._finding(kind, key, win)
+                if finding is not None:
+                    out.append(finding)
+        out.sort(key=lambda f: (-f["peak_failures_in_window"], -f["failures"]))
+        return out[:limit]
+
+    def stats(self) -> Dict[str, int]:
+        return {"failures": self.failures, "src_ips": len(self._by_ip), "users": len(self._by_user)}
+
+
+def correlate(
+    records: Iterable[Mapping[str, Any]],
+    source: Optional[str] = None,
+    correlator: Optional[AuthCorrelator] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> AuthCorrelator:
+    """
+    Feeds tagged records (e.g. the suspicious records, before dedup)
+    through an AuthCorrelator. Without `source`, each record's mapping is
+    detected from its own fields.
+    """
+    correlator = correlator or AuthCorrelator()
+    normalizer = normalizer or default_normalizer()
+    normalize = normalizer.compiled(source) if source is not None else normalizer.normalize
+    for rec in records:
+        correlator.add_event(normalize(rec))
+    return correlator
+
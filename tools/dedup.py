@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional
+
+from config import DEDUP_CASELESS_FIELDS, DEDUP_IGNORE_FIELDS, DEDUP_MAX_KEYS, DEDUP_TIMESTAMP_TOLERANCE
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser
+
+DUP_COUNT_FIELD = "dup_count"
+
+# Derived by the pipeline, never part of a record's identity
+_DERIVED_FIELDS = frozenset(("tags", DUP_COUNT_FIELD))
+
+
+def _normalize(value: Any, caseless: bool = False) -> str:
+    if isinstance(value, str):
+        return " ".join((value.lower() if caseless else value).split())
+    return repr(value)
+
+
+class Deduplicator:
+    """
+    Collapses exact and near-duplicate records into one representative
+    carrying a dup_count.
+
+    A record's key is a blake2b digest of its normalized fields (strings
+    with whitespace collapsed, lowercased only in the case-insensitive
+    `caseless_fields`), leaving out `ignore_fields` and the timestamp. Timestamps are compared separately: a record is a
+    duplicate when its key was seen and its timestamp lies within
+    `tolerance` seconds of the last duplicate folded into that
+    representative. Keys live in an LRU map of at most `max_keys` entries,
+    so memory stays bounded on endless streams.
+    """
+
+    TIMESTAMP_FIELD = "timestamp"
+
+    def __init__(
+        self,
+        ignore_fields: Iterable[str] = DEDUP_IGNORE_FIELDS,
+        tolerance: float = DEDUP_TIMESTAMP_TOLERANCE,
+        max_keys: int = DEDUP_MAX_KEYS,
+        caseless_fields: Iterable[str] = DEDUP_CASELESS_FIELDS,
+    ):
+        self.ignore_fields = frozenset(ignore_fields) | _DERIVED_FIELDS
+        self.caseless_fields = frozenset(caseless_fields)
+        self.tolerance_ns = int(tolerance * NS_PER_SECOND)
+        self.max_keys = max_keys
+        # digest -> [representative, epoch of the latest duplicate]
+        self._seen: "OrderedDict[bytes, List[Any]]" = OrderedDict()
+        self._parser = TimestampParser()
+        self.total = 0
+        self.duplicates = 0
+
+    def key(self, rec: Mapping[str, Any]) -> bytes:
+        h = blake2b(digest_size=16)
+        for name in sorted(rec):
+            if name in self.ignore_fields or name == self.TIMESTAMP_FIELD:
+                continue
+            h.update(f"{name}\x1f{_normalize(rec[name], name in self.caseless_fields)}\x1e".encode("utf-8", "surrogatepass"))
+        return h.digest()
+
+    def _epoch(self, rec: Mapping[str, Any]) -> Optional[int]:
+        if self.TIMESTAMP_FIELD in self.ignore_fields:
+            return None
+        value = rec.get(self.TIMESTAMP_FIELD)
+        if value is None:
+            return None
+        epoch, _ = self._parser.parse(value)
+        return None if epoch == INT64_NULL else epoch
+
+    def add(self, rec: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns a new representative (a dict copy with dup_count=1), or
+        None when the record was folded into an earlier one.
+        """
+        self.total += 1
+        digest = self.key(rec)
+        epoch = self._epoch(rec)
+        entry = self._seen.get(digest)
+        if entry is not None:
+            rep, last = entry
+            if epoch is not None and last is not None:
+                same_time = abs(epoch - last) <= self.tolerance_ns
+            elif self.TIMESTAMP_FIELD in self.ignore_fields:
+                same_time = True
+            else:
+                # Missing or unparseable timestamps must match exactly
+                same_time = rep.get(self.TIMESTAMP_FIELD) == rec.get(self.TIMESTAMP_FIELD)
+            if same_time:
+                rep[DUP_COUNT_FIELD] += 1
+                if epoch is not None:
+                    entry[1] = epoch
+                self._seen.move_to_end(digest)
+                self.duplicates += 1
+                return None
+
+        rep = dict(rec)
+        rep[DUP_COUNT_FIELD] = 1
+        self._seen[digest] = [rep, epoch]
+        self._seen.move_to_end(digest)
+        if len(self._seen) > self.max_keys:
+            self._seen.popitem(last=False)
+        return rep
+
+    def iter_unique(self, records: Iterable[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Yields representatives as they are first seen; their dup_count keeps
+        growing while later duplicates arrive.
+        """
+        for rec in records:
+            rep = self.add(rec)
+            if rep is not None:
+                yield rep
+
+
+def dedup_records(records: Iterable[Mapping[str, Any]], dedup: Optional[Deduplicator] = None) -> List[Dict[str, Any]]:
+    """
+    List of representatives with final dup_counts, in first-seen order.
+    """
+    return list((dedup or Deduplicator()).iter_unique(records))
@@ -0,0 +1,225 @@
+import json
+import os
+import tempfile
+import time
+from typing import List, Dict, Any, BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+from config import FOLLOW_INTERVAL, FOLLOW_MAX_BATCH_BYTES, FOLLOW_STATE_PATH
+from .log_parser import CHUNK_SIZE, PathLike, iter_logs
+from .tag_rules import TagRuleSet
+
+
+class OffsetStore:
+    """
+    Committed read positions of followed files, persisted as JSON:
+    {path: {"dev": ..., "ino": ..., "offset": ...}}.
+
+    Saves are atomic (temp file in the same directory, fsync, os.replace),
+    so a crash leaves either the old or the new state, never a torn file.
+    """
+
+    def __init__(self, path: PathLike = FOLLOW_STATE_PATH):
+        self.path = os.fspath(path)
+        self.offsets: Dict[str, Dict[str, int]] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            if isinstance(data, dict):
+                self.offsets = data
+
+    def get(self, path: str) -> Optional[Dict[str, int]]:
+        return self.offsets.get(path)
+
+    def set(self, path: str, dev: int, ino: int, offset: int) -> None:
+        self.offsets[path] = {"dev": dev, "ino": ino, "offset": offset}
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix=".offsets-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self.offsets, fh, indent=2, sort_keys=True)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+
+class FileFollower:
+    """
+    Tails one file, handing out complete lines only.
+
+    - rotation (the path now names another inode): the old file is read to
+      its end first, then the new one is followed from its start
+    - truncation (size below the read position, e.g. copytruncate): reading
+      restarts at the top
+    - a missing file is retried on every poll
+
+    `offset` is the position after the last line handed out; `committed`
+    trails it until commit() is called once those lines are processed, so
+    a restart from the store re-reads nothing already committed and skips
+    nothing that was not.
+    """
+
+    def __init__(self, path: PathLike, store: OffsetStore, from_end: bool = False):
+        self.path = os.path.abspath(os.fspath(path))
+        self.store = store
+        self.from_end = from_end
+        self._fh: Optional[BinaryIO] = None
+        self._dev = self._ino = 0
+        self._tail = b""
+        self.offset = 0
+        self.committed = 0
+        self.rotations = 0
+        self.truncations = 0
+
+    def _open(self, resume: bool = True) -> bool:
+        try:
+            fh = open(self.path, "rb")
+        except FileNotFoundError:
+            return False
+        st = os.fstat(fh.fileno())
+        saved = self.store.get(self.path) if resume else None
+        if saved is not None and (saved["dev"], saved["ino"]) == (st.st_dev, st.st_ino) and saved["offset"] <= st.st_size:
+            offset = saved["offset"]
+        elif resume and saved is None and self.from_end:
+            offset = st.st_size
+        else:
+            # A new inode (or one shorter than the saved offset) is a new file
+            offset = 0
+        fh.seek(offset)
+        self._fh, self._dev, self._ino = fh, st.st_dev, st.st_ino
+        self._tail = b""
+        self.offset = self.committed = offset
+        return True
+
+    def _rotated(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Between the rename and the new file's creation
+            return False
+        return (st.st_dev, st.st_ino) != (self._dev, self._ino)
+
+    def _read(self, max_bytes: int) -> bytes:
+        """
+        Complete lines from the current position, up to about max_bytes.
+        """
+        fh = self._fh
+        if os.fstat(fh.fileno()).st_size < self.offset + len(self._tail):
+            self.truncations += 1
+            fh.seek(0)
+            self._tail = b""
+            self.offset = self.committed = 0
+
+        data = self._tail
+        while len(data) < max_bytes:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            data += chunk
+        cut = data.rfind(b"\n") + 1
+        self._tail = data[cut:]
+        self.offset += cut
+        return data[:cut]
+
+    def poll(self, max_bytes: int = FOLLOW_MAX_BATCH_BYTES) -> bytes:
+        """
+        New complete lines (possibly none), newline-terminated.
+        """
+        if self._fh is None and not self._open(resume=not self.rotations):
+            return b""
+        data = self._read(max_bytes)
+        if data or not self._rotated():
+            return data
+
+        # Nothing left in the old file: flush its unterminated last line and
+        # move on to the file that now has the name
+        data = self._tail + b"\n" if self._tail.strip() else b""
+        self._fh.close()
+        self._fh = None
+        self.rotations += 1
+        self._open(resume=False)
+        return data
+
+    def commit(self) -> None:
+        """
+        Records everything handed out so far as processed.
+        """
+        if self._fh is None:
+            return
+        self.committed = self.offset
+        self.store.set(self.path, self._dev, self._ino, self.committed)
+
+    def close(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+class LogFollower:
+    """
+    Follows several files; see FileFollower for rotation and truncation.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[PathLike],
+        state_path: PathLike = FOLLOW_STATE_PATH,
+        from_end: bool = False,
+    ):
+        self.store = OffsetStore(state_path)
+        self.followers = [FileFollower(p, self.store, from_end) for p in paths]
+
+    def batches(
+        self,
+        interval: float = FOLLOW_INTERVAL,
+        max_bytes: int = FOLLOW_MAX_BATCH_BYTES,
+        stop: Optional[Callable[[], bool]] = None,
+    ) -> Iterator[Tuple[str, bytes]]:
+        """
+        Yields (path, new lines) as they are written, sleeping `interval`
+        seconds whenever no file has grown. A batch's offset is committed
+        (and the store saved) when the consumer asks for the next one, i.e.
+        after it has been processed. Runs until `stop()` returns True.
+        """
+        try:
+            while stop is None or not stop():
+                idle = True
+                for follower in self.followers:
+                    data = follower.poll(max_bytes)
+                    if not data:
+                        continue
+                    idle = False
+                    yield follower.path, data
+                    follower.commit()
+                    self.store.save()
+                if idle:
+                    time.sleep(interval)
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for follower in self.followers:
+            follower.close()
+
+
+def follow_logs(
+    paths: Iterable[PathLike],
+    state_path: PathLike = FOLLOW_STATE_PATH,
+    rules: Optional[TagRuleSet] = None,
+    interval: float = FOLLOW_INTERVAL,
+    stop: Optional[Callable[[], bool]] = None,
+    from_end: bool = False,
+) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Parsed and tagged records of every new batch of lines, as (path,
+    records). Works for line-based formats (JSONL, syslog, CEF, LEEF); the
+    format is sniffed per batch.
+    """
+    follower = LogFollower(paths, state_path, from_end)
+    for path, data in follower.batches(interval, stop=stop):
+        yield path, list(iter_logs(data, rules=rules))
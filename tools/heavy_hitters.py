@@ -0,0 +1,168 @@
+import heapq
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config import TOPK_CAPACITY, TOPK_FIELDS
+from .beaconing import _address_keys, _field
+from .log_batch import LogBatch
+from .normalizer import NormalizedEvent, Normalizer, attr_name, default_normalizer
+
+
+class SpaceSaving:
+    """
+    Approximate top-k of a stream in `capacity` counters (Space-Saving).
+
+    A new key, once all counters are taken, replaces the key with the
+    smallest count and inherits that count as its `error`. For every
+    tracked key, count - error <= true count <= count, and any key with
+    true count above total / capacity is guaranteed to be tracked.
+
+    The smallest counter is found through a min-heap with one entry per
+    key, refreshed lazily: counts only grow, so a stale entry is re-pushed
+    with its current count when it surfaces.
+    """
+
+    __slots__ = ("capacity", "total", "_counts", "_heap")
+
+    def __init__(self, capacity: int = TOPK_CAPACITY):
+        self.capacity = capacity
+        self.total = 0
+        # key -> [count, error]
+        self._counts: Dict[Any, List[int]] = {}
+        self._heap: List[Tuple[int, int, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._counts
+
+    def _evict(self) -> int:
+        """
+        Drops the key with the smallest count; returns that count.
+        """
+        heap, counts = self._heap, self._counts
+        while True:
+            count, tie, key = heap[0]
+            current = counts[key][0]
+            if current == count:
+                heapq.heappop(heap)
+                del counts[key]
+                return count
+            heapq.heapreplace(heap, (current, tie, key))
+
+    def add(self, key: Any, count: int = 1) -> None:
+        self.total += count
+        entry = self._counts.get(key)
+        if entry is not None:
+            entry[0] += count
+            return
+        error = 0
+        if len(self._counts) >= self.capacity:
+            error = self._evict()
+        self._counts[key] = [error + count, error]
+        # id() breaks count ties without comparing keys of mixed types
+        heapq.heappush(self._heap, (error + count, id(key), key))
+
+    def count(self, key: Any) -> int:
+        """
+        Upper bound on the key's count (0 when not tracked).
+        """
+        entry = self._counts.get(key)
+        return entry[0] if entry is not None else 0
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[Any, int, int]]:
+        """
+        (key, count, error) of the n largest counters, largest first.
+        """
+        ranked = sorted(self._counts.items(), key=lambda item: -item[1][0])[:n]
+        return [(key, count, error) for key, (count, error) in ranked]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        """
+        Folds in another summary (e.g. from a parallel worker). A key
+        tracked by only one side may have had up to the other side's
+        smallest count there, which is added to both its count and error;
+        the largest `capacity` counters are kept.
+        """
+        def floor(summary: "SpaceSaving") -> int:
+            if len(summary) < summary.capacity:
+                return 0
+            return min(count for count, _ in summary._counts.values())
+
+        mine, theirs = floor(self), floor(other)
+        merged: Dict[Any, List[int]] = {}
+        for key in self._counts.keys() | other._counts.keys():
+            a = self._counts.get(key, [mine, mine])
+            b = other._counts.get(key, [theirs, theirs])
+            merged[key] = [a[0] + b[0], a[1] + b[1]]
+        kept = sorted(merged.items(), key=lambda item: -item[1][0])[:self.capacity]
+        self.total += other.total
+        self._counts = dict(kept)
+        self._heap = [(count, id(key), key) for key, (count, _) in kept]
+        heapq.heapify(self._heap)
+
+
+class HeavyHitters:
+    """
+    Top talkers and targets: one SpaceSaving summary per canonical field
+    (e.g. src.ip, dst.ip, user.name), fed with normalized events so every
+    log source counts under the same names.
+    """
+
+    def __init__(self, fields: Iterable[str] = TOPK_FIELDS, capacity: int = TOPK_CAPACITY):
+        self.fields: List[str] = list(dict.fromkeys(fields))
+        self.capacity = capacity
+        self._attrs = [attr_name(f) for f in self.fields]
+        self.summaries: Dict[str, SpaceSaving] = {f: SpaceSaving(capacity) for f in self.fields}
+
+    def add_event(self, ev: NormalizedEvent) -> None:
+        for field, attr in zip(self.fields, self._attrs):
+            value = getattr(ev, attr)
+            if isinstance(value, (str, int, float)):
+                self.summaries[field].add(value, ev.count)
+
+    def add_batch(self, batch: LogBatch, source: str, normalizer: Optional[Normalizer] = None) -> None:
+        """
+        Counts a LogBatch column by column: each column's keys are counted
+        with np.unique, and the distinct values reach the summaries once,
+        largest count first (which keeps weighted Space-Saving exact for
+        the top values).
+        """
+        if len(batch) == 0:
+            return
+        mapping = (normalizer or default_normalizer()).mappings[source]
+        for field in self.fields:
+            name = _field(batch, mapping.fields.get(field, []))
+            if name is None:
+                continue
+            keys, value = _address_keys(batch, name)
+            distinct, counts = np.unique(keys[keys != -1], return_counts=True)
+            order = np.argsort(-counts, kind="stable")
+            summary = self.summaries[field]
+            for key, count in zip(distinct[order].tolist(), counts[order].tolist()):
+                key = value(key)
+                if isinstance(key, (str, int, float)):
+                    summary.add(key, count)
+
+    def merge(self, other: "HeavyHitters") -> None:
+        for field, summary in other.summaries.items():
+            if field in self.summaries:
+                self.summaries[field].merge(summary)
+
+    def rank(self, field: str) -> Dict[Any, int]:
+        """
+        {value: estimated count} for a field, largest first.
+        """
+        return {key: count for key, count, _ in self.summaries[field].top()}
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Top values per field for session memory and prompts; the true
+        count lies between count - error and count.
+        """
+        return {
+            field: [{"value": key, "count": count, "error": error} for key, count, error in summary.top(limit)]
+            for field, summary in self.summaries.items()
+        }
@@ -0,0 +1,200 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import zlib
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Type, Union
+
+from .log_parser import PathLike
+
+Buffer = Union[mmap.mmap, bytes]
+
+# Magic bytes of the compressed formats we stream through
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"BZh", "bz2"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+)
+MAGIC_BYTES = max(len(magic) for magic, _ in _MAGIC)
+
+
+class UnreadableLogError(OSError):
+    """
+    A log file could not be opened. Raised only where the file is opened,
+    so callers can skip the file without masking OSErrors from the parser.
+    """
+
+
+class UnsupportedCompressionError(ValueError):
+    """
+    Input is compressed in a format this install cannot decompress.
+    """
+
+
+class CorruptCompressionError(ValueError):
+    """
+    A compressed stream turned out truncated or corrupt while being read.
+    """
+
+
+def open_binary(path: PathLike) -> BinaryIO:
+    """
+    Opens a log file for binary reading, raising UnreadableLogError if it
+    cannot be opened.
+    """
+    try:
+        return open(path, "rb")
+    except OSError as e:
+        raise UnreadableLogError(f"Could not read {path}: {e}") from e
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """
+    Returns "gzip", "bz2", "xz" or "zstd" from the leading bytes, else None.
+    """
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class _PrefixedReader:
+    """
+    Replays bytes already read for sniffing in front of a non-seekable stream.
+    """
+
+    def __init__(self, prefix: bytes, fileobj: BinaryIO):
+        self._prefix = prefix
+        self._fileobj = fileobj
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._prefix:
+            return self._fileobj.read(size)
+        if size is None or size < 0:
+            data, self._prefix = self._prefix + self._fileobj.read(), b""
+            return data
+        data, self._prefix = self._prefix[:size], self._prefix[size:]
+        if len(data) < size:
+            data += self._fileobj.read(size - len(data))
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+
+# What gzip/bz2/xz raise on truncated or corrupt data
+_DECOMPRESS_ERRORS: Tuple[Type[BaseException], ...] = (OSError, EOFError, zlib.error, lzma.LZMAError)
+
+
+class _CheckedReader:
+    """
+    Decompressed stream that reports corrupt input as one error type,
+    whichever library raised it.
+    """
+
+    def __init__(self, kind: str, stream: Any, errors: Tuple[Type[BaseException], ...] = _DECOMPRESS_ERRORS):
+        self.kind = kind
+        self._stream = stream
+        self._errors = errors
+
+    def read(self, size: int = -1) -> bytes:
+        try:
+            return self._stream.read(size)
+        except self._errors as e:
+            raise CorruptCompressionError(f"Corrupt or truncated {self.kind} input: {e}") from e
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self._stream.close()
+
+    def __enter__(self) -> "_CheckedReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def _decompressor(kind: str, fileobj: BinaryIO) -> BinaryIO:
+    if kind == "gzip":
+        stream: Any = gzip.GzipFile(fileobj=fileobj, mode="rb")
+    elif kind == "bz2":
+        stream = bz2.BZ2File(fileobj, mode="rb")
+    elif kind == "xz":
+        stream = lzma.LZMAFile(fileobj, mode="rb")
+    else:
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedCompressionError("zstd-compressed input requires the 'zstandard' package")
+        stream = zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+        return _CheckedReader(kind, stream, _DECOMPRESS_ERRORS + (zstandard.ZstdError,))  # type: ignore[return-value]
+    return _CheckedReader(kind, stream)  # type: ignore[return-value]
+
+
+def open_decompressed(fileobj: BinaryIO) -> BinaryIO:
+    """
+    Wraps a binary stream in a streaming decompressor when its magic bytes
+    say it is gzip/bz2/xz/zstd; otherwise returns a stream positioned at the
+    same data. Nothing is decompressed ahead of the parser's reads.
+
+    Raises UnsupportedCompressionError for zstd without the zstandard
+    package; reads raise CorruptCompressionError on corrupt input.
+    """
+    seekable = getattr(fileobj, "seekable", lambda: False)()
+    start = fileobj.tell() if seekable else 0
+    head = fileobj.read(MAGIC_BYTES)
+    if seekable:
+        fileobj.seek(start)
+        stream: BinaryIO = fileobj
+    else:
+        stream = _PrefixedReader(head, fileobj)  # type: ignore[assignment]
+
+    kind = detect_compression(head)
+    return _decompressor(kind, stream) if kind else stream
+
+
+@contextmanager
+def map_file(path: PathLike) -> Iterator[Buffer]:
+    """
+    Memory-maps a log file read-only for the duration of the block.
+
+    Pages are faulted in as the parser walks the mapping, so nothing is
+    decoded to str up front and resident memory follows the parser rather
+    than the file size. Empty files (which cannot be mapped) yield b"".
+    """
+    with open_binary(path) as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b""
+            return
+        try:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            yield mapped
+        finally:
+            mapped.close()
+
+
+def file_compression(path: PathLike) -> Optional[str]:
+    with open_binary(path) as fh:
+        return detect_compression(fh.read(MAGIC_BYTES))
+
+
+@contextmanager
+def open_log_file(path: PathLike) -> Iterator[Union[Buffer, BinaryIO]]:
+    """
+    Opens a log file for the parser: compressed files are decompressed as a
+    stream, plain files are memory-mapped.
+    """
+    if file_compression(path) is None:
+        with map_file(path) as mapped:
+            yield mapped
+        return
+    with open_binary(path) as fh:
+        with open_decompressed(fh) as stream:
+            yield stream
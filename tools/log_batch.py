@@ -0,0 +1,414 @@
+from array import array
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Mapping, Optional, Tuple
+
+from .log_parser import LogSource, iter_tagged
+from .symbols import SymbolTable
+from .tag_rules import TagRuleSet, default_rules
+from .timestamps import (
+    INT64_NULL,
+    TS_MISSING,
+    TS_OTHER,
+    TimeIndex,
+    TimeLike,
+    TimestampParser,
+    format_timestamp_ns,
+)
+
+_MISSING = object()
+_CODE_MISSING = -1
+_CODE_IPV4 = -2
+
+
+def _ipv4_to_int(value: str) -> Optional[int]:
+    """
+    Packs a dotted-quad string into an int, or None if it is not a canonical
+    IPv4 address (so the string form can always be rebuilt exactly).
+    """
+    parts = value.split(".")
+    if len(parts) != 4:
+        return None
+    n = 0
+    for p in parts:
+        if not (p.isascii() and p.isdigit()) or (len(p) > 1 and p[0] == "0") or len(p) > 3:
+            return None
+        octet = int(p)
+        if octet > 255:
+            return None
+        n = (n << 8) | octet
+    return n
+
+
+def _int_to_ipv4(n: int) -> str:
+    return f"{n >> 24}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+class _DictColumn:
+    """
+    Dictionary-encoded column: one int32 code per row pointing into a table
+    of distinct values. Unhashable values get their own table entry.
+    """
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self, n_rows: int):
+        self.codes = array("i", [_CODE_MISSING]) * n_rows
+        self.values: List[Any] = []
+        self._index: Dict[Tuple[type, Any], int] = {}
+
+    def encode(self, value: Any) -> int:
+        try:
+            key = (type(value), value)
+            code = self._index.get(key)
+        except TypeError:
+            key, code = None, None
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            if key is not None:
+                self._index[key] = code
+        return code
+
+    def append(self, value: Any) -> None:
+        self.codes.append(_CODE_MISSING if value is _MISSING else self.encode(value))
+
+    def get(self, i: int) -> Any:
+        code = self.codes[i]
+        return _MISSING if code == _CODE_MISSING else self.values[code]
+
+    def factorize(self) -> Tuple[array, List[Any]]:
+        return self.codes, self.values
+
+
+class _IPv4Column(_DictColumn):
+    """
+    IPv4 addresses packed as uint32; non-IPv4 values fall back to the
+    dictionary encoding. Addresses are rebuilt as strings on access, passed
+    through `intern` (e.g. SymbolTable.intern) so repeated reads share one
+    object.
+    """
+
+    __slots__ = ("addrs", "intern")
+
+    def __init__(self, n_rows: int, intern: Callable[[str], str] = str):
+        super().__init__(n_rows)
+        self.addrs = array("I", [0]) * n_rows
+        self.intern = intern
+
+    def append(self, value: Any) -> None:
+        packed = _ipv4_to_int(value) if isinstance(value, str) else None
+        if packed is None:
+            self.addrs.append(0)
+            super().append(value)
+        else:
+            self.addrs.append(packed)
+            self.codes.append(_CODE_IPV4)
+
+    def get(self, i: int) -> Any:
+        if self.codes[i] == _CODE_IPV4:
+            return self.intern(_int_to_ipv4(self.addrs[i]))
+        return super().get(i)
+
+    def factorize(self) -> Tuple[array, List[Any]]:
+        # Packed addresses get their own table entries, one per distinct address
+        codes = array("i", self.codes)
+        values = list(self.values)
+        index: Dict[int, int] = {}
+        for i, code in enumerate(codes):
+            if code == _CODE_IPV4:
+                addr = self.addrs[i]
+                code = index.get(addr)
+                if code is None:
+                    code = index[addr] = len(values)
+                    values.append(self.intern(_int_to_ipv4(addr)))
+                codes[i] = code
+        return codes, values
+
+
+class _TimestampColumn:
+    """
+    Timestamps as int64 epoch nanoseconds plus a format code that lets the
+    original string be rebuilt; other layouts keep their original value.
+    """
+
+    __slots__ = ("epochs", "formats", "_raw", "_parser")
+
+    def __init__(self, n_rows: int):
+        self.epochs = array("q", [INT64_NULL]) * n_rows
+        self.formats = array("b", [TS_MISSING]) * n_rows
+        self._raw: Dict[int, Any] = {}
+        self._parser = TimestampParser()
+
+    def append(self, value: Any) -> None:
+        if value is _MISSING:
+            self.epochs.append(INT64_NULL)
+            self.formats.append(TS_MISSING)
+            return
+
+        epoch, code = self._parser.parse(value)
+        if code == TS_OTHER:
+            self._raw[len(self.formats)] = value
+        self.epochs.append(epoch)
+        self.formats.append(code)
+
+    def get(self, i: int) -> Any:
+        code = self.formats[i]
+        if code == TS_MISSING:
+            return _MISSING
+        if code == TS_OTHER:
+            return self._raw[i]
+        return format_timestamp_ns(self.epochs[i], code)
+
+    def factorize(self) -> Tuple[array, List[Any]]:
+        col = _DictColumn(0)
+        for i in range(len(self.formats)):
+            col.append(self.get(i))
+        return col.factorize()
+
+
+class LogRow(Mapping):
+    """
+    Lazy, read-only dict view of one row of a LogBatch. Values are decoded
+    from the columns on access, so existing rec.get(...) code keeps working.
+    """
+
+    __slots__ = ("_batch", "_i")
+
+    def __init__(self, batch: "LogBatch", i: int):
+        self._batch = batch
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._batch._value(key, self._i)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self._batch._value(key, self._i)
+        return default if value is _MISSING else value
+
+    def __iter__(self) -> Iterator[str]:
+        i = self._i
+        for name, col in self._batch._columns.items():
+            if col.get(i) is not _MISSING:
+                yield name
+        yield "tags"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+
+class LogBatch:
+    """
+    Columnar container for parsed log records.
+
+    - timestamp: int64 epoch nanoseconds (see `timestamps`)
+    - IPv4 fields (src_ip, dst_ip): uint32 arrays (see `ipv4`)
+    - every other field: dictionary-encoded int32 codes
+    - tags: one int bitmask per row over `tag_names`
+    - schema: one int code per row over `schemas`, the distinct sets of
+      field names present (so rows can be grouped by log source)
+
+    Indexing/iterating yields LogRow views that behave like the dicts
+    returned by parse_logs. With a SymbolTable, rebuilt IPv4 strings are
+    interned in it.
+    """
+
+    TIMESTAMP_FIELD = "timestamp"
+    IPV4_FIELDS = ("src_ip", "dst_ip")
+
+    def __init__(self, tag_names: Optional[Iterable[str]] = None, symbols: Optional[SymbolTable] = None):
+        self._n = 0
+        self.symbols = symbols
+        self._columns: Dict[str, Any] = {}
+        self.tag_names: List[str] = []
+        self._tag_bits: Dict[str, int] = {}
+        self.tag_masks: List[int] = []
+        self.schemas: List[Tuple[str, ...]] = []
+        self.schema_codes = array("i")
+        self._schema_index: Dict[Tuple[str, ...], int] = {}
+        self._time_index: Optional[TimeIndex] = None
+        # Bits follow rule order, so tags_of lists a row's tags in the order
+        # the rule set reported them
+        self.tag_mask(default_rules().tag_order if tag_names is None else tag_names)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Mapping[str, Any]],
+        tag_names: Optional[Iterable[str]] = None,
+        symbols: Optional[SymbolTable] = None,
+    ) -> "LogBatch":
+        batch = cls(tag_names, symbols)
+        batch.extend(records)
+        return batch
+
+    def _new_column(self, name: str) -> Any:
+        if name == self.TIMESTAMP_FIELD:
+            col: Any = _TimestampColumn(self._n)
+        elif name in self.IPV4_FIELDS:
+            col = _IPv4Column(self._n, self.symbols.intern if self.symbols is not None else str)
+        else:
+            col = _DictColumn(self._n)
+        self._columns[name] = col
+        return col
+
+    def tag_mask(self, tags: Iterable[str]) -> int:
+        mask = 0
+        for tag in tags:
+            bit = self._tag_bits.get(tag)
+            if bit is None:
+                bit = self._tag_bits[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            mask |= 1 << bit
+        return mask
+
+    def append(self, rec: Mapping[str, Any], tags: Optional[Iterable[str]] = None) -> None:
+        """
+        Adds one record. Tags default to rec["tags"] as set by the parser.
+        """
+        if tags is None:
+            tags = rec.get("tags") or ()
+        schema = tuple(name for name in rec if name != "tags")
+        for name in schema:
+            if name not in self._columns:
+                self._new_column(name)
+        for name, col in self._columns.items():
+            col.append(rec.get(name, _MISSING))
+        self.tag_masks.append(self.tag_mask(tags))
+        code = self._schema_index.get(schema)
+        if code is None:
+            code = self._schema_index[schema] = len(self.schemas)
+            self.schemas.append(schema)
+        self.schema_codes.append(code)
+        self._n += 1
+        self._time_index = None
+
+    def extend(self, records: Iterable[Mapping[str, Any]]) -> None:
+        for rec in records:
+            self.append(rec)
+
+    def take(self, rows: Iterable[int]) -> "LogBatch":
+        """
+        New batch holding the given rows (same tag bits and symbols).
+        """
+        batch = LogBatch(self.tag_names, self.symbols)
+        for i in rows:
+            row = LogRow(self, i)
+            batch.append(row, self.tags_of(i))
+        return batch
+
+    def _value(self, key: str, i: int) -> Any:
+        if key == "tags":
+            return self.tags_of(i)
+        col = self._columns.get(key)
+        return _MISSING if col is None else col.get(i)
+
+    def tags_of(self, i: int) -> List[str]:
+        mask = self.tag_masks[i]
+        return [name for bit, name in enumerate(self.tag_names) if mask >> bit & 1]
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def timestamps(self) -> array:
+        """
+        int64 epoch-ns column (INT64_NULL where missing).
+        """
+        col = self._columns.get(self.TIMESTAMP_FIELD)
+        return col.epochs if col is not None else array("q", [INT64_NULL]) * self._n
+
+    def time_index(self) -> TimeIndex:
+        """
+        Sorted time index over the timestamp column, built on first use.
+        """
+        if self._time_index is None:
+            self._time_index = TimeIndex(self.timestamps)
+        return self._time_index
+
+    def between(self, start: TimeLike, end: TimeLike) -> List[LogRow]:
+        """
+        Rows with start <= timestamp <= end in time order (binary search,
+        no scan). Bounds may be epoch ns, ISO-8601 strings or datetimes.
+        """
+        return [LogRow(self, i) for i in self.time_index().between(start, end)]
+
+    def ipv4(self, name: str) -> array:
+        """
+        uint32 address column for an IPv4 field (0 where not an IPv4 value).
+        """
+        col = self._columns.get(name)
+        if not isinstance(col, _IPv4Column):
+            raise KeyError(f"{name} is not an IPv4 column")
+        return col.addrs
+
+    def factorize(self, name: str) -> Tuple[array, List[Any]]:
+        """
+        (codes, values) for any field, code -1 where missing; IPv4 and
+        timestamp columns are dictionary-encoded on the fly.
+        """
+        col = self._columns.get(name)
+        if col is None:
+            return array("i", [_CODE_MISSING]) * self._n, []
+        return col.factorize()
+
+    def dictionary(self, name: str) -> Tuple[array, List[Any]]:
+        """
+        (codes, values) of a dictionary-encoded column; code -1 is missing.
+        """
+        col = self._columns[name]
+        return col.codes, col.values
+
+    def suspicious(self) -> Iterator[LogRow]:
+        """
+        Rows with at least one tag, found by scanning the bitmask column.
+        """
+        for i, mask in enumerate(self.tag_masks):
+            if mask:
+                yield LogRow(self, i)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i: int) -> LogRow:
+        if i < 0:
+            i += self._n
+        if not 0 <= i < self._n:
+            raise IndexError("LogBatch index out of range")
+        return LogRow(self, i)
+
+    def __iter__(self) -> Iterator[LogRow]:
+        for i in range(self._n):
+            yield LogRow(self, i)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        return [row.to_dict() for row in self]
+
+    def __repr__(self) -> str:
+        return "[" + ", ".join(repr(row) for row in self) + "]"
+
+
+def parse_batch(
+    source: LogSource,
+    rules: Optional[TagRuleSet] = None,
+    symbols: Optional[SymbolTable] = None,
+) -> LogBatch:
+    """
+    Streams a log source straight into a LogBatch; no per-record dicts are
+    kept once each record has been appended to the columns, and tags go
+    straight into the bitmask column without a per-record list. With
+    `symbols`, the column dictionaries hold the session's interned values.
+    """
+    rules = rules or default_rules()
+    batch = LogBatch(rules.tag_order, symbols)
+    for rec, tags in iter_tagged(source, rules=rules, symbols=symbols):
+        batch.append(rec, tags or ())
+    return batch
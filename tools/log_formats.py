@@ -0,0 +1,301 @@
+import csv
+import json
+import re
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, Iterable, Iterator, Optional
+
+# How much of the input is inspected to pick a format
+SNIFF_BYTES = 4096
+
+JSON_ARRAY = "json"
+JSONL = "jsonl"
+# One JSON value spread over several lines, e.g. a single pretty-printed object
+JSON_DOCUMENT = "json_document"
+SYSLOG = "syslog"
+CEF = "cef"
+LEEF = "leef"
+CSV = "csv"
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"), 1
+)}
+
+_RFC5424 = re.compile(
+    r"<(?P<pri>\d{1,3})>(?P<ver>\d{1,2}) (?P<ts>\S+) (?P<host>\S+) (?P<app>\S+) "
+    r"(?P<pid>\S+) (?P<msgid>\S+) (?P<sd>-|(?:\[(?:[^\]\\]|\\.)*\])+) ?(?P<msg>.*)",
+    re.DOTALL,
+)
+_RFC3164 = re.compile(
+    r"(?:<(?P<pri>\d{1,3})>)?(?P<mon>[A-Z][a-z]{2}) +(?P<day>\d{1,2}) (?P<time>\d{2}:\d{2}:\d{2}) "
+    r"(?P<host>\S+) (?:(?P<app>[^:\[\s]+)(?:\[(?P<pid>[^\]]*)\])?: ?)?(?P<msg>.*)",
+    re.DOTALL,
+)
+_SYSLOG_HINT = re.compile(r"<\d{1,3}>|[A-Z][a-z]{2} +\d{1,2} \d{2}:\d{2}:\d{2} ")
+_MSG_SRC_IP = re.compile(r"(?:\bfrom |rhost=)(\d{1,3}(?:\.\d{1,3}){3})\b")
+
+_CEF = re.compile(
+    r"CEF:(?P<ver>\d+)\|(?P<vendor>(?:[^|\\]|\\.)*)\|(?P<product>(?:[^|\\]|\\.)*)\|"
+    r"(?P<version>(?:[^|\\]|\\.)*)\|(?P<sig>(?:[^|\\]|\\.)*)\|(?P<name>(?:[^|\\]|\\.)*)\|"
+    r"(?P<severity>(?:[^|\\]|\\.)*)\|(?P<ext>.*)",
+    re.DOTALL,
+)
+# key=value pairs; a value runs until the next " key=" or the end of line
+_CEF_EXT = re.compile(r"(\w+)=((?:\\.|[^\\])*?)(?=\s+\w+=|\s*$)", re.DOTALL)
+_CEF_UNESCAPE = re.compile(r"\\(.)")
+_LEEF = re.compile(
+    r"LEEF:(?P<ver>[\d.]+)\|(?P<vendor>[^|]*)\|(?P<product>[^|]*)\|(?P<version>[^|]*)\|"
+    r"(?P<event>[^|]*)\|(?P<rest>.*)",
+    re.DOTALL,
+)
+
+# Vendor field names -> the record schema used across the project
+_CEF_FIELDS = {
+    "src": "src_ip", "dst": "dst_ip", "spt": "src_port", "dpt": "dst_port",
+    "suser": "user", "duser": "dst_user", "act": "action", "msg": "message",
+    "rt": "timestamp", "proto": "protocol", "shost": "src_host", "dhost": "dst_host",
+    "request": "url", "out": "bytes_sent", "in": "bytes_received",
+}
+_LEEF_FIELDS = {
+    "src": "src_ip", "dst": "dst_ip", "srcPort": "src_port", "dstPort": "dst_port",
+    "usrName": "user", "action": "action", "msg": "message", "devTime": "timestamp",
+    "proto": "protocol", "sev": "severity", "cat": "category", "url": "url",
+    "srcBytes": "bytes_sent", "dstBytes": "bytes_received",
+}
+_CSV_FIELDS = {
+    "time": "timestamp", "date": "timestamp", "datetime": "timestamp", "@timestamp": "timestamp",
+    "src": "src_ip", "source_ip": "src_ip", "srcip": "src_ip", "source": "src_ip",
+    "dst": "dst_ip", "destination_ip": "dst_ip", "dstip": "dst_ip", "destination": "dst_ip",
+    "username": "user", "user_name": "user", "msg": "message", "event": "message",
+}
+_INT_FIELDS = frozenset(("src_port", "dst_port", "bytes_sent", "bytes_received"))
+_HEX_DELIMITER = re.compile(r"(?:0?x)([0-9a-f]{1,4})", re.IGNORECASE)
+
+
+def _first_line(head: str) -> str:
+    for line in head.splitlines():
+        if line.strip():
+            return line.strip()
+    return ""
+
+
+def _is_json(line: str) -> bool:
+    try:
+        json.loads(line)
+    except ValueError:
+        return False
+    return True
+
+
+def sniff_format(head: bytes) -> str:
+    """
+    Guesses the log format from the first few KB of input.
+    Anything unrecognised is treated as JSONL, as parse_logs always has.
+    """
+    text = head[:SNIFF_BYTES].decode("utf-8", errors="replace").lstrip("\ufeff")
+    line = _first_line(text)
+    if line.startswith("["):
+        return JSON_ARRAY
+    if line.startswith("{"):
+        # A first line that is not a whole JSON value opens a multi-line
+        # document, unless it is the only (possibly truncated) line we have
+        if _is_json(line) or "\n" not in text.strip():
+            return JSONL
+        return JSON_DOCUMENT
+    if "CEF:" in line:
+        return CEF
+    if "LEEF:" in line:
+        return LEEF
+    if _SYSLOG_HINT.match(line):
+        return SYSLOG
+    lines = [ln for ln in text.splitlines()[:-1] if ln.strip()] or [line]
+    if len(lines) > 1 and "," in line:
+        rows = list(csv.reader(lines[:20]))
+        header = rows[0]
+        if len({len(row) for row in rows}) == 1 and all(h.strip() and not h.strip().isdigit() for h in header):
+            return CSV
+    return JSONL
+
+
+def _iso_from_rfc3164(mon: str, day: str, time: str) -> str:
+    # RFC3164 carries no year; assume the current one
+    year = datetime.now(timezone.utc).year
+    return f"{year}-{_MONTHS.get(mon, 1):02d}-{int(day):02d}T{time}"
+
+
+def _to_int(value: str) -> Any:
+    return int(value) if value.isascii() and value.isdigit() else value
+
+
+def _iso_from_epoch(value: str) -> str:
+    """
+    Epoch digits -> ISO-8601, the unit told by the digit count: up to 10
+    digits are seconds, 11-13 milliseconds, 14-16 microseconds and 17-19
+    nanoseconds (any epoch since 2001). Longer values are returned as is.
+    """
+    digits = len(value.lstrip("0")) or 1
+    if digits > 19:
+        return value
+    scale = 10 ** (3 * max(0, (digits - 8) // 3))
+    dt = datetime.fromtimestamp(int(value) // scale, timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _leef_delimiter(raw: str) -> str:
+    m = _HEX_DELIMITER.fullmatch(raw)
+    if m is not None:
+        return chr(int(m.group(1), 16))
+    return raw or "\t"
+
+
+def _map_fields(pairs: Iterable, names: Dict[str, str], rec: Dict[str, Any]) -> None:
+    for key, value in pairs:
+        field = names.get(key, key)
+        if field in _INT_FIELDS:
+            value = _to_int(value)
+        elif field == "timestamp" and value.isascii() and value.isdigit():
+            value = _iso_from_epoch(value)
+        rec[field] = value
+
+
+def iter_syslog(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    RFC5424 and RFC3164 (BSD) syslog lines -> records.
+    """
+    match5424 = _RFC5424.match
+    match3164 = _RFC3164.match
+    for line in lines:
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        m = match5424(line)
+        if m is not None:
+            rec: Dict[str, Any] = {"timestamp": m["ts"], "host": m["host"]}
+            if m["app"] != "-":
+                rec["app"] = m["app"]
+            if m["pid"] != "-":
+                rec["pid"] = m["pid"]
+            if m["msgid"] != "-":
+                rec["msgid"] = m["msgid"]
+            message = m["msg"].lstrip("\ufeff")
+        else:
+            m = match3164(line)
+            if m is None:
+                yield {"message": line}
+                continue
+            rec = {"timestamp": _iso_from_rfc3164(m["mon"], m["day"], m["time"]), "host": m["host"]}
+            if m["app"]:
+                rec["app"] = m["app"]
+            if m["pid"]:
+                rec["pid"] = m["pid"]
+            message = m["msg"]
+
+        if m["pri"]:
+            pri = int(m["pri"])
+            rec["facility"] = pri >> 3
+            rec["severity"] = pri & 7
+        ip = _MSG_SRC_IP.search(message)
+        if ip is not None:
+            rec["src_ip"] = ip.group(1)
+        rec["message"] = message
+        yield rec
+
+
+def iter_cef(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    ArcSight CEF lines (optionally behind a syslog header) -> records.
+    """
+    for line in lines:
+        line = line.rstrip("\r")
+        start = line.find("CEF:")
+        m = _CEF.match(line, start) if start >= 0 else None
+        if m is None:
+            if line.strip():
+                yield {"message": line}
+            continue
+        rec: Dict[str, Any] = {
+            "vendor": m["vendor"],
+            "product": m["product"],
+            "signature_id": m["sig"],
+            "name": m["name"],
+            "severity": _to_int(m["severity"]),
+        }
+        _map_fields(
+            ((k, _CEF_UNESCAPE.sub(r"\1", v)) for k, v in _CEF_EXT.findall(m["ext"])),
+            _CEF_FIELDS,
+            rec,
+        )
+        rec.setdefault("message", m["name"])
+        yield rec
+
+
+def iter_leef(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    IBM LEEF 1.0/2.0 lines (optionally behind a syslog header) -> records.
+    """
+    for line in lines:
+        line = line.rstrip("\r")
+        start = line.find("LEEF:")
+        m = _LEEF.match(line, start) if start >= 0 else None
+        if m is None:
+            if line.strip():
+                yield {"message": line}
+            continue
+        rest = m["rest"]
+        delimiter = "\t"
+        if m["ver"].startswith("2"):
+            # LEEF 2.0 carries its attribute delimiter as an extra header field
+            raw_delim, sep, attrs = rest.partition("|")
+            if sep:
+                rest = attrs
+                delimiter = _leef_delimiter(raw_delim)
+        rec: Dict[str, Any] = {
+            "vendor": m["vendor"],
+            "product": m["product"],
+            "event_id": m["event"],
+        }
+        _map_fields(
+            (pair.split("=", 1) for pair in rest.split(delimiter) if "=" in pair),
+            _LEEF_FIELDS,
+            rec,
+        )
+        rec.setdefault("message", m["event"])
+        yield rec
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    CSV with a header row -> records; common column names are mapped onto
+    the record schema and empty cells are dropped. `lines` is the decoded
+    text with its line endings kept, so quoted fields spanning lines stay
+    whole. Malformed input raises csv.Error.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [_CSV_FIELDS.get(h.strip().lower(), h.strip()) for h in header]
+    for row in reader:
+        if not row:
+            continue
+        rec = {name: value for name, value in zip(names, row) if value != ""}
+        for field in _INT_FIELDS.intersection(rec):
+            rec[field] = _to_int(rec[field])
+        yield rec
+
+
+LINE_PARSERS: Dict[str, Callable[[Iterable[str]], Iterator[Dict[str, Any]]]] = {
+    SYSLOG: iter_syslog,
+    CEF: iter_cef,
+    LEEF: iter_leef,
+    CSV: iter_csv,
+}
+
+
+def parse_lines(fmt: str, lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Dispatches decoded text lines to the parser for a non-JSON format.
+    """
+    parser: Optional[Callable] = LINE_PARSERS.get(fmt)
+    if parser is None:
+        raise ValueError(f"No line parser for format '{fmt}'")
+    return parser(lines)
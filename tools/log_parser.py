@@ -1,21 +1,126 @@
 import json
-from typing import List, Dict, Any
+import io
+import os
+import re
+from itertools import chain
+from typing import List, Dict, Any, Callable, Iterable, Iterator, IO, Optional, Tuple, Union
 
-def parse_logs(log_content: str) -> List[Dict[str, Any]]:
+from config import JSON_BACKEND
+from .log_formats import SNIFF_BYTES, CSV, JSON_ARRAY, JSON_DOCUMENT, JSONL, iter_csv, parse_lines, sniff_format
+from .prefilter import LinePrefilter
+from .symbols import SymbolTable
+from .tag_rules import TagRuleSet, default_rules
+
+# Bytes read per call when streaming from a file handle
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = b" \t\r\n"
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+# Tokens that matter when walking a JSON array without decoding it: complete
+# (or truncated) strings, which may contain braces, and structural brackets.
+# Group 1 is empty when a string runs past the end of the buffer.
+_ARRAY_TOKEN = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*("?)|[\[\]{}]', re.DOTALL)
+
+LogSource = Union[IO, bytes, str, Iterable[bytes]]
+PathLike = Union[str, "os.PathLike[str]"]
+
+# Preference order when JSON_BACKEND is "auto"
+JSON_BACKENDS = ("orjson", "simdjson", "stdlib")
+
+
+class JsonDecoder:
+    """
+    A named JSON decoding backend. `loads` accepts bytes or str directly
+    and raises ValueError on malformed input.
     """
-    Very simple JSON-lines / JSON array log parser.
-    You can extend this for CSV, syslog, Windows logs etc.
 
-    Returns a list of records with simple anomaly tags.
+    __slots__ = ("name", "loads")
+
+    def __init__(self, name: str, loads: Callable[[Union[bytes, str]], Any]):
+        self.name = name
+        self.loads = loads
+
+    def __repr__(self) -> str:
+        return f"JsonDecoder({self.name!r})"
+
+
+def _load_backend(name: str) -> Optional[JsonDecoder]:
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            return None
+        return JsonDecoder("orjson", orjson.loads)
+    if name == "simdjson":
+        try:
+            import simdjson
+        except ImportError:
+            return None
+        return JsonDecoder("simdjson", simdjson.loads)
+    if name == "stdlib":
+        return JsonDecoder("stdlib", json.loads)
+    raise ValueError(f"Unknown JSON backend '{name}'; expected one of {JSON_BACKENDS}")
+
+
+_decoders: Dict[str, Optional[JsonDecoder]] = {}
+
+
+def _cached_decoder(name: str) -> Optional[JsonDecoder]:
+    if name not in _decoders:
+        _decoders[name] = _load_backend(name)
+    return _decoders[name]
+
+
+def available_decoders() -> List[str]:
     """
-    records: List[Dict[str, Any]] = []
+    Names of the JSON backends importable in this environment.
+    """
+    return [name for name in JSON_BACKENDS if _cached_decoder(name) is not None]
 
+
+def get_decoder(name: Optional[str] = None) -> JsonDecoder:
+    """
+    Returns the named backend, or for "auto" (the JSON_BACKEND default) the
+    fastest installed one, falling back to the stdlib json module.
+    """
+    name = name or JSON_BACKEND
+    if name == "auto":
+        for candidate in JSON_BACKENDS:
+            decoder = _cached_decoder(candidate)
+            if decoder is not None:
+                return decoder
+    decoder = _cached_decoder(name)
+    if decoder is None:
+        raise ValueError(f"JSON backend '{name}' is not installed")
+    return decoder
+
+
+def tag_record(rec: Dict[str, Any], rules: Optional[TagRuleSet] = None) -> List[str]:
+    """
+    Returns the anomaly tags for a single decoded record.
+    Rules default to the compiled rule files at TAG_RULES_PATH and
+    FIELD_RULES_PATH.
+    """
+    if rules is None:
+        rules = default_rules()
+    return rules.match_record(rec) or []
+
+
+def _decode_content(log_content: str) -> List[Any]:
+    fmt = sniff_format(log_content[:SNIFF_BYTES].encode("utf-8"))
+    if fmt == CSV:
+        return list(iter_csv(io.StringIO(log_content, newline="")))
+    if fmt not in (JSON_ARRAY, JSON_DOCUMENT, JSONL):
+        return list(parse_lines(fmt, log_content.splitlines()))
+
+    loads = get_decoder().loads
     try:
         # Try JSON array
-        data = json.loads(log_content)
+        data = loads(log_content)
         if isinstance(data, dict):
             data = [data]
-    except json.JSONDecodeError:
+    except ValueError:
         # Try JSONL
         data = []
         for line in log_content.splitlines():
@@ -23,24 +128,277 @@ def parse_logs(log_content: str) -> List[Dict[str, Any]]:
             if not line:
                 continue
             try:
-                data.append(json.loads(line))
-            except json.JSONDecodeError:
+                data.append(loads(line))
+            except ValueError:
                 continue
+    return data
+
+
+def parse_logs(log_content: str, rules: Optional[TagRuleSet] = None) -> List[Dict[str, Any]]:
+    """
+    Parses JSON array / JSON-lines logs, or syslog, CEF, LEEF and CSV
+    (see tools.log_formats; the format is sniffed from the content).
 
-    for rec in data:
+    Returns a list of records with anomaly tags from the keyword rule set.
+    For large inputs prefer iter_logs, which never holds the whole file.
+    """
+    records: List[Dict[str, Any]] = []
+    if rules is None:
+        rules = default_rules()
+
+    for rec in _decode_content(log_content):
         rec = rec.copy()
-        # Extremely naive "anomaly" tagging for demo
-        message = str(rec.get("message", "")).lower()
-        tags = []
-
-        if "failed password" in message or "authentication failure" in message:
-            tags.append("auth_failure")
-        if "sudo" in message and "not in sudoers" in message:
-            tags.append("privilege_escalation_attempt")
-        if "connection from" in message and "blacklisted" in message:
-            tags.append("connection_from_blacklisted_ip")
-
-        rec["tags"] = tags
+        rec["tags"] = tag_record(rec, rules)
         records.append(rec)
 
     return records
+
+
+def scan_tags(
+    records: Iterable[Dict[str, Any]],
+    rules: Optional[TagRuleSet] = None,
+) -> Dict[int, List[str]]:
+    """
+    Tags records without touching them: returns a sparse
+    {record index: tags} map holding only the records that matched.
+    """
+    if rules is None:
+        rules = default_rules()
+    match = rules.match_record
+    tags_by_index: Dict[int, List[str]] = {}
+    for i, rec in enumerate(records):
+        tags = match(rec)
+        if tags:
+            tags_by_index[i] = tags
+    return tags_by_index
+
+
+def parse_logs_sparse(
+    log_content: str,
+    rules: Optional[TagRuleSet] = None,
+) -> Tuple[List[Dict[str, Any]], Dict[int, List[str]]]:
+    """
+    Zero-copy variant of parse_logs.
+
+    Returns the decoded records untouched (no copy, no "tags" key) together
+    with a sparse {record index: tags} map, so benign records cost no
+    allocation beyond their decoding.
+    """
+    data = [rec for rec in _decode_content(log_content) if isinstance(rec, dict)]
+    return data, scan_tags(data, rules)
+
+
+def _read_chunks(source: LogSource, chunk_size: int) -> Iterator[bytes]:
+    """
+    Normalizes file handles (text or binary, mmap), in-memory buffers and
+    iterables of chunks into a stream of bytes chunks.
+    """
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # Slice the buffer instead of copying it whole
+        view = memoryview(source)
+        try:
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+        finally:
+            view.release()
+        return
+
+    if hasattr(source, "read"):
+        read = source.read
+        chunks: Iterable[Any] = iter(lambda: read(chunk_size), source.read(0))
+    else:
+        chunks = source
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if chunk:
+            yield bytes(chunk)
+
+
+def _iter_lines(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Re-splits a chunk stream on newlines, carrying partial lines over.
+    """
+    tail = b""
+    for chunk in chunks:
+        lines = (tail + chunk).split(b"\n")
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def _iter_array_elements(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Incremental tokenizer for a top-level JSON array.
+
+    Yields the raw bytes of each object/array element. Only the element
+    currently being assembled is kept in the buffer, so memory stays bounded
+    by the largest element rather than the whole document.
+    """
+    buf = b""
+    pos = start = depth = 0  # depth 1 == directly inside the top-level array
+
+    for chunk in chunks:
+        # Drop everything already consumed, keeping a partial element if any
+        cut = start if depth > 1 else pos
+        buf = buf[cut:] + chunk
+        pos -= cut
+        start -= cut
+
+        for m in _ARRAY_TOKEN.finditer(buf, pos):
+            first = buf[m.start()]
+            if first == 0x22:  # '"'
+                if not m.group(1):
+                    # String continues in the next chunk; rescan it from here
+                    pos = m.start()
+                    break
+            elif first in b"[{":
+                if depth == 1:
+                    start = m.start()
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1:
+                    yield buf[start:m.end()]
+                elif depth <= 0:
+                    return
+            pos = m.end()
+        else:
+            pos = len(buf)
+
+
+def _decode(raw: bytes, loads: Callable[[bytes], Any]) -> Any:
+    try:
+        return loads(raw)
+    except ValueError:
+        pass
+    # Tolerate stray invalid UTF-8 the way the API used to (errors="ignore")
+    try:
+        return loads(raw.decode("utf-8", errors="ignore"))
+    except ValueError:
+        return None
+
+
+def _iter_document(chunks: Iterator[bytes], loads: Callable[[bytes], Any]) -> Iterator[Any]:
+    """
+    Decodes a multi-line JSON document (e.g. one pretty-printed object)
+    whole, as parse_logs always has; if it is not one JSON value after
+    all, its lines are decoded as JSONL instead.
+    """
+    raw = b"".join(chunks)
+    data = _decode(raw, loads)
+    if isinstance(data, list):
+        yield from data
+    elif data is not None:
+        yield data
+    else:
+        for line in raw.split(b"\n"):
+            if line.strip():
+                yield _decode(line, loads)
+
+
+def iter_tagged(
+    source: LogSource,
+    chunk_size: int = CHUNK_SIZE,
+    rules: Optional[TagRuleSet] = None,
+    decoder: Optional[JsonDecoder] = None,
+    fmt: Optional[str] = None,
+    prefilter: Optional[LinePrefilter] = None,
+    symbols: Optional[SymbolTable] = None,
+) -> Iterator[Tuple[Dict[str, Any], Optional[List[str]]]]:
+    """
+    Streaming, copy-free core of iter_logs: yields (record, tags) pairs where
+    the record is left exactly as decoded and tags is None when no rule
+    matched.
+
+    Accepts a text or binary file handle, an mmap (see tools.ingest.map_file),
+    a bytes/str buffer or an iterable of bytes chunks. The format is sniffed
+    from the first few KB unless `fmt` is given. A top-level JSON array is
+    walked with an incremental tokenizer, JSONL is decoded line by line
+    (skipping blank and malformed lines) and syslog/CEF/LEEF/CSV lines go to
+    the streaming parsers in tools.log_formats. Memory use is flat in the
+    size of the input, except for a single multi-line JSON document (one
+    pretty-printed object), which is decoded whole. Raw bytes go straight to the JSON backend
+    (get_decoder).
+
+    With a `prefilter` (built from the same rules), JSONL lines no rule can
+    match are skipped without being decoded and only counted on the
+    prefilter; the tagged records are exactly those of a full pass. With
+    prefilter.decode_skipped those lines are decoded and yielded untagged
+    instead, without running the rules. Other formats ignore it. With `symbols`, the configured fields of every record
+    are interned in that SymbolTable as they are decoded.
+    """
+    if rules is None:
+        rules = default_rules()
+    match = rules.match_record
+    loads = (decoder or get_decoder()).loads
+    chunks = _read_chunks(source, chunk_size)
+
+    # Buffer enough of the input to sniff its format
+    head = b""
+    offset = 0
+    for chunk in chunks:
+        head += chunk
+        if head.startswith(_UTF8_BOM):
+            head = head[len(_UTF8_BOM):]
+            offset = len(_UTF8_BOM)
+        if len(head) >= SNIFF_BYTES:
+            break
+    if not head.strip(_WHITESPACE):
+        return
+
+    stream = chain([head], chunks)
+    fmt = fmt or sniff_format(head)
+    intern = symbols.intern_record if symbols is not None else None
+    if fmt == JSONL and prefilter is not None and prefilter.decode_skipped:
+        for line, candidate in prefilter.iter_marked(stream, offset):
+            rec = _decode(line, loads)
+            if not isinstance(rec, dict):
+                continue
+            if intern is not None:
+                intern(rec)
+            yield rec, match(rec) if candidate else None
+        return
+
+    if fmt == JSON_ARRAY:
+        records: Iterator[Any] = (_decode(raw, loads) for raw in _iter_array_elements(stream))
+    elif fmt == JSON_DOCUMENT:
+        records = _iter_document(stream, loads)
+    elif fmt == JSONL and prefilter is not None:
+        records = (_decode(line, loads) for line in prefilter.iter_candidates(stream, offset))
+    elif fmt == JSONL:
+        records = (_decode(line, loads) for line in _iter_lines(stream) if line.strip())
+    elif fmt == CSV:
+        # The csv module sees the line endings, so quoted fields spanning lines stay whole
+        records = iter_csv(line.decode("utf-8", errors="replace") + "\n" for line in _iter_lines(stream))
+    else:
+        records = parse_lines(fmt, (line.decode("utf-8", errors="replace") for line in _iter_lines(stream)))
+
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
+        if intern is not None:
+            intern(rec)
+        yield rec, match(rec)
+
+
+def iter_logs(
+    source: LogSource,
+    chunk_size: int = CHUNK_SIZE,
+    rules: Optional[TagRuleSet] = None,
+    decoder: Optional[JsonDecoder] = None,
+    fmt: Optional[str] = None,
+    symbols: Optional[SymbolTable] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming counterpart of parse_logs: yields tagged records one at a time
+    (see iter_tagged for the accepted sources and formats).
+    """
+    for rec, tags in iter_tagged(source, chunk_size, rules, decoder, fmt, symbols=symbols):
+        # Records are freshly decoded, so tag in place instead of copying
+        rec["tags"] = tags or []
+        yield rec
@@ -0,0 +1,287 @@
+import json
+import os
+import re
+from typing import List, Dict, Any, Callable, Iterable, Mapping, Optional, Tuple
+
+from config import NORMALIZER_MAPPINGS_DIR
+
+GENERIC_SOURCE = "generic"
+
+# Canonical schema; dotted names become attributes with "_" (src.ip -> src_ip)
+CANONICAL_FIELDS = (
+    "timestamp",
+    "message",
+    "src.ip",
+    "src.port",
+    "dst.ip",
+    "dst.port",
+    "user.name",
+    "user.target",
+    "event.action",
+    "event.code",
+    "event.outcome",
+    "host.name",
+    "url.path",
+    "http.method",
+    "http.status",
+    "file.path",
+    "file.target",
+    "email.from",
+    "email.to",
+    "email.subject",
+    "resource.name",
+    "network.bytes",
+)
+
+# Distinct field-name sets whose detected source is cached at once
+_MAX_SCHEMAS = 1024
+
+# sshd: "Failed password for [invalid user] <user> from <ip> port ..."
+_SSHD_FAILURE = re.compile(r"\bfor (?:invalid user )?(\S+) from (\S+)")
+
+
+def attr_name(field: str) -> str:
+    return field.replace(".", "_")
+
+
+class NormalizedEvent:
+    """
+    A record in the canonical schema. Every canonical field is a slot
+    (None when the source has no such field), so downstream code does one
+    attribute access instead of probing several dict keys.
+    """
+
+    __slots__ = tuple(attr_name(f) for f in CANONICAL_FIELDS) + ("source", "tags", "count", "raw")
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """
+        Looks a value up by its canonical dotted name, e.g. "src.ip".
+        """
+        value = getattr(self, attr_name(field), None)
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {f: getattr(self, attr_name(f)) for f in CANONICAL_FIELDS}
+        out = {k: v for k, v in out.items() if v is not None}
+        out["source"] = self.source
+        out["tags"] = self.tags
+        out["count"] = self.count
+        return out
+
+    def __repr__(self) -> str:
+        return f"NormalizedEvent({self.to_dict()!r})"
+
+
+def login_parties(ev: NormalizedEvent) -> Tuple[Optional[str], Optional[str]]:
+    """
+    (source IP, account) of a login event as strings, taken from the sshd
+    message when the source has no such fields; None where unknown.
+    """
+    src_ip, user = ev.src_ip, ev.user_name or ev.user_target
+    if (src_ip is None or user is None) and isinstance(ev.message, str):
+        m = _SSHD_FAILURE.search(ev.message)
+        if m:
+            user = user or m.group(1)
+            src_ip = src_ip or m.group(2)
+    return (None if src_ip is None else str(src_ip), None if user is None else str(user))
+
+
+class FieldMapping:
+    """
+    One source's mapping from its own field names to the canonical schema.
+
+    detect: {"all": [...], "any": [...]} field names identifying the source
+    fields: {canonical field: [source fields, tried in order]}
+    """
+
+    def __init__(self, source: str, fields: Dict[str, List[str]], detect: Optional[Dict[str, List[str]]] = None):
+        unknown = set(fields) - set(CANONICAL_FIELDS)
+        if unknown:
+            raise ValueError(f"Mapping '{source}' uses unknown canonical fields: {sorted(unknown)}")
+        self.source = source
+        self.fields = {k: [v] if isinstance(v, str) else list(v) for k, v in fields.items()}
+        detect = detect or {}
+        self.detect_all = frozenset(detect.get("all", ()))
+        self.detect_any = frozenset(detect.get("any", ()))
+        self._compiled: Optional[Callable[[Mapping[str, Any]], NormalizedEvent]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FieldMapping":
+        if "source" not in data or "fields" not in data:
+            raise ValueError(f"Field mapping needs 'source' and 'fields': {data}")
+        return cls(data["source"], data["fields"], data.get("detect"))
+
+    def score(self, fields: Iterable[str]) -> int:
+        """
+        How specifically this mapping matches a set of field names;
+        -1 when it does not match at all.
+        """
+        present = set(fields)
+        if not self.detect_all <= present:
+            return -1
+        if self.detect_any and self.detect_any.isdisjoint(present):
+            return -1
+        return len(self.detect_all) + (1 if self.detect_any else 0)
+
+    def overlay(self, base: "FieldMapping") -> "FieldMapping":
+        """
+        This mapping's fields on top of `base` (normally the generic one):
+        a field's own candidates are tried first, then the base's.
+        """
+        merged = dict(base.fields)
+        for field, names in self.fields.items():
+            merged[field] = list(dict.fromkeys(names + merged.get(field, [])))
+        out = FieldMapping(self.source, merged)
+        out.detect_all, out.detect_any = self.detect_all, self.detect_any
+        return out
+
+    def compile(self) -> Callable[[Mapping[str, Any]], NormalizedEvent]:
+        """
+        Generates a straight-line Python function for this mapping, so
+        normalizing a record costs one .get per candidate field and no
+        loops or lookups in the mapping itself.
+        """
+        if self._compiled is not None:
+            return self._compiled
+        lines = ["def normalize(rec):", "    g = rec.get", "    ev = _new(_Event)"]
+        for field in CANONICAL_FIELDS:
+            attr = attr_name(field)
+            sources = self.fields.get(field)
+            if not sources:
+                lines.append(f"    ev.{attr} = None")
+                continue
+            lines.append(f"    v = g({sources[0]!r})")
+            for name in sources[1:]:
+                lines.append(f"    if v is None: v = g({name!r})")
+            lines.append(f"    ev.{attr} = v")
+        lines += [
+            "    ev.source = _source",
+            "    ev.tags = g('tags') or []",
+            "    ev.count = g('dup_count') or 1",
+            "    ev.raw = rec",
+            "    return ev",
+        ]
+        namespace: Dict[str, Any] = {
+            "_new": object.__new__,
+            "_Event": NormalizedEvent,
+            "_source": self.source,
+        }
+        exec(compile("\n".join(lines), f"<field mapping {self.source}>", "exec"), namespace)
+        self._compiled = namespace["normalize"]
+        return self._compiled
+
+
+class Normalizer:
+    """
+    Picks the field mapping for each record from its own field names
+    (cached per distinct set of names, so a file costs one detection per
+    schema) and applies that mapping's compiled function. Adding a source
+    means dropping another JSON mapping file in the mappings dir.
+    """
+
+    def __init__(self, mappings: Iterable[FieldMapping]):
+        by_source = {m.source: m for m in mappings}
+        base = by_source.pop(GENERIC_SOURCE, None) or FieldMapping(GENERIC_SOURCE, {})
+        self.generic = base
+        self.mappings: Dict[str, FieldMapping] = {GENERIC_SOURCE: base}
+        for source in sorted(by_source):
+            self.mappings[source] = by_source[source].overlay(base)
+        # field names -> (source, compiled mapping)
+        self._by_schema: Dict[Tuple[str, ...], Tuple[str, Callable[[Mapping[str, Any]], NormalizedEvent]]] = {}
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self.mappings)
+
+    def detect(self, fields: Iterable[str]) -> str:
+        """
+        Name of the most specific mapping matching these field names;
+        "generic" when none does.
+        """
+        fields = set(fields)
+        best: Tuple[int, str] = (0, GENERIC_SOURCE)
+        for source, mapping in self.mappings.items():
+            score = mapping.score(fields)
+            if score > best[0]:
+                best = (score, source)
+        return best[1]
+
+    def for_record(self, rec: Mapping[str, Any]) -> Tuple[str, Callable[[Mapping[str, Any]], NormalizedEvent]]:
+        """
+        (source, compiled mapping) for a record, detected from its field
+        names. Every mode (batch, triage, sampling) detects sources this
+        way, so a record maps the same whichever path it takes.
+        """
+        schema = tuple(rec)
+        detected = self._by_schema.get(schema)
+        if detected is None:
+            if len(self._by_schema) >= _MAX_SCHEMAS:
+                self._by_schema.clear()
+            source = self.detect(schema)
+            detected = self._by_schema[schema] = (source, self.compiled(source))
+        return detected
+
+    def split_batch(self, batch: Any) -> List[Tuple[str, Any]]:
+        """
+        [(source, batch)] for a LogBatch, its rows grouped by the source
+        detected from their field names (as for_record does), first row's
+        source first. A single-source batch is returned as is; otherwise
+        each source gets a new batch of its rows, so column-wise
+        detectors read every row with its own source's field names.
+        """
+        sources = [self.detect(schema) for schema in batch.schemas]
+        if len(set(sources)) <= 1:
+            return [(sources[0] if sources else self.generic.source, batch)]
+        rows: Dict[str, List[int]] = {}
+        for i, code in enumerate(batch.schema_codes):
+            rows.setdefault(sources[code], []).append(i)
+        return [(source, batch.take(r)) for source, r in rows.items()]
+
+    def normalize(self, rec: Mapping[str, Any]) -> NormalizedEvent:
+        return self.for_record(rec)[1](rec)
+
+    def compiled(self, source: str) -> Callable[[Mapping[str, Any]], NormalizedEvent]:
+        mapping = self.mappings.get(source)
+        if mapping is None:
+            raise KeyError(f"No field mapping for source '{source}'")
+        return mapping.compile()
+
+    def normalize_records(
+        self,
+        records: Iterable[Mapping[str, Any]],
+        source: Optional[str] = None,
+    ) -> List[NormalizedEvent]:
+        """
+        Normalizes records with one source's mapping; without `source`,
+        each record's mapping is detected from its own fields.
+        """
+        if source is None:
+            return [self.normalize(rec) for rec in records]
+        normalize = self.compiled(source)
+        return [normalize(rec) for rec in records]
+
+
+def load_mappings(directory: str) -> Normalizer:
+    """
+    Loads every *.json field mapping in a directory.
+    """
+    mappings = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".json"):
+            continue
+        with open(os.path.join(directory, name), "r", encoding="utf-8") as fh:
+            mappings.append(FieldMapping.from_dict(json.load(fh)))
+    return Normalizer(mappings)
+
+
+_default_normalizer: Optional[Normalizer] = None
+
+
+def default_normalizer() -> Normalizer:
+    """
+    Normalizer over NORMALIZER_MAPPINGS_DIR, loaded once per process.
+    """
+    global _default_normalizer
+    if _default_normalizer is None:
+        _default_normalizer = load_mappings(NORMALIZER_MAPPINGS_DIR)
+    return _default_normalizer
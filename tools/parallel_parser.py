@@ -0,0 +1,184 @@
+import copy
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Dict, Any, Deque, Iterable, Iterator, Optional, Tuple
+
+from .cardinality import FanDetector
+from .heavy_hitters import HeavyHitters
+from .ingest import file_compression, map_file, open_binary, open_log_file
+from .log_formats import SNIFF_BYTES, JSON_ARRAY, JSON_DOCUMENT, CSV, sniff_format
+from .log_parser import PathLike, iter_logs
+from .normalizer import default_normalizer
+from .tag_rules import TagRuleSet
+
+# Ranges smaller than this are not worth a round trip to a worker process
+MIN_RANGE_BYTES = 1 << 20
+# Ranges per worker, so uneven ranges still balance across the pool
+RANGES_PER_WORKER = 4
+# Larger files are cut into more ranges, so one range's records stay small
+MAX_RANGE_BYTES = 32 << 20
+# Ranges submitted per worker ahead of the consumer (parsed results included)
+IN_FLIGHT_PER_WORKER = 2
+
+Sketches = Tuple[Optional[HeavyHitters], Optional[FanDetector]]
+
+_worker_rules: Optional[TagRuleSet] = None
+# Empty sketches configured like the caller's, copied for every range
+_worker_sketches: Sketches = (None, None)
+
+
+def _init_worker(rules: Optional[TagRuleSet], sketches: Sketches = (None, None)) -> None:
+    global _worker_rules, _worker_sketches
+    _worker_rules = rules
+    _worker_sketches = sketches
+
+
+def _blank_sketches(hitters: Optional[HeavyHitters], fan: Optional[FanDetector]) -> Sketches:
+    return (
+        HeavyHitters(hitters.fields, hitters.capacity) if hitters is not None else None,
+        FanDetector(fan.precision, fan.thresholds, fan.max_keys, fan.failure_tags) if fan is not None else None,
+    )
+
+
+def _add_to_sketches(records: Iterable[Dict[str, Any]], hitters: Optional[HeavyHitters], fan: Optional[FanDetector]) -> None:
+    """
+    Counts tagged records into the top-talker and fan-out sketches, each
+    mapped by its own field names (as triage and sample do).
+    """
+    if hitters is None and fan is None:
+        return
+    normalizer = default_normalizer()
+    for rec in records:
+        ev = normalizer.for_record(rec)[1](rec)
+        if hitters is not None:
+            hitters.add_event(ev)
+        if fan is not None:
+            fan.add_event(ev)
+
+
+def _parse_range(path: PathLike, start: int, end: int, fmt: str) -> Tuple[List[Dict[str, Any]], Sketches]:
+    """
+    Worker entry point: parses and tags the lines in [start, end), and
+    sketches them when the pool was given sketches to fill. Returns the
+    records with this range's sketches, for the parent to merge.
+    """
+    with map_file(path) as mapped, memoryview(mapped) as view:
+        # A view slice shares the mapping; slicing the mmap would copy the range
+        chunk = view[start:end]
+        try:
+            records = list(iter_logs(chunk, rules=_worker_rules, fmt=fmt))
+        finally:
+            chunk.release()
+    hitters, fan = copy.deepcopy(_worker_sketches)
+    _add_to_sketches(records, hitters, fan)
+    return records, (hitters, fan)
+
+
+def split_ranges(path: PathLike, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits a file into at most `parts` byte ranges, each ending just after a
+    newline so no line-based record straddles two ranges.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    parts = max(1, min(parts, size // MIN_RANGE_BYTES or 1))
+
+    bounds = [0]
+    with open_binary(path) as fh:
+        for i in range(1, parts):
+            target = max(size * i // parts, bounds[-1])
+            fh.seek(target)
+            fh.readline()  # move to the start of the next line
+            pos = fh.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _sniff_file(path: PathLike) -> str:
+    with open_binary(path) as fh:
+        return sniff_format(fh.read(SNIFF_BYTES))
+
+
+def iter_file_parallel(
+    path: PathLike,
+    workers: Optional[int] = None,
+    rules: Optional[TagRuleSet] = None,
+    hitters: Optional[HeavyHitters] = None,
+    fan: Optional[FanDetector] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parses a line-based log file (JSONL, syslog, CEF, LEEF) across a process
+    pool and yields the tagged records in original file order. Ranges of
+    at most MAX_RANGE_BYTES are submitted as the consumer catches up, at
+    most IN_FLIGHT_PER_WORKER per worker at a time, so parsed records
+    never pile up ahead of a slow consumer.
+
+    With `hitters` and `fan`, every record is also counted into them: each
+    worker sketches its own range and the parent merges the range sketches
+    as their records are yielded. Callers must not count the records again.
+
+    Falls back to the sequential iter_logs path for a single worker, small
+    files, compressed files (streamed through a decompressor), JSON arrays
+    and multi-line JSON documents (which cannot be split on newlines) and
+    CSV (whose header only appears in the first range).
+    """
+    workers = workers or os.cpu_count() or 1
+    compression = file_compression(path)  # raises UnreadableLogError first
+    parts = max(workers * RANGES_PER_WORKER, -(-os.path.getsize(path) // MAX_RANGE_BYTES))
+    ranges = split_ranges(path, parts) if workers > 1 else []
+    splittable = len(ranges) > 1 and compression is None
+    fmt = _sniff_file(path) if splittable else JSON_ARRAY
+
+    if not splittable or fmt in (JSON_ARRAY, JSON_DOCUMENT, CSV):
+        with open_log_file(path) as stream:
+            for rec in iter_logs(stream, rules=rules):
+                _add_to_sketches((rec,), hitters, fan)
+                yield rec
+        return
+
+    workers = min(workers, len(ranges))
+    in_flight = workers * IN_FLIGHT_PER_WORKER
+    initargs = (rules, _blank_sketches(hitters, fan))
+
+    def collect(future: Future) -> List[Dict[str, Any]]:
+        records, (range_hitters, range_fan) = future.result()
+        if range_hitters is not None:
+            hitters.merge(range_hitters)
+        if range_fan is not None:
+            fan.merge(range_fan)
+        return records
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        # Results are taken in submission order, so records come back in file order
+        pending: Deque[Future] = deque()
+        try:
+            for start, end in ranges:
+                done = collect(pending.popleft()) if len(pending) >= in_flight else ()
+                # The next range is queued before the finished one is consumed
+                pending.append(pool.submit(_parse_range, path, start, end, fmt))
+                yield from done
+            while pending:
+                yield from collect(pending.popleft())
+        finally:
+            # A consumer that stops early does not wait for unstarted ranges
+            for future in pending:
+                future.cancel()
+
+
+def parse_file_parallel(
+    path: PathLike,
+    workers: Optional[int] = None,
+    rules: Optional[TagRuleSet] = None,
+    hitters: Optional[HeavyHitters] = None,
+    fan: Optional[FanDetector] = None,
+) -> List[Dict[str, Any]]:
+    """
+    List-returning wrapper around iter_file_parallel.
+    """
+    return list(iter_file_parallel(path, workers, rules, hitters, fan))
@@ -0,0 +1,297 @@
+"""
+Byte-level prefilter for JSONL: decides from the raw bytes which lines
+could match some rule, so only those are JSON-decoded.
+
+The filter is conservative: every line a rule could match is a candidate,
+so the tags produced afterwards are exactly those of a full decode. It
+relies on JSON writing a string's characters literally except for a few
+canonical escapes (\\" \\\\ \\n ...); lines using the optional escapes
+(\\uXXXX, \\/) or holding non-ASCII bytes are always candidates, as are
+lines whose "message" is not a string (tagged on its str() form).
+"""
+import json
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Pattern, Tuple
+
+import numpy as np
+
+from .rule_engine import And, Compare, Exists, Expr, In, Matches, Not, Or
+from .tag_rules import TagRuleSet
+
+# Optional JSON escapes; a line using them is always a candidate
+_ESCAPES = (b"\\u", b"\\/")
+_WS = rb"[ \t\r]*"
+_NUMBER_EXP = rb"-?[0-9]+(?:\.[0-9]+)?[eE]"
+_WHITESPACE = b" \t\r\n"
+_WHITESPACE_BYTES = np.frombuffer(_WHITESPACE, dtype=np.uint8)
+
+# A leaf of a signature: a literal every matching line contains and, for
+# `"field"` literals, a regex for what must follow it (None: anything)
+Leaf = Tuple[bytes, Optional[bytes]]
+
+# How much a signature narrows the candidates
+_KEY_ONLY, _VALUE = 1, 2
+
+
+def _escaped(text: str) -> bytes:
+    """
+    The bytes JSON writes for the characters of `text` inside a string.
+    """
+    return json.dumps(text, ensure_ascii=False)[1:-1].encode("utf-8")
+
+
+def _key(field: str) -> bytes:
+    return b'"' + _escaped(field) + b'"'
+
+
+def _number_value(literal: Any) -> Optional[bytes]:
+    """
+    Value pattern for `field == literal` with an integer literal, or None
+    when too many spellings could compare equal.
+    """
+    if isinstance(literal, bool) or not isinstance(literal, int):
+        return None
+    # 4625 may be written 4625.0 or 4.625e3; true == 1 and false == 0
+    alts = [re.escape(str(literal).encode()) + rb"(?![0-9])", rb"-?[0-9]+\.", _NUMBER_EXP]
+    if literal in (0, 1):
+        alts.append(b"false" if literal == 0 else b"true")
+    return b"(?:" + b"|".join(alts) + b")"
+
+
+def _value(literal: Any) -> Optional[bytes]:
+    if isinstance(literal, str):
+        return re.escape(b'"' + _escaped(literal) + b'"')
+    return _number_value(literal)
+
+
+def _predicate(expr: Expr) -> Tuple[List[Leaf], int]:
+    key = _key(expr.field)
+    if isinstance(expr, Compare):
+        lit, op = expr.literal, expr.op
+        if op == "==" and _value(lit) is not None:
+            return [(key, _value(lit))], _VALUE
+        if op == "startswith" and lit:
+            return [(key, re.escape(b'"' + _escaped(lit)))], _VALUE
+        if op == "endswith" and lit:
+            return [(_escaped(lit) + b'"', None)], _VALUE
+        if op == "contains" and isinstance(lit, str) and lit:
+            return [(_escaped(lit), None)], _VALUE
+        if op in (">", ">=") and isinstance(lit, (int, float)) and not isinstance(lit, bool) and lit >= 1:
+            # A larger number has at least as many integer digits
+            alts = [b"-?[0-9]{%d}" % len(str(int(lit))), _NUMBER_EXP]
+            if lit <= 1:
+                alts.append(b"true")
+            return [(key, b"(?:" + b"|".join(alts) + b")")], _VALUE
+    elif isinstance(expr, In):
+        values = [_value(lit) for lit in expr.literals]
+        if all(v is not None for v in values):
+            return [(key, b"(?:" + b"|".join(values) + b")")], _VALUE
+    elif isinstance(expr, Matches):
+        return [(key, b'"')], _KEY_ONLY
+    elif isinstance(expr, Exists):
+        return [(key, b"(?!null)")], _KEY_ONLY
+    return [(key, None)], _KEY_ONLY
+
+
+def signature(expr: Expr) -> Optional[Tuple[List[Leaf], int]]:
+    """
+    Byte-level leaves one of which every JSON line the expression holds
+    for contains, with how selective they are; None when there are none
+    (e.g. under `not`).
+    """
+    if isinstance(expr, Not):
+        return None
+    if isinstance(expr, And):
+        # Every child must hold, so the most selective child will do
+        best = None
+        for child in expr.children:
+            sig = signature(child)
+            if sig is not None and (best is None or sig[1] > best[1]):
+                best = sig
+        return best
+    if isinstance(expr, Or):
+        leaves: List[Leaf] = []
+        strength = _VALUE
+        for child in expr.children:
+            sig = signature(child)
+            if sig is None:
+                return None
+            leaves += sig[0]
+            strength = min(strength, sig[1])
+        return leaves, strength
+    if hasattr(expr, "field"):
+        return _predicate(expr)
+    return None
+
+
+def _compile(leaves: Iterable[Leaf]) -> List[Tuple[bytes, Optional[Pattern[bytes]]]]:
+    """
+    Groups leaves by literal, so each literal is searched once, with one
+    regex over all the values that may follow it.
+    """
+    grouped: Dict[bytes, Optional[List[bytes]]] = {}
+    for literal, follow in leaves:
+        if follow is None:
+            # Anything may follow, so the literal alone decides
+            grouped[literal] = None
+        elif literal not in grouped:
+            grouped[literal] = [follow]
+        elif grouped[literal] is not None:
+            grouped[literal].append(follow)
+    out = []
+    for literal, follows in grouped.items():
+        pattern = None
+        if follows is not None:
+            alts = b"|".join(dict.fromkeys(follows))
+            pattern = re.compile(re.escape(literal) + _WS + b":" + _WS + b"(?:" + alts + b")")
+        out.append((literal, pattern))
+    return out
+
+
+class LinePrefilter:
+    """
+    Splits a JSONL chunk stream into lines and passes on only the lines
+    some rule could match (grep before parse).
+
+    Keyword rules are checked with bytes.find on an ASCII-lowered copy of
+    each chunk, field rules with literals (mostly `"field"`) found with
+    bytes.find and, where the literal occurs at all, a regex for the
+    value after it; all over the whole chunk at once. Lines that pass
+    nothing are counted in `skipped` and, with `keep_offsets`, their start
+    offsets are kept so they can be re-read later. With `decode_skipped`,
+    iter_tagged still decodes the skipped lines and passes them on
+    untagged (only rule matching is saved), for consumers that need every
+    record's fields.
+
+    `enabled` is False when a field rule has no byte signature (e.g. a pure
+    `not` rule); every line is then a candidate.
+    """
+
+    def __init__(self, rules: TagRuleSet, keep_offsets: bool = False, decode_skipped: bool = False):
+        self.keep_offsets = keep_offsets
+        self.decode_skipped = decode_skipped
+        self.keywords: List[bytes] = sorted({_escaped(kw) for kw in rules.keywords})
+        leaves: List[Leaf] = [(esc, None) for esc in _ESCAPES]
+        if self.keywords:
+            # Keyword rules see str(message) when it is not a JSON string
+            leaves.append((b'"message"', b'[^" \\t\\r]'))
+        self.enabled = True
+        for rule in rules.field_rules.rules:
+            sig = signature(rule.expr)
+            if sig is None:
+                self.enabled = False
+                break
+            leaves += sig[0]
+        self.literals = _compile(leaves)
+        self.lines = 0
+        self.skipped = 0
+        self._offsets: List[np.ndarray] = []
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Start offsets (int64) of the skipped lines, in stream order.
+        """
+        if not self._offsets:
+            return np.zeros(0, dtype=np.int64)
+        if len(self._offsets) > 1:
+            self._offsets = [np.concatenate(self._offsets)]
+        return self._offsets[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"lines": self.lines, "skipped": self.skipped, "decoded": self.lines - self.skipped}
+
+    def _hits(self, block: bytes, view: np.ndarray, end: int) -> np.ndarray:
+        """
+        Offsets in block[:end] that make their line a candidate.
+        """
+        found: List[int] = []
+
+        def find_all(buf: bytes, needle: bytes, i: int) -> None:
+            find = buf.find
+            while i != -1:
+                found.append(i)
+                i = find(needle, i + 1, end)
+
+        lowered = block.lower()
+        for kw in self.keywords:
+            find_all(lowered, kw, lowered.find(kw, 0, end))
+        for literal, pattern in self.literals:
+            i = block.find(literal, 0, end)
+            if i == -1:
+                continue
+            if pattern is None:
+                find_all(block, literal, i)
+            else:
+                found += [m.start() for m in pattern.finditer(block, i, end)]
+        hits = np.asarray(found, dtype=np.int64)
+        if not block[:end].isascii():
+            hits = np.concatenate((hits, np.flatnonzero(view >= 0x80)))
+        return hits
+
+    def _filter(self, block: bytes, end: int, base: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (starts, ends, nonblank, candidate) of the lines in block[:end],
+        which holds whole lines only.
+        """
+        view = np.frombuffer(block, dtype=np.uint8, count=end)
+        ends = np.flatnonzero(view == 0x0A)
+        if not len(ends) or ends[-1] != end - 1:
+            ends = np.append(ends, end)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+
+        # Blank lines are neither decoded nor counted; only lines starting
+        # with whitespace need a closer look
+        nonblank = ends > starts
+        first = view[np.minimum(starts, end - 1)]
+        for i in np.flatnonzero(nonblank & np.isin(first, _WHITESPACE_BYTES)).tolist():
+            nonblank[i] = bool(block[starts[i]:ends[i]].strip(_WHITESPACE))
+
+        candidate = np.zeros(len(ends), dtype=bool)
+        if self.enabled:
+            candidate[np.searchsorted(ends, self._hits(block, view, end), side="right")] = True
+        else:
+            candidate[:] = True
+        skipped = nonblank & ~candidate
+        candidate &= nonblank
+
+        self.lines += int(nonblank.sum())
+        self.skipped += int(skipped.sum())
+        if self.keep_offsets and skipped.any():
+            self._offsets.append(starts[skipped].astype(np.int64) + base)
+        return starts, ends, nonblank, candidate
+
+    def _blocks(self, chunks: Iterable[bytes], offset: int) -> Iterator[Tuple[bytes, Tuple[np.ndarray, ...]]]:
+        """
+        Re-splits a chunk stream on newlines like _iter_lines: yields
+        blocks of whole lines with their _filter result.
+        """
+        tail = b""
+        for chunk in chunks:
+            block = tail + chunk
+            cut = block.rfind(b"\n") + 1
+            if cut:
+                yield block, self._filter(block, cut, offset)
+                offset += cut
+            tail = block[cut:]
+        if tail:
+            yield tail, self._filter(tail, len(tail), offset)
+
+    def iter_candidates(self, chunks: Iterable[bytes], offset: int = 0) -> Iterator[bytes]:
+        """
+        Yields only the candidate lines of a chunk stream. `offset` is the
+        stream position of the first chunk, so skipped offsets point into
+        the original file.
+        """
+        for block, (starts, ends, _, candidate) in self._blocks(chunks, offset):
+            for s, e in zip(starts[candidate].tolist(), ends[candidate].tolist()):
+                yield block[s:e]
+
+    def iter_marked(self, chunks: Iterable[bytes], offset: int = 0) -> Iterator[Tuple[bytes, bool]]:
+        """
+        Yields every non-blank line of a chunk stream with whether it is a
+        candidate (skipped lines are still counted and their offsets kept).
+        """
+        for block, (starts, ends, nonblank, candidate) in self._blocks(chunks, offset):
+            for s, e, c in zip(starts[nonblank].tolist(), ends[nonblank].tolist(), candidate[nonblank].tolist()):
+                yield block[s:e], c
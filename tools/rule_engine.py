@@ -0,0 +1,535 @@
+"""
+Field-predicate rule language.
+
+    action == "BLOCK"
+    bytes_sent > 1000000 and not dst_ip startswith "10."
+    event_id in [4625, 4771] or (user startswith "system:" and exists pod)
+    payload matches "(?i)<\\?php"
+
+Operators: == != > >= < <= contains startswith endswith matches in, plus
+`exists field`, combined with and / or / not and parentheses. Literals
+are JSON strings (double quotes), numbers, true and false. Field names
+are flat record keys.
+
+A missing (or null) field makes every comparison on it false, so
+`not action == "BLOCK"` holds for records without an action. Ordering
+across incompatible types (a string against a number) is false as well.
+"""
+import json
+import operator
+import re
+from typing import List, Dict, Any, Callable, FrozenSet, Iterable, Iterator, Mapping, Optional, Tuple
+
+import numpy as np
+
+
+class RuleSyntaxError(ValueError):
+    pass
+
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*")
+      | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)(?![\w.])
+      | (?P<op>==|!=|>=|<=|>|<)
+      | (?P<punct>[()\[\],])
+      | (?P<word>[A-Za-z_@][\w.@-]*)
+    )""",
+    re.VERBOSE,
+)
+
+_WORD_OPS = frozenset(("contains", "startswith", "endswith", "matches", "in"))
+_KEYWORDS = frozenset(("and", "or", "not", "exists", "true", "false")) | _WORD_OPS
+
+
+def _tokenize(text: str) -> List[Tuple[str, Any, int]]:
+    tokens: List[Tuple[str, Any, int]] = []
+    pos = 0
+    end = len(text.rstrip())
+    while pos < end:
+        m = _TOKEN.match(text, pos)
+        if m is None or m.end() == pos:
+            raise RuleSyntaxError(f"Unexpected input at position {pos}: {text[pos:pos + 20]!r}")
+        kind = m.lastgroup
+        raw = m.group(kind)
+        if kind == "string":
+            value: Any = json.loads(raw)
+        elif kind == "number":
+            value = float(raw) if any(c in raw for c in ".eE") else int(raw)
+        elif kind == "word" and raw.lower() in _KEYWORDS:
+            kind, value = raw.lower(), raw.lower()
+        elif kind == "punct":
+            kind, value = raw, raw
+        else:
+            value = raw
+        tokens.append((kind, value, m.start(m.lastgroup)))
+        pos = m.end()
+    return tokens
+
+
+# ---- Expression tree ----
+
+class Expr:
+    """
+    Base class of the compiled expression tree.
+
+    - evaluate(rec): per-record evaluation for streaming
+    - mask(columns): boolean NumPy mask over a columnar source
+    - anchors: the expression can only be true for records holding at
+      least one of these fields (None: no such guarantee, e.g. `not`)
+    """
+
+    fields: FrozenSet[str] = frozenset()
+    anchors: Optional[FrozenSet[str]] = None
+
+    def evaluate(self, rec: Mapping[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def mask(self, columns: "Columns") -> np.ndarray:
+        raise NotImplementedError
+
+
+class Predicate(Expr):
+    """
+    A test on the value of one field; vectorized by testing each distinct
+    value of the column once and gathering the results by code.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.fields = self.anchors = frozenset((field,))
+
+    def test(self, value: Any) -> bool:
+        raise NotImplementedError
+
+    def evaluate(self, rec: Mapping[str, Any]) -> bool:
+        value = rec.get(self.field)
+        return value is not None and self.test(value)
+
+    def mask(self, columns: "Columns") -> np.ndarray:
+        codes, values = columns.factorize(self.field)
+        table = np.fromiter(
+            (v is not None and self.test(v) for v in values), dtype=bool, count=len(values)
+        )
+        # Code -1 (missing) picks the trailing False
+        return np.append(table, False)[codes]
+
+
+def _contains(value: Any, literal: Any) -> bool:
+    if isinstance(value, str):
+        return isinstance(literal, str) and literal in value
+    if isinstance(value, (list, tuple)):
+        return literal in value
+    return False
+
+
+def _startswith(value: Any, literal: str) -> bool:
+    return isinstance(value, str) and value.startswith(literal)
+
+
+def _endswith(value: Any, literal: str) -> bool:
+    return isinstance(value, str) and value.endswith(literal)
+
+
+# Module-level functions only, so compiled rules pickle into worker processes
+_COMPARISONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "contains": _contains,
+    "startswith": _startswith,
+    "endswith": _endswith,
+}
+
+
+class Compare(Predicate):
+    def __init__(self, field: str, op: str, literal: Any):
+        super().__init__(field)
+        if op in ("startswith", "endswith") and not isinstance(literal, str):
+            raise RuleSyntaxError(f"'{op}' needs a string, got {literal!r}")
+        self.op = op
+        self.literal = literal
+        self._test = _COMPARISONS[op]
+
+    def test(self, value: Any) -> bool:
+        try:
+            return bool(self._test(value, self.literal))
+        except TypeError:
+            # Ordering across incompatible types
+            return False
+
+    def __repr__(self) -> str:
+        return f"({self.field} {self.op} {json.dumps(self.literal)})"
+
+
+class Matches(Predicate):
+    def __init__(self, field: str, pattern: str):
+        super().__init__(field)
+        if not isinstance(pattern, str):
+            raise RuleSyntaxError(f"'matches' needs a regex string, got {pattern!r}")
+        try:
+            self.pattern = re.compile(pattern)
+        except re.error as e:
+            raise RuleSyntaxError(f"Bad regex {pattern!r}: {e}") from e
+
+    def test(self, value: Any) -> bool:
+        return isinstance(value, str) and self.pattern.search(value) is not None
+
+    def __repr__(self) -> str:
+        return f"({self.field} matches {json.dumps(self.pattern.pattern)})"
+
+
+class In(Predicate):
+    def __init__(self, field: str, literals: List[Any]):
+        super().__init__(field)
+        self.literals = tuple(literals)
+
+    def test(self, value: Any) -> bool:
+        return value in self.literals
+
+    def __repr__(self) -> str:
+        return f"({self.field} in {json.dumps(list(self.literals))})"
+
+
+class Exists(Predicate):
+    def test(self, value: Any) -> bool:
+        return True
+
+    def __repr__(self) -> str:
+        return f"(exists {self.field})"
+
+
+class And(Expr):
+    def __init__(self, children: List[Expr]):
+        self.children = children
+        self.fields = frozenset().union(*(c.fields for c in children))
+        # Every child must hold, so any one child's anchors will do
+        anchored = [c.anchors for c in children if c.anchors is not None]
+        self.anchors = min(anchored, key=len) if anchored else None
+
+    def evaluate(self, rec: Mapping[str, Any]) -> bool:
+        for c in self.children:
+            if not c.evaluate(rec):
+                return False
+        return True
+
+    def mask(self, columns: "Columns") -> np.ndarray:
+        out = self.children[0].mask(columns)
+        for c in self.children[1:]:
+            out &= c.mask(columns)
+        return out
+
+    def __repr__(self) -> str:
+        return "(" + " and ".join(map(repr, self.children)) + ")"
+
+
+class Or(Expr):
+    def __init__(self, children: List[Expr]):
+        self.children = children
+        self.fields = frozenset().union(*(c.fields for c in children))
+        # Some child must hold, so the record needs one of their anchors
+        if any(c.anchors is None for c in children):
+            self.anchors = None
+        else:
+            self.anchors = frozenset().union(*(c.anchors for c in children))
+
+    def evaluate(self, rec: Mapping[str, Any]) -> bool:
+        for c in self.children:
+            if c.evaluate(rec):
+                return True
+        return False
+
+    def mask(self, columns: "Columns") -> np.ndarray:
+        out = self.children[0].mask(columns)
+        for c in self.children[1:]:
+            out |= c.mask(columns)
+        return out
+
+    def __repr__(self) -> str:
+        return "(" + " or ".join(map(repr, self.children)) + ")"
+
+
+class Not(Expr):
+    def __init__(self, child: Expr):
+        self.child = child
+        self.fields = child.fields
+
+    def evaluate(self, rec: Mapping[str, Any]) -> bool:
+        return not self.child.evaluate(rec)
+
+    def mask(self, columns: "Columns") -> np.ndarray:
+        return ~self.child.mask(columns)
+
+    def __repr__(self) -> str:
+        return f"(not {self.child!r})"
+
+
+# ---- Parser ----
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.i][0] if self.i < len(self.tokens) else None
+
+    def _next(self, *kinds: str) -> Tuple[str, Any, int]:
+        if self.i >= len(self.tokens):
+            raise RuleSyntaxError(f"Unexpected end of rule: {self.text!r}")
+        tok = self.tokens[self.i]
+        if kinds and tok[0] not in kinds and tok[1] not in kinds:
+            raise RuleSyntaxError(f"Expected {' or '.join(kinds)} at position {tok[2]}, got {tok[1]!r}")
+        self.i += 1
+        return tok
+
+    def parse(self) -> Expr:
+        expr = self._or()
+        if self.i < len(self.tokens):
+            tok = self.tokens[self.i]
+            raise RuleSyntaxError(f"Unexpected {tok[1]!r} at position {tok[2]}")
+        return expr
+
+    def _or(self) -> Expr:
+        children = [self._and()]
+        while self._peek() == "or":
+            self._next()
+            children.append(self._and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def _and(self) -> Expr:
+        children = [self._not()]
+        while self._peek() == "and":
+            self._next()
+            children.append(self._not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def _not(self) -> Expr:
+        if self._peek() == "not":
+            self._next()
+            return Not(self._not())
+        return self._atom()
+
+    def _literal(self) -> Any:
+        kind, value, _ = self._next("string", "number", "true", "false")
+        if kind == "true":
+            return True
+        if kind == "false":
+            return False
+        return value
+
+    def _atom(self) -> Expr:
+        if self._peek() == "(":
+            self._next()
+            expr = self._or()
+            self._next(")")
+            return expr
+        if self._peek() == "exists":
+            self._next()
+            return Exists(self._next("word")[1])
+
+        field = self._next("word")[1]
+        op = self._next("op", *_WORD_OPS)[1]
+        if op == "in":
+            self._next("[")
+            literals = [self._literal()]
+            while self._peek() == ",":
+                self._next()
+                literals.append(self._literal())
+            self._next("]")
+            return In(field, literals)
+        if op == "matches":
+            return Matches(field, self._literal())
+        return Compare(field, op, self._literal())
+
+
+def compile_rule(text: str) -> Expr:
+    """
+    Parses a rule expression into its expression tree.
+    """
+    return _Parser(text).parse()
+
+
+# ---- Columnar sources ----
+
+def _encode(values: Iterable[Any]) -> Tuple[np.ndarray, List[Any]]:
+    """
+    Dictionary-encodes a sequence; None becomes code -1.
+    """
+    index: Dict[Tuple[type, Any], int] = {}
+    uniques: List[Any] = []
+    codes: List[int] = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        try:
+            key = (type(value), value)
+            code = index.get(key)
+        except TypeError:
+            key, code = None, None
+        if code is None:
+            code = len(uniques)
+            uniques.append(value)
+            if key is not None:
+                index[key] = code
+        codes.append(code)
+    return np.asarray(codes, dtype=np.intp), uniques
+
+
+class Columns:
+    """
+    Dictionary-encoded view of a columnar source for Expr.mask: a list of
+    records, a LogBatch or a pandas DataFrame. Each field is encoded once
+    and shared by every rule that refers to it.
+    """
+
+    def __init__(self, source: Any):
+        self.source = source
+        self._cache: Dict[str, Tuple[np.ndarray, List[Any]]] = {}
+        if isinstance(source, list):
+            self.n_rows = len(source)
+            self._encode = self._from_records
+        elif hasattr(source, "factorize") and hasattr(source, "tag_masks"):
+            self.n_rows = len(source)
+            self._encode = self._from_batch
+        elif hasattr(source, "columns") and hasattr(source, "index"):
+            self.n_rows = len(source.index)
+            self._encode = self._from_frame
+        else:
+            raise TypeError(f"Unsupported columnar source: {type(source).__name__}")
+
+    def factorize(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        """
+        (codes, distinct values) for a field; code -1 means missing.
+        """
+        if field not in self._cache:
+            self._cache[field] = self._encode(field)
+        return self._cache[field]
+
+    def _from_records(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        return _encode(rec.get(field) for rec in self.source)
+
+    def _from_batch(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        codes, values = self.source.factorize(field)
+        return np.frombuffer(codes, dtype=np.int32).astype(np.intp), values
+
+    def _from_frame(self, field: str) -> Tuple[np.ndarray, List[Any]]:
+        import pandas as pd
+
+        if field not in self.source.columns:
+            return np.full(self.n_rows, -1, dtype=np.intp), []
+        column = self.source[field]
+        try:
+            codes, uniques = pd.factorize(column, use_na_sentinel=True)
+        except TypeError:
+            # Unhashable cells (lists, dicts): encode them one by one
+            return _encode(None if _is_na(v) else v for v in column.tolist())
+        return np.asarray(codes, dtype=np.intp), list(uniques)
+
+
+def _is_na(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value)
+
+
+# ---- Rule sets ----
+
+class FieldRule:
+    """
+    A tag with a field-predicate expression, e.g.
+    {"tag": "firewall_block", "when": "action == \\"BLOCK\\""}.
+    """
+
+    __slots__ = ("tag", "when", "expr")
+
+    def __init__(self, tag: str, when: str):
+        self.tag = tag
+        self.when = when
+        try:
+            self.expr = compile_rule(when)
+        except RuleSyntaxError as e:
+            raise RuleSyntaxError(f"Tag rule '{tag}': {e}") from e
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "FieldRule":
+        if "tag" not in data or "when" not in data:
+            raise ValueError(f"Field rule needs 'tag' and 'when': {data}")
+        return cls(data["tag"], data["when"])
+
+
+class FieldRuleSet:
+    """
+    Field rules with field-anchor indexing: each rule is filed under its
+    anchor fields (see Expr.anchors), so a record only evaluates the rules
+    anchored on fields it actually has, plus the few with no anchors
+    (e.g. pure `not` rules).
+    """
+
+    def __init__(self, rules: Iterable[FieldRule]):
+        self.rules: List[FieldRule] = list(rules)
+        self._by_field: Dict[str, List[int]] = {}
+        self._always: List[int] = []
+        for idx, rule in enumerate(self.rules):
+            anchors = rule.expr.anchors
+            if anchors is None:
+                self._always.append(idx)
+                continue
+            for field in anchors:
+                self._by_field.setdefault(field, []).append(idx)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        Every field some rule refers to.
+        """
+        return sorted(frozenset().union(*(r.expr.fields for r in self.rules)))
+
+    def _candidates(self, rec: Mapping[str, Any]) -> List[int]:
+        by_field = self._by_field
+        found = set(self._always)
+        for name in rec:
+            idxs = by_field.get(name)
+            if idxs is not None:
+                found.update(idxs)
+        return sorted(found)
+
+    def match(self, rec: Mapping[str, Any]) -> Optional[List[str]]:
+        """
+        Tags of all rules true for the record, in rule-file order; None when
+        nothing matches.
+        """
+        tags: List[str] = []
+        for idx in self._candidates(rec):
+            rule = self.rules[idx]
+            if rule.tag not in tags and rule.expr.evaluate(rec):
+                tags.append(rule.tag)
+        return tags or None
+
+    def masks(self, source: Any) -> np.ndarray:
+        """
+        Boolean matrix [rule, row] over a list of records, a LogBatch or a
+        DataFrame, evaluated column-wise.
+        """
+        columns = source if isinstance(source, Columns) else Columns(source)
+        out = np.zeros((len(self.rules), columns.n_rows), dtype=bool)
+        for idx, rule in enumerate(self.rules):
+            out[idx] = rule.expr.mask(columns)
+        return out
+
+
+def load_field_rules(path: str) -> FieldRuleSet:
+    """
+    Loads a JSON list of {"tag", "when"} rules.
+    """
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, list):
+        raise ValueError(f"Field rule file {path} must contain a JSON list")
+    return FieldRuleSet(FieldRule.from_dict(item) for item in data)
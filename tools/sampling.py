@@ -0,0 +1,220 @@
+import math
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+from config import SAMPLE_MAX_STRATA, SAMPLE_PER_STRATUM, SAMPLE_SEED, SAMPLE_SUSPICIOUS_CAP
+from .beaconing import BeaconCollector
+from .cardinality import FanDetector
+from .correlation import AuthCorrelator
+from .heavy_hitters import HeavyHitters
+from .normalizer import Normalizer, default_normalizer
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser
+from .volumetric import VolumetricDetector
+from .triage import OTHER, UNKNOWN
+
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+
+
+class Reservoir:
+    """
+    Uniform sample of at most `size` items from a stream of unknown length
+    (Algorithm L: after the reservoir fills, the number of items to skip
+    before the next replacement is drawn directly, so most items cost one
+    comparison).
+
+    Items are kept with their position in the stream, so `items` can list
+    them in stream order.
+    """
+
+    __slots__ = ("size", "seen", "_kept", "_rng", "_w", "_next")
+
+    def __init__(self, size: int, rng: random.Random):
+        self.size = size
+        self.seen = 0
+        self._kept: List[Tuple[int, Any]] = []
+        self._rng = rng
+        self._w = 1.0
+        # Stream index of the next item to go in; -1: never (size 0)
+        self._next = size - 1 if size > 0 else -1
+
+    def _skip(self) -> None:
+        rng = self._rng
+        self._w *= math.exp(math.log(1.0 - rng.random()) / self.size)
+        if self._w >= 1.0:
+            self._next += 1
+        elif self._w > 0.0:
+            self._next += int(math.log(1.0 - rng.random()) / math.log1p(-self._w)) + 1
+        else:
+            self._next = -1
+
+    def add(self, item: Any, position: int) -> None:
+        i = self.seen
+        self.seen += 1
+        if i < self.size:
+            self._kept.append((position, item))
+            if i == self._next:
+                self._skip()
+        elif i == self._next:
+            self._kept[self._rng.randrange(self.size)] = (position, item)
+            self._skip()
+
+    @property
+    def kept(self) -> int:
+        return len(self._kept)
+
+    @property
+    def dropped(self) -> int:
+        return self.seen - len(self._kept)
+
+    @property
+    def items(self) -> List[Any]:
+        return [item for _, item in sorted(self._kept, key=lambda kept: kept[0])]
+
+
+def _hour_name(hour: Any) -> str:
+    if not isinstance(hour, int):
+        return hour
+    return datetime.fromtimestamp(hour * 3600, timezone.utc).strftime("%Y-%m-%dT%H:00Z")
+
+
+class StratifiedSampler:
+    """
+    Bounded sample of an oversized input, built in one pass after tagging:
+
+    - suspicious records: all of them up to `suspicious_cap`, then a
+      uniform reservoir of that size
+    - benign records: a reservoir of `per_stratum` records per (log source,
+      hour); past `max_strata` strata, new ones share an "(other)" stratum
+
+    Every record is counted, so the exact number dropped is known overall,
+    per tag and per stratum.
+    """
+
+    def __init__(
+        self,
+        suspicious_cap: int = SAMPLE_SUSPICIOUS_CAP,
+        per_stratum: int = SAMPLE_PER_STRATUM,
+        max_strata: int = SAMPLE_MAX_STRATA,
+        seed: Optional[int] = SAMPLE_SEED,
+    ):
+        self.per_stratum = per_stratum
+        self.max_strata = max_strata
+        self._rng = random.Random(seed)
+        self._suspicious = Reservoir(suspicious_cap, self._rng)
+        # (source, hour since the epoch) -> reservoir
+        self._strata: Dict[Tuple[str, Any], Reservoir] = {}
+        self._tags_seen: Counter = Counter()
+        self._parser = TimestampParser()
+        self.total = 0
+
+    def add(self, rec: Dict[str, Any], tags: Optional[List[str]], source: str, timestamp: Any) -> None:
+        position = self.total
+        self.total += 1
+        if tags:
+            self._tags_seen.update(tags)
+            self._suspicious.add(rec, position)
+            return
+        epoch = self._parser.parse(timestamp)[0] if timestamp is not None else INT64_NULL
+        key = (source, UNKNOWN if epoch == INT64_NULL else epoch // NS_PER_HOUR)
+        stratum = self._strata.get(key)
+        if stratum is None:
+            if len(self._strata) >= self.max_strata:
+                key = (OTHER, OTHER)
+                stratum = self._strata.get(key)
+            if stratum is None:
+                stratum = self._strata[key] = Reservoir(self.per_stratum, self._rng)
+        stratum.add(rec, position)
+
+    @property
+    def n_strata(self) -> int:
+        return len(self._strata)
+
+    @property
+    def suspicious(self) -> List[Dict[str, Any]]:
+        """
+        The kept suspicious records, in stream order.
+        """
+        return self._suspicious.items
+
+    @property
+    def benign(self) -> List[Dict[str, Any]]:
+        """
+        The kept benign records of all strata, in stream order.
+        """
+        kept = [pair for stratum in self._strata.values() for pair in stratum._kept]
+        return [rec for _, rec in sorted(kept, key=lambda pair: pair[0])]
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Exact seen / kept / dropped counts, for session memory and prompts.
+        `limit` caps the strata listed (largest first).
+        """
+        kept_by_tag: Counter = Counter()
+        for rec in self._suspicious.items:
+            kept_by_tag.update(rec.get("tags") or ())
+        strata = sorted(self._strata.items(), key=lambda item: -item[1].seen)[:limit]
+        benign_seen = sum(s.seen for s in self._strata.values())
+        benign_kept = sum(s.kept for s in self._strata.values())
+        return {
+            "total": self.total,
+            "suspicious": {
+                "seen": self._suspicious.seen,
+                "kept": self._suspicious.kept,
+                "dropped": self._suspicious.dropped,
+                "dropped_by_tag": {
+                    tag: n - kept_by_tag[tag] for tag, n in self._tags_seen.most_common() if n > kept_by_tag[tag]
+                },
+            },
+            "benign": {"seen": benign_seen, "kept": benign_kept, "dropped": benign_seen - benign_kept},
+            "strata": [
+                {"source": source, "hour": _hour_name(hour), "seen": s.seen, "kept": s.kept, "dropped": s.dropped}
+                for (source, hour), s in strata
+            ],
+        }
+
+
+def sample(
+    tagged: Iterable[Tuple[Dict[str, Any], Optional[List[str]]]],
+    normalizer: Optional[Normalizer] = None,
+    sampler: Optional[StratifiedSampler] = None,
+    correlator: Optional[AuthCorrelator] = None,
+    hitters: Optional[HeavyHitters] = None,
+    fan: Optional[FanDetector] = None,
+    volumetric: Optional[VolumetricDetector] = None,
+    beacons: Optional[BeaconCollector] = None,
+) -> Tuple[StratifiedSampler, str]:
+    """
+    Feeds (record, tags) pairs, e.g. from iter_tagged, through a
+    StratifiedSampler. The log source is detected per distinct set of
+    field names, so mixed inputs are stratified by their real sources.
+    A `correlator` sees every suspicious record and `hitters`, `fan`,
+    `volumetric` and `beacons` every record, not just the kept ones.
+
+    Returns (sampler, source of the first record).
+    """
+    normalizer = normalizer or default_normalizer()
+    sampler = sampler or StratifiedSampler()
+    first: Optional[str] = None
+
+    for rec, tags in tagged:
+        source, normalize = normalizer.for_record(rec)
+        if first is None:
+            first = source
+        if tags:
+            rec["tags"] = tags
+        ev = normalize(rec)
+        if tags and correlator is not None:
+            correlator.add_event(ev)
+        if hitters is not None:
+            hitters.add_event(ev)
+        if fan is not None:
+            fan.add_event(ev)
+        if volumetric is not None:
+            volumetric.add_event(ev)
+        if beacons is not None:
+            beacons.add_event(ev)
+        sampler.add(rec, tags, source, ev.timestamp)
+
+    return sampler, first or normalizer.generic.source
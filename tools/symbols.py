@@ -0,0 +1,85 @@
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+
+from config import INTERN_FIELDS, INTERN_MAX_SYMBOLS, session_state
+
+SYMBOLS_MEMORY_KEY = "symbol_table"
+
+
+class SymbolTable:
+    """
+    Interns the string values of high-repetition fields, so every record
+    holding the same IP, user, host or message shares one string object.
+
+    Memory per record drops to a reference per field, and equality checks
+    in later stages (dedup, correlation) hit the identity fast path of
+    str.__eq__. The table keeps at most `max_symbols` distinct values;
+    once full, new values are left as decoded and known ones are still
+    shared.
+    """
+
+    def __init__(self, fields: Iterable[str] = INTERN_FIELDS, max_symbols: int = INTERN_MAX_SYMBOLS):
+        self.fields: List[str] = list(dict.fromkeys(fields))
+        self.max_symbols = max_symbols
+        self._symbols: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._symbols
+
+    def intern(self, value: Any) -> Any:
+        """
+        The table's copy of a string value (added if there is room);
+        anything else is returned unchanged.
+        """
+        if type(value) is not str:
+            return value
+        symbol = self._symbols.get(value)
+        if symbol is not None:
+            self.hits += 1
+            return symbol
+        self.misses += 1
+        if len(self._symbols) < self.max_symbols:
+            self._symbols[value] = value
+        return value
+
+    def intern_record(self, rec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Replaces the configured fields' values in place; returns the record.
+        """
+        symbols = self._symbols
+        for name in self.fields:
+            value = rec.get(name)
+            if type(value) is not str:
+                continue
+            symbol = symbols.get(value)
+            if symbol is not None:
+                self.hits += 1
+                rec[name] = symbol
+            else:
+                self.misses += 1
+                if len(symbols) < self.max_symbols:
+                    symbols[value] = value
+        return rec
+
+    def iter_interned(self, records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for rec in records:
+            yield self.intern_record(rec)
+
+    def stats(self) -> Dict[str, int]:
+        return {"symbols": len(self._symbols), "hits": self.hits, "misses": self.misses}
+
+
+def session_symbols(session_id: str, fields: Optional[Iterable[str]] = None) -> SymbolTable:
+    """
+    The session's shared symbol table, created on first use, so every run
+    over the session's logs reuses the same string objects.
+    """
+    table = session_state.get_memory(session_id, SYMBOLS_MEMORY_KEY)
+    if table is None:
+        table = SymbolTable(INTERN_FIELDS if fields is None else fields)
+        session_state.add_memory(session_id, SYMBOLS_MEMORY_KEY, table)
+    return table
@@ -0,0 +1,207 @@
+import json
+import os
+import re
+from typing import List, Dict, Any, Iterable, Iterator, Mapping, Optional, Pattern, Set, Tuple
+
+from config import FIELD_RULES_PATH, TAG_RULES_PATH
+from .rule_engine import FieldRule, FieldRuleSet
+
+
+class TagRule:
+    """
+    A keyword rule: fires when every "all" keyword and, if given,
+    at least one "any" keyword occurs in the message.
+    """
+
+    __slots__ = ("tag", "all", "any")
+
+    def __init__(self, tag: str, all: Iterable[str] = (), any: Iterable[str] = ()):
+        self.tag = tag
+        self.all = frozenset(k.lower() for k in all)
+        self.any = frozenset(k.lower() for k in any)
+        if not self.all and not self.any:
+            raise ValueError(f"Tag rule '{tag}' has no keywords")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TagRule":
+        if "tag" not in data:
+            raise ValueError(f"Tag rule is missing 'tag': {data}")
+        return cls(data["tag"], data.get("all", ()), data.get("any", ()))
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    Builds a regex alternation shaped like a trie, so the engine walks shared
+    prefixes once and always prefers the longest keyword at a position.
+    """
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return body + "?" if len(branches) > 1 else "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class TagRuleSet:
+    """
+    A set of keyword rules compiled into a single multi-pattern matcher.
+
+    All keywords go into one trie-shaped regex applied as a lookahead at
+    every offset, i.e. an Aho-Corasick style single pass over the message
+    executed inside the regex engine. Only rules that share a keyword with
+    the message are evaluated afterwards, so the per-message cost does not
+    grow with the number of rules.
+    """
+
+    def __init__(self, rules: Iterable[TagRule], field_rules: Iterable[FieldRule] = ()):
+        self.rules: List[TagRule] = list(rules)
+        # Predicates over arbitrary fields (see tools.rule_engine)
+        self.field_rules = FieldRuleSet(field_rules)
+
+        # keyword -> indexes of rules that mention it
+        self._rules_by_keyword: Dict[str, List[int]] = {}
+        for idx, rule in enumerate(self.rules):
+            for kw in rule.all | rule.any:
+                self._rules_by_keyword.setdefault(kw, []).append(idx)
+
+        keywords = sorted(self._rules_by_keyword)
+        # The regex reports the longest keyword at each offset; keywords that
+        # are prefixes of it match at the same offset too.
+        self._prefixes: Dict[str, Tuple[str, ...]] = {
+            kw: tuple(k for k in keywords if kw.startswith(k)) for kw in keywords
+        }
+        self._matcher: Optional[Pattern[str]] = (
+            re.compile("(?=(" + _trie_regex(keywords) + "))") if keywords else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.rules) + len(self.field_rules)
+
+    @property
+    def keywords(self) -> List[str]:
+        return list(self._rules_by_keyword)
+
+    def match_keywords(self, message: str) -> Set[str]:
+        """
+        Returns every keyword occurring in the (lowercased) message.
+        """
+        found: Set[str] = set()
+        if self._matcher is None:
+            return found
+        for m in self._matcher.finditer(message):
+            found.update(self._prefixes[m.group(1)])
+        return found
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (offset, keyword) for every keyword occurrence in the
+        (lowercased) text; used to scan many messages joined together.
+        """
+        if self._matcher is None:
+            return
+        prefixes = self._prefixes
+        for m in self._matcher.finditer(text):
+            start = m.start()
+            for kw in prefixes[m.group(1)]:
+                yield start, kw
+
+    def match(self, message: str) -> Optional[List[str]]:
+        """
+        Returns the tags of all matching rules, in rule-file order, or None
+        when nothing matches, so untagged records need no tags list.
+        """
+        if self._matcher is None:
+            return None
+        # A lowered copy is still cheaper than case-insensitive regex matching
+        message = message.lower()
+        if self._matcher.search(message) is None:
+            return None
+        found = self.match_keywords(message)
+
+        candidates: Set[int] = set()
+        for kw in found:
+            candidates.update(self._rules_by_keyword[kw])
+
+        tags: List[str] = []
+        for idx in sorted(candidates):
+            rule = self.rules[idx]
+            if rule.all <= found and (not rule.any or not rule.any.isdisjoint(found)):
+                if rule.tag not in tags:
+                    tags.append(rule.tag)
+        return tags or None
+
+    def tag(self, message: str) -> List[str]:
+        """
+        Returns the tags of all matching rules, in rule-file order.
+        """
+        return self.match(message) or []
+
+    def match_record(self, rec: Mapping[str, Any]) -> Optional[List[str]]:
+        """
+        Keyword rules on the record's message, then field rules on the whole
+        record; None when nothing matches.
+        """
+        message = rec.get("message", "")
+        tags = self.match(message if type(message) is str else str(message))
+        if not self.field_rules.rules:
+            return tags
+        field_tags = self.field_rules.match(rec)
+        if not field_tags:
+            return tags
+        if not tags:
+            return field_tags
+        return tags + [t for t in field_tags if t not in tags]
+
+    @property
+    def tag_order(self) -> List[str]:
+        """
+        Tag of every rule, keyword rules first, the order tags are reported in.
+        """
+        return [r.tag for r in self.rules] + [r.tag for r in self.field_rules.rules]
+
+
+def _load_list(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as fh:
+        data = json.load(fh)
+    if not isinstance(data, list):
+        raise ValueError(f"Tag rule file {path} must contain a JSON list")
+    return data
+
+
+def load_rules(path: str, field_rules_path: Optional[str] = None) -> TagRuleSet:
+    """
+    Loads a JSON list of {"tag", "all", "any"} keyword rules and compiles
+    it. Entries of the form {"tag", "when"} are field rules; they may sit
+    in the same file or in `field_rules_path`.
+    """
+    items = _load_list(path)
+    if field_rules_path and os.path.exists(field_rules_path):
+        items += _load_list(field_rules_path)
+    keyword_rules = [TagRule.from_dict(item) for item in items if "when" not in item]
+    field_rules = [FieldRule.from_dict(item) for item in items if "when" in item]
+    return TagRuleSet(keyword_rules, field_rules)
+
+
+_default_rules: Optional[TagRuleSet] = None
+
+
+def default_rules() -> TagRuleSet:
+    """
+    Rule set from TAG_RULES_PATH and FIELD_RULES_PATH, compiled once per
+    process.
+    """
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = load_rules(TAG_RULES_PATH, FIELD_RULES_PATH)
+    return _default_rules
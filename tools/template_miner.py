@@ -0,0 +1,282 @@
+import re
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Tuple
+
+from config import (
+    TEMPLATE_DEPTH,
+    TEMPLATE_MAX_CHILDREN,
+    TEMPLATE_MAX_CLUSTERS,
+    TEMPLATE_SIM_THRESHOLD,
+)
+from .dedup import DUP_COUNT_FIELD
+from .log_batch import LogBatch
+
+PARAM = "<*>"
+# Template that records without a message are counted under
+NO_MESSAGE = "(no message)"
+
+# Variable parts masked before clustering, most specific first
+_MASKS = (
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b(?:[0-9a-f]{1,4}:){2,7}[0-9a-f]{1,4}\b", re.IGNORECASE), "<IP>"),
+    (re.compile(r"\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"), "<EMAIL>"),
+    (re.compile(r"\b0x[0-9a-f]+\b|\b[0-9a-f]{16,}\b", re.IGNORECASE), "<HEX>"),
+    (re.compile(r"(?<![\w.])[-+]?\d+(?:\.\d+)?(?![\w.])"), "<NUM>"),
+)
+
+
+def mask_message(message: str) -> str:
+    """
+    Replaces IPs, e-mail addresses, hex ids and numbers with placeholders.
+    """
+    for pattern, placeholder in _MASKS:
+        message = pattern.sub(placeholder, message)
+    return message
+
+
+def _has_digits(token: str) -> bool:
+    return any(ch.isdigit() for ch in token)
+
+
+class LogTemplate:
+    """
+    One template cluster: tokens with <*> parameter slots, how many messages
+    it absorbed and the tags seen on them.
+    """
+
+    __slots__ = ("cluster_id", "tokens", "count", "tags", "_path")
+
+    def __init__(self, cluster_id: int, tokens: List[str], path: List[Tuple[Dict[Any, Any], Any]]):
+        self.cluster_id = cluster_id
+        self.tokens = tokens
+        self.count = 0
+        self.tags: List[str] = []
+        # (node, key) steps from the tree root down to the cluster's leaf
+        self._path = path
+
+    @property
+    def _leaf(self) -> List["LogTemplate"]:
+        node, key = self._path[-1]
+        return node[key]
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+    def similarity(self, tokens: List[str]) -> Tuple[float, int]:
+        """
+        (share of positions with an equal token, number of parameter slots).
+        """
+        same = params = 0
+        for mine, theirs in zip(self.tokens, tokens):
+            if mine == PARAM:
+                params += 1
+            elif mine == theirs:
+                same += 1
+        return same / len(tokens) if tokens else 1.0, params
+
+    def merge(self, tokens: List[str]) -> None:
+        self.tokens = [
+            mine if mine == theirs else PARAM for mine, theirs in zip(self.tokens, tokens)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"template": self.template, "count": self.count, "tags": list(self.tags)}
+
+    def __repr__(self) -> str:
+        return f"LogTemplate({self.template!r}, count={self.count})"
+
+
+class TemplateMiner:
+    """
+    Drain-style online log template miner.
+
+    Masked messages are routed through a fixed-depth prefix tree (token
+    count, then the first few tokens) to a small leaf of candidate
+    clusters, so each message costs roughly the same regardless of how
+    many have been seen. The most similar cluster above `sim_threshold`
+    absorbs the message, turning differing tokens into <*> slots;
+    otherwise a new cluster is started. At most `max_clusters` clusters
+    are kept, evicting the least recently matched.
+    """
+
+    def __init__(
+        self,
+        sim_threshold: float = TEMPLATE_SIM_THRESHOLD,
+        depth: int = TEMPLATE_DEPTH,
+        max_children: int = TEMPLATE_MAX_CHILDREN,
+        max_clusters: int = TEMPLATE_MAX_CLUSTERS,
+    ):
+        if depth < 3:
+            raise ValueError("Template tree depth must be at least 3")
+        self.sim_threshold = sim_threshold
+        # Levels of token nodes below the token-count level
+        self.token_levels = depth - 2
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+
+        self._root: Dict[int, Dict[str, Any]] = {}
+        self._clusters: "OrderedDict[int, LogTemplate]" = OrderedDict()
+        self._next_id = 0
+        self.total = 0
+        self.evicted = 0
+
+    def _route(self, tokens: List[str]) -> List[Tuple[Dict[Any, Any], Any]]:
+        """
+        (node, key) steps from the root to the leaf for these tokens,
+        creating missing nodes on the way.
+        """
+        path: List[Tuple[Dict[Any, Any], Any]] = [(self._root, len(tokens))]
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[: self.token_levels]:
+            if _has_digits(token):
+                token = PARAM
+            key = token
+            if token not in node and len(node) >= self.max_children:
+                # A full node sends new tokens down the shared wildcard branch
+                key = PARAM
+            path.append((node, key))
+            node = node.setdefault(key, {})
+        path.append((node, ""))
+        node.setdefault("", [])
+        return path
+
+    def _evict(self, cluster: LogTemplate) -> None:
+        """
+        Drops a cluster from its leaf, then prunes the leaf and every node
+        above it that was left empty.
+        """
+        cluster._leaf.remove(cluster)
+        for node, key in reversed(cluster._path):
+            if node[key]:
+                break
+            del node[key]
+
+    def _best_match(self, leaf: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        best: Optional[LogTemplate] = None
+        best_key = (-1.0, -1)
+        for cluster in leaf:
+            key = cluster.similarity(tokens)
+            if key > best_key:
+                best, best_key = cluster, key
+        if best is not None and best_key[0] >= self.sim_threshold:
+            return best
+        return None
+
+    def add(self, message: str, count: int = 1, tags: Optional[Iterable[str]] = None) -> LogTemplate:
+        """
+        Feeds one message (seen `count` times) and returns its template.
+        """
+        tokens = mask_message(message).split()
+        path = self._route(tokens)
+        node, key = path[-1]
+        leaf = node[key]
+        cluster = self._best_match(leaf, tokens)
+        if cluster is None:
+            cluster = LogTemplate(self._next_id, tokens, path)
+            self._next_id += 1
+            leaf.append(cluster)
+            self._clusters[cluster.cluster_id] = cluster
+            if len(self._clusters) > self.max_clusters:
+                _, old = self._clusters.popitem(last=False)
+                self._evict(old)
+                self.evicted += old.count
+        else:
+            cluster.merge(tokens)
+            self._clusters.move_to_end(cluster.cluster_id)
+
+        cluster.count += count
+        self.total += count
+        for tag in tags or ():
+            if tag not in cluster.tags:
+                cluster.tags.append(tag)
+        return cluster
+
+    def add_records(self, records: Iterable[Mapping[str, Any]], field: str = "message") -> None:
+        for rec in records:
+            message = rec.get(field)
+            if message is not None:
+                self.add(str(message), tags=rec.get("tags"))
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+    def templates(self, limit: Optional[int] = None) -> List[LogTemplate]:
+        """
+        Clusters ordered by occurrence count, most frequent first.
+        """
+        ordered = sorted(self._clusters.values(), key=lambda c: (-c.count, c.cluster_id))
+        return ordered[:limit] if limit is not None else ordered
+
+    def summary(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [c.to_dict() for c in self.templates(limit)]
+
+
+def mine_batch(batch: LogBatch, field: str = "message", miner: Optional[TemplateMiner] = None) -> TemplateMiner:
+    """
+    Mines a LogBatch column. Each distinct message is fed once with its
+    row count and the union of its rows' tags, using the column's
+    dictionary encoding instead of decoding every row. Rows whose message
+    is missing or null are skipped.
+    """
+    miner = miner or TemplateMiner()
+    if field not in batch.fields:
+        return miner
+    codes, values = batch.dictionary(field)
+    counts: Dict[int, int] = {}
+    masks: Dict[int, int] = {}
+    for code, mask in zip(codes, batch.tag_masks):
+        if code >= 0:
+            counts[code] = counts.get(code, 0) + 1
+            masks[code] = masks.get(code, 0) | mask
+    names = batch.tag_names
+    for code, n in counts.items():
+        # A null message is no message, as in TemplateMiner.add_records
+        if values[code] is None:
+            continue
+        mask = masks[code]
+        tags = [name for bit, name in enumerate(names) if mask >> bit & 1]
+        miner.add(str(values[code]), count=n, tags=tags)
+    return miner
+
+
+def digest_records(
+    records: Iterable[Mapping[str, Any]],
+    limit: Optional[int] = None,
+    sample_size: Optional[int] = None,
+    field: str = "message",
+) -> Dict[str, Any]:
+    """
+    Compact stand-in for a list of records in LLM prompts: the number of
+    records, their `limit` most frequent message templates (counts include
+    dup_count) and, as a sample, the first record of each of the
+    `sample_size` most frequent templates. Records without a message are
+    counted under "(no message)".
+    """
+    miner = TemplateMiner()
+    examples: Dict[int, Mapping[str, Any]] = {}
+    missing = {"template": NO_MESSAGE, "count": 0, "tags": []}
+    missing_example: Optional[Mapping[str, Any]] = None
+    total = 0
+    for rec in records:
+        count = rec.get(DUP_COUNT_FIELD) or 1
+        total += count
+        message = rec.get(field)
+        if message is None:
+            missing["count"] += count
+            missing["tags"] += [t for t in rec.get("tags") or () if t not in missing["tags"]]
+            missing_example = missing_example or rec
+            continue
+        cluster = miner.add(str(message), count, rec.get("tags"))
+        examples.setdefault(cluster.cluster_id, rec)
+
+    ranked = [(c.to_dict(), examples[c.cluster_id]) for c in miner.templates()]
+    if missing["count"]:
+        ranked.append((missing, missing_example))
+        ranked.sort(key=lambda t: -t[0]["count"])
+    ranked = ranked[:limit]
+    return {
+        "records": total,
+        "templates": [template for template, _ in ranked],
+        "sample": [example for _, example in ranked[:sample_size]],
+    }
@@ -0,0 +1,163 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timezone
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
+
+# Sentinel epoch for records without a usable timestamp
+INT64_NULL = -(1 << 63)
+
+NS_PER_SECOND = 1_000_000_000
+
+# Layouts the fast path recognises; each can be rebuilt exactly from the
+# epoch value. Format codes index this tuple.
+TS_FORMATS = ("%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+TS_MISSING = -1
+TS_OTHER = -2  # parsed via fromisoformat; original string must be kept
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+TimeLike = Union[int, str, datetime]
+
+
+def parse_timestamp_ns(value: str) -> Optional[int]:
+    """
+    ISO-8601 string -> epoch nanoseconds (naive values are taken as UTC).
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    return datetime_to_ns(dt)
+
+
+def datetime_to_ns(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp()) * NS_PER_SECOND + dt.microsecond * 1000
+
+
+def format_timestamp_ns(epoch_ns: int, code: int) -> str:
+    dt = datetime.fromtimestamp(epoch_ns // NS_PER_SECOND, timezone.utc)
+    return dt.strftime(TS_FORMATS[code])
+
+
+def _format_code(value: str, dt: datetime) -> int:
+    """
+    Format code of a string already parsed by fromisoformat into `dt`,
+    judged from its shape. Only naive values and a trailing "Z" qualify;
+    anything carrying another offset is TS_OTHER and keeps its text.
+    """
+    n = len(value)
+    if n < 19 or value[4] != "-" or value[7] != "-" or value[13] != ":" or value[16] != ":":
+        return TS_OTHER
+    if n == 20 and value[10] == "T" and value[19] == "Z":
+        return 0 if dt.tzinfo is timezone.utc else TS_OTHER
+    if n == 19 and dt.tzinfo is None:
+        sep = value[10]
+        return 1 if sep == " " else 2 if sep == "T" else TS_OTHER
+    return TS_OTHER
+
+
+class TimestampParser:
+    """
+    Cached, format-specific timestamp parser.
+
+    Each value is split by the C-level datetime.fromisoformat; for the
+    common whole-second layouts the epoch is then assembled from a per-day
+    cache plus the time fields, skipping the slower tz-aware timestamp()
+    conversion. The format code is judged from the string's shape, so the
+    original can be rebuilt without keeping it.
+    """
+
+    def __init__(self):
+        self._day_seconds: Dict[str, int] = {}
+
+    def parse(self, value: Any) -> Tuple[int, int]:
+        """
+        Returns (epoch_ns, format code). Unparseable values give
+        (INT64_NULL, TS_OTHER).
+        """
+        if type(value) is not str:
+            return INT64_NULL, TS_OTHER
+        try:
+            dt = datetime.fromisoformat(value)
+        except ValueError:
+            return INT64_NULL, TS_OTHER
+
+        code = _format_code(value, dt)
+        if code == TS_OTHER:
+            return datetime_to_ns(dt), TS_OTHER
+        key = value[:10]
+        day = self._day_seconds.get(key)
+        if day is None:
+            day = self._day_seconds[key] = (dt.toordinal() - _EPOCH_DAY) * 86400
+        return (day + dt.hour * 3600 + dt.minute * 60 + dt.second) * NS_PER_SECOND, code
+
+    def parse_many(self, values: Iterable[Any]) -> Tuple[array, array]:
+        """
+        Bulk conversion: returns (int64 epoch-ns array, int8 format codes).
+        """
+        epochs = array("q")
+        codes = array("b")
+        parse = self.parse
+        for value in values:
+            epoch, code = parse(value)
+            epochs.append(epoch)
+            codes.append(code)
+        return epochs, codes
+
+
+def parse_timestamps(values: Iterable[Any]) -> array:
+    """
+    Converts a column of timestamp strings to an int64 epoch-ns array
+    (INT64_NULL where unparseable).
+    """
+    return TimestampParser().parse_many(values)[0]
+
+
+def to_epoch_ns(value: TimeLike) -> int:
+    """
+    Accepts epoch nanoseconds, an ISO-8601 string or a datetime.
+    """
+    if isinstance(value, datetime):
+        return datetime_to_ns(value)
+    if isinstance(value, str):
+        epoch, _ = TimestampParser().parse(value)
+        if epoch == INT64_NULL:
+            raise ValueError(f"Unparseable timestamp: {value!r}")
+        return epoch
+    return int(value)
+
+
+class TimeIndex:
+    """
+    Sorted (epoch, row) index over a timestamp column; range queries are
+    two binary searches. Rows without a timestamp are left out.
+    """
+
+    def __init__(self, epochs: array):
+        rows = [i for i, ts in enumerate(epochs) if ts != INT64_NULL]
+        # Exports are usually already in time order; skip the sort then
+        if any(epochs[a] > epochs[b] for a, b in zip(rows, rows[1:])):
+            rows.sort(key=epochs.__getitem__)
+        self.rows = array("q", rows)
+        self.epochs = array("q", (epochs[i] for i in rows))
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def between(self, start: TimeLike, end: TimeLike) -> List[int]:
+        """
+        Row indexes with start <= timestamp <= end, in time order.
+        """
+        lo = bisect_left(self.epochs, to_epoch_ns(start))
+        hi = bisect_right(self.epochs, to_epoch_ns(end))
+        return self.rows[lo:hi].tolist()
+
+    @property
+    def first(self) -> Optional[int]:
+        return self.epochs[0] if self.epochs else None
+
+    @property
+    def last(self) -> Optional[int]:
+        return self.epochs[-1] if self.epochs else None
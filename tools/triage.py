@@ -0,0 +1,142 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Mapping, Optional, Tuple
+
+from config import TRIAGE_MAX_KEYS
+from .beaconing import BeaconCollector
+from .cardinality import FanDetector
+from .heavy_hitters import HeavyHitters
+from .normalizer import Normalizer, default_normalizer
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser
+from .volumetric import VolumetricDetector
+
+NS_PER_HOUR = 3600 * NS_PER_SECOND
+OTHER = "(other)"
+UNKNOWN = "(unknown)"
+
+
+class TriageStats:
+    """
+    Aggregate counts that stand in for the benign records in triage mode:
+    totals plus counts per log source, action, hour and tag. Each breakdown
+    keeps at most `max_keys` distinct keys; the rest are counted under
+    "(other)", so memory does not grow with the feed.
+
+    Lines a LinePrefilter skipped without decoding are added with
+    add_prefiltered: they count towards the totals only.
+    """
+
+    def __init__(self, max_keys: int = TRIAGE_MAX_KEYS):
+        self.max_keys = max_keys
+        self.total = 0
+        self.suspicious = 0
+        self.prefiltered = 0
+        self.by_source: Counter = Counter()
+        self.by_action: Counter = Counter()
+        self.by_hour: Counter = Counter()
+        self.by_tag: Counter = Counter()
+        self._parser = TimestampParser()
+
+    def _count(self, counter: Counter, key: Any) -> None:
+        if key not in counter and len(counter) >= self.max_keys:
+            key = OTHER
+        counter[key] += 1
+
+    def add(self, source: str, action: Any, timestamp: Any, tags: Optional[List[str]]) -> None:
+        self.total += 1
+        self._count(self.by_source, source)
+        self._count(self.by_action, UNKNOWN if action is None else str(action))
+        epoch = self._parser.parse(timestamp)[0] if timestamp is not None else INT64_NULL
+        self._count(self.by_hour, UNKNOWN if epoch == INT64_NULL else epoch // NS_PER_HOUR)
+        if tags:
+            self.suspicious += 1
+            for tag in tags:
+                self._count(self.by_tag, tag)
+
+    def add_prefiltered(self, count: int) -> None:
+        self.total += count
+        self.prefiltered += count
+
+    @property
+    def benign(self) -> int:
+        return self.total - self.suspicious
+
+    def to_dict(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Plain-dict summary for session memory and prompts; hours are
+        rendered as ISO-8601 and listed in time order.
+        """
+        hours = sorted((k for k in self.by_hour if isinstance(k, int)))
+        by_hour = {
+            datetime.fromtimestamp(h * 3600, timezone.utc).strftime("%Y-%m-%dT%H:00Z"): self.by_hour[h]
+            for h in hours
+        }
+        for key in (OTHER, UNKNOWN):
+            if key in self.by_hour:
+                by_hour[key] = self.by_hour[key]
+        return {
+            "total": self.total,
+            "suspicious": self.suspicious,
+            "benign": self.benign,
+            "prefiltered": self.prefiltered,
+            "by_source": dict(self.by_source.most_common(limit)),
+            "by_action": dict(self.by_action.most_common(limit)),
+            "by_hour": by_hour,
+            "by_tag": dict(self.by_tag.most_common(limit)),
+        }
+
+
+def triage(
+    tagged: Iterable[Tuple[Dict[str, Any], Optional[List[str]]]],
+    normalizer: Optional[Normalizer] = None,
+    stats: Optional[TriageStats] = None,
+    hitters: Optional[HeavyHitters] = None,
+    fan: Optional[FanDetector] = None,
+    volumetric: Optional[VolumetricDetector] = None,
+    beacons: Optional[BeaconCollector] = None,
+) -> Tuple[List[Dict[str, Any]], TriageStats, str]:
+    """
+    Consumes (record, tags) pairs, e.g. from iter_tagged, counting every
+    record but keeping only the suspicious ones (with "tags" set). Benign
+    records are dropped as soon as they are counted (and, with `hitters`,
+    `fan`, `volumetric` and `beacons`, counted towards the top talkers,
+    fan-out and rate sketches and the beaconing connection times).
+
+    Returns (suspicious records, stats, source of the first record). The
+    source is detected per distinct set of field names, so mixed inputs
+    are broken down by their real sources.
+    """
+    normalizer = normalizer or default_normalizer()
+    stats = stats or TriageStats()
+    suspicious: List[Dict[str, Any]] = []
+    first: Optional[str] = None
+
+    for rec, tags in tagged:
+        source, normalize = normalizer.for_record(rec)
+        if first is None:
+            first = source
+        if tags:
+            rec["tags"] = tags
+        ev = normalize(rec)
+        stats.add(source, ev.event_action, ev.timestamp, tags)
+        if hitters is not None:
+            hitters.add_event(ev)
+        if fan is not None:
+            fan.add_event(ev)
+        if volumetric is not None:
+            volumetric.add_event(ev)
+        if beacons is not None:
+            beacons.add_event(ev)
+        if tags:
+            suspicious.append(rec)
+
+    return suspicious, stats, first or normalizer.generic.source
+
+
+def tagged_from_records(records: Iterable[Mapping[str, Any]]) -> Iterable[Tuple[Dict[str, Any], Optional[List[str]]]]:
+    """
+    Adapts already-tagged records (e.g. from iter_file_parallel) to the
+    (record, tags) pairs triage consumes.
+    """
+    for rec in records:
+        yield rec, rec.get("tags") or None
@@ -0,0 +1,191 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .log_parser import _decode_content
+from .tag_rules import TagRuleSet, default_rules
+
+# Joins the lowercased messages into one buffer; never part of a keyword
+_SEPARATOR = "\x00"
+# Up to this many keywords, one str.find sweep per keyword beats the
+# single-pass multi-pattern regex over the joined buffer
+FIND_MAX_KEYWORDS = 32
+
+
+def _message_text(value: Any) -> str:
+    # Same text parse_logs tags: str(rec.get("message", "")); NaN is how a
+    # DataFrame spells a missing message
+    if isinstance(value, float) and value != value:
+        return ""
+    return value if type(value) is str else str(value)
+
+
+def _find_all(text: str, keyword: str) -> List[int]:
+    offsets: List[int] = []
+    find = text.find
+    i = find(keyword)
+    while i != -1:
+        offsets.append(i)
+        i = find(keyword, i + 1)
+    return offsets
+
+
+def _scan(text: str, rules: TagRuleSet, index: Dict[str, int]) -> Tuple[List[int], List[int]]:
+    """
+    (offsets, keyword ids) of every keyword occurrence in the buffer.
+    """
+    offsets: List[int] = []
+    kw_ids: List[int] = []
+    if len(index) <= FIND_MAX_KEYWORDS:
+        for kw, i in index.items():
+            found = _find_all(text, kw)
+            offsets += found
+            kw_ids += [i] * len(found)
+    else:
+        for off, kw in rules.iter_matches(text):
+            offsets.append(off)
+            kw_ids.append(index[kw])
+    return offsets, kw_ids
+
+
+def keyword_hits(messages: List[str], rules: TagRuleSet) -> Tuple[np.ndarray, Dict[str, int]]:
+    """
+    Boolean matrix [keyword, row]: does the keyword occur in the message.
+
+    All messages are lowercased and joined into one buffer, which is
+    scanned with str.find per keyword (or, for large rule sets, the rule
+    set's single-pass multi-pattern matcher); match offsets are mapped
+    back to rows with a binary search over the message boundaries, so the
+    per-row Python work is just the lowercasing.
+    """
+    keywords = rules.keywords
+    index = {kw: i for i, kw in enumerate(keywords)}
+    n = len(messages)
+    hits = np.zeros((len(keywords), n), dtype=bool)
+    if not n or not keywords:
+        return hits, index
+
+    lowered = [m.lower() for m in messages]
+    if any(_SEPARATOR in kw for kw in keywords):
+        # A keyword could span two messages in the joined buffer
+        for row, message in enumerate(lowered):
+            for kw in rules.match_keywords(message):
+                hits[index[kw], row] = True
+        return hits, index
+
+    lengths = np.fromiter(map(len, lowered), dtype=np.int64, count=n)
+    starts = np.cumsum(lengths + 1) - lengths - 1
+    offsets, kw_ids = _scan(_SEPARATOR.join(lowered), rules, index)
+    if offsets:
+        rows = np.searchsorted(starts, np.asarray(offsets, dtype=np.int64), side="right") - 1
+        hits[np.asarray(kw_ids, dtype=np.intp), rows] = True
+    return hits, index
+
+
+def rule_masks(messages: List[str], rules: TagRuleSet) -> np.ndarray:
+    """
+    Boolean matrix [rule, row], evaluated column-wise: AND over each
+    rule's "all" keywords, OR over its "any" keywords.
+    """
+    hits, index = keyword_hits(messages, rules)
+    masks = np.ones((len(rules.rules), len(messages)), dtype=bool)
+    for r, rule in enumerate(rules.rules):
+        for kw in rule.all:
+            masks[r] &= hits[index[kw]]
+        if rule.any:
+            masks[r] &= hits[[index[kw] for kw in rule.any]].any(axis=0)
+    return masks
+
+
+def _tag_lists(masks: np.ndarray, tag_order: List[str]) -> List[List[str]]:
+    """
+    Per-row tag lists from a [rule, row] mask. Rows are grouped by which
+    rules fired, so the tag list of each distinct combination is built once.
+    """
+    out: List[List[str]] = [[] for _ in range(masks.shape[1])]
+    matched = np.flatnonzero(masks.any(axis=0))
+    if not len(matched):
+        return out
+    packed = np.ascontiguousarray(np.packbits(masks[:, matched], axis=0).T)
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+    combos, inverse = np.unique(keys, return_inverse=True)
+
+    tag_lists: List[List[str]] = []
+    for combo in combos:
+        fired = np.unpackbits(np.frombuffer(combo.tobytes(), dtype=np.uint8))[: len(tag_order)]
+        tags: List[str] = []
+        for r in np.flatnonzero(fired):
+            if tag_order[r] not in tags:
+                tags.append(tag_order[r])
+        tag_lists.append(tags)
+
+    for row, combo in zip(matched.tolist(), inverse.ravel().tolist()):
+        out[row] = list(tag_lists[combo])
+    return out
+
+
+def tag_messages(messages: Iterable[Any], rules: Optional[TagRuleSet] = None) -> List[List[str]]:
+    """
+    Keyword-rule tags for every message, identical to TagRuleSet.tag per
+    message.
+    """
+    if rules is None:
+        rules = default_rules()
+    messages = [_message_text(m) for m in messages]
+    return _tag_lists(rule_masks(messages, rules), [r.tag for r in rules.rules])
+
+
+def _record_masks(messages: List[Any], source: Any, rules: TagRuleSet) -> np.ndarray:
+    masks = rule_masks([_message_text(m) for m in messages], rules)
+    if rules.field_rules.rules:
+        masks = np.vstack([masks, rules.field_rules.masks(source)])
+    return masks
+
+
+def tag_records(records: List[Dict[str, Any]], rules: Optional[TagRuleSet] = None) -> List[List[str]]:
+    """
+    Tags for every record, identical to TagRuleSet.match_record per record:
+    keyword rules on the messages plus field rules as column-wise masks.
+    """
+    if rules is None:
+        rules = default_rules()
+    masks = _record_masks([rec.get("message", "") for rec in records], records, rules)
+    return _tag_lists(masks, rules.tag_order)
+
+
+def tag_frame(
+    df: pd.DataFrame,
+    rules: Optional[TagRuleSet] = None,
+    field: str = "message",
+) -> pd.Series:
+    """
+    Tag lists for every row of a DataFrame, as a Series on its index.
+    `field` holds the message; field rules see every column.
+    """
+    if rules is None:
+        rules = default_rules()
+    column = df[field].tolist() if field in df.columns else [""] * len(df)
+    tags = _tag_lists(_record_masks(column, df, rules), rules.tag_order)
+    return pd.Series(tags, index=df.index, dtype=object, name="tags")
+
+
+def parse_frame(log_content: str, rules: Optional[TagRuleSet] = None) -> pd.DataFrame:
+    """
+    Decodes logs straight into a DataFrame with a "tags" column.
+    """
+    df = pd.DataFrame([rec for rec in _decode_content(log_content) if isinstance(rec, dict)])
+    df["tags"] = tag_frame(df, rules)
+    return df
+
+
+def parse_logs_vectorized(log_content: str, rules: Optional[TagRuleSet] = None) -> List[Dict[str, Any]]:
+    """
+    Drop-in replacement for parse_logs on large inputs: same records, same
+    tags, but the rules are evaluated column-wise over all messages.
+    """
+    records = [rec.copy() for rec in _decode_content(log_content)]
+    tags = tag_records(records, rules)
+    for rec, rec_tags in zip(records, tags):
+        rec["tags"] = rec_tags
+    return records
@@ -0,0 +1,381 @@
+import math
+from hashlib import blake2b
+from typing import List, Dict, Any, Callable, Iterable, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    VOLUME_DELTA,
+    VOLUME_EPSILON,
+    VOLUME_FAST_HALF_LIFE,
+    VOLUME_FLOOD_RATE,
+    VOLUME_MAX_FINDINGS,
+    VOLUME_MIN_RATE,
+    VOLUME_SLOW_HALF_LIFE,
+    VOLUME_SPIKE_FACTOR,
+)
+from .beaconing import _address_keys, _field
+from .log_batch import _CODE_MISSING, LogBatch
+from .normalizer import NormalizedEvent, Normalizer, attr_name, default_normalizer
+from .timestamps import INT64_NULL, NS_PER_SECOND, TimestampParser, format_timestamp_ns
+
+# Events folded into the sketches per step; spikes are checked once a step
+_CHUNK = 1024
+# Exponent of the forward-decay weights at which the table is rescaled
+_RESCALE = 64.0
+CHANNELS = ("events", "bytes")
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """
+    splitmix64 finalizer over uint64 (wrapping arithmetic).
+    """
+    x = x.astype(np.uint64)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return x
+
+
+def key_id(value: Any) -> int:
+    """
+    Stable int64 id of any key value (the same in every process).
+    """
+    digest = blake2b(repr(value).encode("utf-8", "surrogatepass"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def key_ids(values: Iterable[Any]) -> np.ndarray:
+    """
+    int64 ids of a sequence of key values, hashing each distinct value once.
+    """
+    cache: Dict[Any, int] = {}
+    out = []
+    for value in values:
+        i = cache.get(value)
+        if i is None:
+            i = cache[value] = key_id(value)
+        out.append(i)
+    return np.array(out, dtype=np.int64)
+
+
+class DecayingCountMinSketch:
+    """
+    Count-min sketch whose counts decay exponentially with `half_life`
+    seconds, with one counter table per channel (e.g. events and bytes).
+
+    width = ceil(e / epsilon) and depth = ceil(ln(1 / delta)): an estimate
+    exceeds the true decayed count by more than epsilon times the total
+    decayed mass with probability at most delta; it never undercounts.
+    Memory is channels * depth * width floats, whatever the number of keys.
+
+    Decay is forward decay: an item at time t is added with weight
+    exp(rate * (t - landmark)) and counts are scaled by
+    exp(-rate * (now - landmark)) when read, so updates commute (order and
+    batching do not matter) and sketches with the same parameters merge
+    by addition.
+    """
+
+    def __init__(
+        self,
+        epsilon: float = VOLUME_EPSILON,
+        delta: float = VOLUME_DELTA,
+        half_life: float = VOLUME_FAST_HALF_LIFE,
+        channels: int = len(CHANNELS),
+        seed: int = 0,
+    ):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.half_life = half_life
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.rate = math.log(2) / half_life
+        self.seed = seed
+        self._seeds = np.random.default_rng(seed).integers(1, 1 << 63, self.depth, dtype=np.int64).astype(np.uint64)
+        self._offsets = np.arange(self.depth, dtype=np.int64) * self.width
+        self.table = np.zeros((channels, self.depth * self.width))
+        self.landmark = 0.0
+
+    def columns(self, keys: np.ndarray) -> np.ndarray:
+        """
+        (n, depth) flat table positions of int64 keys.
+        """
+        mixed = _mix(keys.astype(np.uint64)[:, None] ^ self._seeds[None, :])
+        return (mixed % np.uint64(self.width)).astype(np.int64) + self._offsets
+
+    def _rescale(self, t: float) -> None:
+        self.table *= math.exp(-self.rate * (t - self.landmark))
+        self.landmark = t
+
+    def update(self, columns: np.ndarray, times: np.ndarray, values: np.ndarray) -> None:
+        """
+        Adds n items: their `columns` (see columns()), times in seconds
+        and (n, channels) values.
+        """
+        if not len(times):
+            return
+        latest = float(times.max())
+        if self.rate * (latest - self.landmark) > _RESCALE:
+            self._rescale(latest)
+        weights = np.exp(self.rate * (times - self.landmark))
+        flat = columns.ravel()
+        for c in range(self.table.shape[0]):
+            w = np.repeat(values[:, c] * weights, self.depth)
+            self.table[c] += np.bincount(flat, weights=w, minlength=self.table.shape[1])
+
+    def query(self, columns: np.ndarray, now: float) -> np.ndarray:
+        """
+        (n, channels) decayed counts at time `now`.
+        """
+        scale = math.exp(-self.rate * (now - self.landmark))
+        return self.table[:, columns].min(axis=2).T * scale
+
+    def merge(self, other: "DecayingCountMinSketch") -> None:
+        """
+        Adds another sketch built with the same parameters and seed.
+        """
+        if (other.width, other.depth, other.rate, other.seed) != (self.width, self.depth, self.rate, self.seed):
+            raise ValueError("Only sketches with the same parameters and seed can be merged")
+        if other.landmark > self.landmark:
+            self._rescale(other.landmark)
+        self.table += other.table * math.exp(-self.rate * (self.landmark - other.landmark))
+
+    def rates(self, counts: np.ndarray, elapsed: float) -> np.ndarray:
+        """
+        Per-second rates from decayed counts. Corrected for a stream only
+        `elapsed` seconds old, so a steady rate reads the same from the
+        first second on.
+        """
+        return counts * self.rate / -math.expm1(-self.rate * (elapsed + 1.0))
+
+
+class VolumetricDetector:
+    """
+    Streaming event and byte rates per key (dst_ip, src_ip, ...) from two
+    decaying count-min sketches: a fast one (`fast_half_life`) for the
+    current rate and a slow one (`slow_half_life`) as the rolling
+    baseline. Memory is fixed whatever the number of keys.
+
+    - spike: current rate >= `min_rate` events/s and >= `spike_factor`
+      times the baseline
+    - flood: current rate >= `flood_rate` events/s, whatever the baseline
+
+    Events are folded in time-ordered steps of about a thousand; each step
+    checks the keys it touched. At most `max_findings` keys are reported
+    (the weakest make room for stronger ones). Streaming callers pass one
+    NormalizedEvent at a time to add_event, which buffers a step's worth.
+    """
+
+    # Canonical fields keyed on, as in detect_volumetric
+    dims = ("dst_ip", "src_ip")
+
+    def __init__(
+        self,
+        epsilon: float = VOLUME_EPSILON,
+        delta: float = VOLUME_DELTA,
+        fast_half_life: float = VOLUME_FAST_HALF_LIFE,
+        slow_half_life: float = VOLUME_SLOW_HALF_LIFE,
+        spike_factor: float = VOLUME_SPIKE_FACTOR,
+        min_rate: float = VOLUME_MIN_RATE,
+        flood_rate: float = VOLUME_FLOOD_RATE,
+        max_findings: int = VOLUME_MAX_FINDINGS,
+    ):
+        self.fast = DecayingCountMinSketch(epsilon, delta, fast_half_life)
+        self.slow = DecayingCountMinSketch(epsilon, delta, slow_half_life)
+        self.spike_factor = spike_factor
+        self.min_rate = min_rate
+        self.flood_rate = flood_rate
+        self.max_findings = max_findings
+        # Epoch (ns) that stream time is counted from
+        self.start: Optional[int] = None
+        self.now = 0.0
+        self.events = 0
+        self._findings: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        # add_event buffer: epochs, bytes, key ids per dimension, id -> value
+        self._parser = TimestampParser()
+        self._epochs: List[int] = []
+        self._bytes: List[float] = []
+        self._ids: Dict[str, List[int]] = {dim: [] for dim in self.dims}
+        self._names: Dict[int, Any] = {}
+
+    def add_event(self, ev: NormalizedEvent) -> None:
+        """
+        Buffers one event; every _CHUNK events are folded in as a step.
+        Events without a parseable timestamp are skipped.
+        """
+        epoch = self._parser.parse(ev.timestamp)[0] if ev.timestamp is not None else INT64_NULL
+        if epoch == INT64_NULL:
+            return
+        self._epochs.append(epoch)
+        nbytes = ev.network_bytes
+        self._bytes.append(float(nbytes) if isinstance(nbytes, (int, float)) and not isinstance(nbytes, bool) else 0.0)
+        for dim in self.dims:
+            value = getattr(ev, dim)
+            if value is None:
+                self._ids[dim].append(-1)
+                continue
+            i = key_id(value)
+            self._names[i] = value
+            self._ids[dim].append(i)
+        if len(self._epochs) >= _CHUNK:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Folds in the events add_event has buffered.
+        """
+        if not self._epochs:
+            return
+        keys = {dim: (np.array(ids, dtype=np.int64), self._names.__getitem__) for dim, ids in self._ids.items()}
+        self.observe(np.array(self._epochs, dtype=np.int64), np.array(self._bytes), keys)
+        self._epochs, self._bytes = [], []
+        self._ids = {dim: [] for dim in self.dims}
+        self._names = {}
+
+    def observe(
+        self,
+        epochs: np.ndarray,
+        nbytes: np.ndarray,
+        keys: Dict[str, Tuple[np.ndarray, Callable[[int], Any]]],
+    ) -> None:
+        """
+        Folds in events: epoch-ns times (INT64_NULL rows are skipped), byte
+        counts and, per dimension (e.g. "dst_ip"), int64 key ids (-1 when
+        missing) with the function that turns an id back into the value
+        reported in findings. Rows are taken in time order.
+        """
+        epochs = np.asarray(epochs, np.int64)
+        nbytes = np.asarray(nbytes, np.float64)
+        rows = np.flatnonzero(epochs != INT64_NULL)
+        if not len(rows):
+            return
+        if self.start is None:
+            self.start = int(epochs[rows].min())
+        order = rows[np.argsort(epochs[rows], kind="stable")]
+        salts = {dim: np.int64(key_id(dim)) for dim in keys}
+        for lo in range(0, len(order), _CHUNK):
+            chunk = order[lo:lo + _CHUNK]
+            latest = int(epochs[chunk[-1]])
+            times = (epochs[chunk] - self.start) / NS_PER_SECOND
+            self.now = max(self.now, float(times[-1]))
+            self.events += len(chunk)
+            for dim, (ids, names) in keys.items():
+                ids = np.asarray(ids, np.int64)[chunk]
+                present = ids != -1
+                self._step(dim, ids[present], salts[dim], times[present], nbytes[chunk][present], names, latest)
+
+    def _step(self, dim: str, ids: np.ndarray, salt: np.int64, times: np.ndarray,
+              nbytes: np.ndarray, names: Callable[[int], Any], latest: int) -> None:
+        if not len(ids):
+            return
+        cols = self.fast.columns(ids ^ salt)
+        values = np.column_stack((np.ones(len(ids)), nbytes))
+        self.fast.update(cols, times, values)
+        self.slow.update(cols, times, values)
+
+        # Rates of the keys this step touched, as of its last event
+        _, first = np.unique(ids, return_index=True)
+        now = float(times[-1])
+        current = self.fast.rates(self.fast.query(cols[first], now), now)
+        baseline = self.slow.rates(self.slow.query(cols[first], now), now)
+        flood = current[:, 0] >= self.flood_rate
+        spike = (current[:, 0] >= self.min_rate) & (current[:, 0] >= self.spike_factor * baseline[:, 0])
+        for i in np.flatnonzero(flood | spike).tolist():
+            kind = "flood" if flood[i] else "spike"
+            self._flag(kind, dim, int(ids[first[i]]), names, current[i], baseline[i], latest)
+
+    def _flag(self, kind: str, dim: str, key: int, names: Callable[[int], Any],
+              current: np.ndarray, baseline: np.ndarray, epoch: int) -> None:
+        rate = round(float(current[0]), 2)
+        finding = self._findings.get((dim, key))
+        if finding is None:
+            if len(self._findings) >= self.max_findings:
+                weakest = min(self._findings, key=lambda k: self._findings[k]["peak_events_per_second"])
+                if self._findings[weakest]["peak_events_per_second"] >= rate:
+                    return
+                del self._findings[weakest]
+            finding = self._findings[(dim, key)] = {
+                "type": kind,
+                dim: names(key),
+                "peak_events_per_second": 0.0,
+                "baseline_events_per_second": 0.0,
+                "peak_bytes_per_second": 0.0,
+                "first_flagged": epoch,
+                "last_flagged": epoch,
+            }
+        if kind == "flood":
+            finding["type"] = kind
+        if rate >= finding["peak_events_per_second"]:
+            finding.update({
+                "peak_events_per_second": rate,
+                "baseline_events_per_second": round(float(baseline[0]), 2),
+                "peak_bytes_per_second": round(float(current[1]), 1),
+            })
+        finding["last_flagged"] = epoch
+
+    def findings(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Flagged keys, highest peak rate first; times as ISO-8601. Folds in
+        any events still buffered by add_event first.
+        """
+        self.flush()
+        out = sorted(self._findings.values(), key=lambda f: -f["peak_events_per_second"])[:limit]
+        return [
+            dict(f, first_flagged=format_timestamp_ns(f["first_flagged"], 0),
+                 last_flagged=format_timestamp_ns(f["last_flagged"], 0))
+            for f in out
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        return {
+            "events": self.events,
+            "sketch_width": self.fast.width,
+            "sketch_depth": self.fast.depth,
+            "epsilon": self.fast.epsilon,
+            "delta": self.fast.delta,
+        }
+
+
+def _numbers(batch: LogBatch, name: Optional[str]) -> np.ndarray:
+    """
+    Float column for a numeric field (0 where missing or not a number).
+    """
+    if name is None:
+        return np.zeros(len(batch))
+    codes, values = batch.dictionary(name)
+    table = np.array(
+        [float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else 0.0 for v in values] + [0.0]
+    )
+    codes = np.frombuffer(codes, dtype=np.int32, count=len(codes)) if len(codes) else np.zeros(0, np.int32)
+    # Code -1 (missing) picks the trailing 0
+    return table[np.where(codes == _CODE_MISSING, len(values), codes)]
+
+
+def detect_volumetric(
+    batch: LogBatch,
+    source: str,
+    detector: Optional[VolumetricDetector] = None,
+    limit: Optional[int] = None,
+    normalizer: Optional[Normalizer] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Event and byte rate spikes / floods per destination and source address
+    of a LogBatch (the source's dst.ip, src.ip and network.bytes fields).
+    """
+    detector = detector or VolumetricDetector()
+    mapping = (normalizer or default_normalizer()).mappings[source]
+    if len(batch) == 0:
+        return detector.findings(limit)
+    keys = {}
+    for dim in ("dst.ip", "src.ip"):
+        name = _field(batch, mapping.fields.get(dim, []))
+        if name is not None:
+            keys[attr_name(dim)] = _address_keys(batch, name)
+    if keys:
+        epochs = np.frombuffer(batch.timestamps, dtype=np.int64, count=len(batch))
+        nbytes = _numbers(batch, _field(batch, mapping.fields.get("network.bytes", [])))
+        detector.observe(epochs, nbytes, keys)
+    return detector.findings(limit)